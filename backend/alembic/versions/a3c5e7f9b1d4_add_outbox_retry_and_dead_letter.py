@@ -0,0 +1,41 @@
+"""add_outbox_retry_and_dead_letter
+
+Revision ID: a3c5e7f9b1d4
+Revises: e6a8c0d2f4b7
+Create Date: 2026-10-18 21:14:52.603117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3c5e7f9b1d4'
+down_revision: Union[str, Sequence[str], None] = 'e6a8c0d2f4b7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('outbox_events', sa.Column('next_attempt_at', sa.DateTime(), nullable=True))
+    op.add_column('outbox_events', sa.Column('dead_at', sa.DateTime(), nullable=True))
+    op.create_index(
+        'ix_outbox_events_dead', 'outbox_events', ['id'], unique=False,
+        postgresql_where=sa.text('dead_at IS NOT NULL'),
+        sqlite_where=sa.text('dead_at IS NOT NULL'),
+    )
+    # Sự kiện đã hết lượt thử theo cách cũ (OUTBOX_MAX_ATTEMPTS mặc định = 5)
+    op.execute(
+        "UPDATE outbox_events SET dead_at = CURRENT_TIMESTAMP "
+        "WHERE processed_at IS NULL AND attempts >= 5"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_outbox_events_dead', table_name='outbox_events')
+    op.drop_column('outbox_events', 'dead_at')
+    op.drop_column('outbox_events', 'next_attempt_at')
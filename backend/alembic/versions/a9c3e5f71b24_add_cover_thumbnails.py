@@ -0,0 +1,28 @@
+"""add_cover_thumbnails
+
+Revision ID: a9c3e5f71b24
+Revises: f5b7d9e13a62
+Create Date: 2026-10-18 14:12:37.418502
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a9c3e5f71b24'
+down_revision: Union[str, Sequence[str], None] = 'f5b7d9e13a62'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('books', sa.Column('cover_thumbnails', sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('books', 'cover_thumbnails')
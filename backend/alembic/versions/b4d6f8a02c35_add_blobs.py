@@ -0,0 +1,41 @@
+"""add_blobs
+
+Revision ID: b4d6f8a02c35
+Revises: a9c3e5f71b24
+Create Date: 2026-10-18 15:03:21.774190
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b4d6f8a02c35'
+down_revision: Union[str, Sequence[str], None] = 'a9c3e5f71b24'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('blobs',
+    sa.Column('digest', sa.String(length=64), nullable=False),
+    sa.Column('key', sa.String(), nullable=False),
+    sa.Column('url', sa.String(), nullable=False),
+    sa.Column('size', sa.Integer(), nullable=False),
+    sa.Column('content_type', sa.String(), nullable=True),
+    sa.Column('ref_count', sa.Integer(), nullable=False),
+    sa.Column('released_at', sa.DateTime(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+    sa.PrimaryKeyConstraint('digest'),
+    sa.UniqueConstraint('url')
+    )
+    op.create_index(op.f('ix_blobs_released_at'), 'blobs', ['released_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_blobs_released_at'), table_name='blobs')
+    op.drop_table('blobs')
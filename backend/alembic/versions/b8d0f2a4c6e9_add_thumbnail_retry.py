@@ -0,0 +1,32 @@
+"""add_thumbnail_retry
+
+Revision ID: b8d0f2a4c6e9
+Revises: a3c5e7f9b1d4
+Create Date: 2026-10-18 22:03:18.771940
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8d0f2a4c6e9'
+down_revision: Union[str, Sequence[str], None] = 'a3c5e7f9b1d4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('books', sa.Column('thumbnail_attempts', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('books', sa.Column('thumbnail_retry_at', sa.DateTime(), nullable=True))
+    # Sách đã bị ghi {} vì lỗi (có thể chỉ là lỗi mạng) trước khi có cơ chế thử lại: cho chạy lại
+    op.execute("UPDATE books SET cover_thumbnails = NULL WHERE cover_thumbnails IS NOT NULL AND CAST(cover_thumbnails AS TEXT) = '{}'")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('books', 'thumbnail_retry_at')
+    op.drop_column('books', 'thumbnail_attempts')
@@ -0,0 +1,36 @@
+"""add_full_text_search
+
+Revision ID: c3f1d2a9b8e4
+Revises: 73a42881c13b
+Create Date: 2026-10-18 09:12:41.503112
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.db.search import search_index_ddl, drop_search_index_ddl
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3f1d2a9b8e4'
+down_revision: Union[str, Sequence[str], None] = '73a42881c13b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    dialect = op.get_bind().dialect.name
+    for statement in search_index_ddl(dialect):
+        op.execute(statement)
+    if dialect == "sqlite":
+        op.execute("INSERT INTO books_fts(books_fts) VALUES ('rebuild')")
+        op.execute("INSERT INTO members_fts(members_fts) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for statement in drop_search_index_ddl(op.get_bind().dialect.name):
+        op.execute(statement)
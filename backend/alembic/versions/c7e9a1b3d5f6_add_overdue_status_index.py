@@ -0,0 +1,34 @@
+"""add_overdue_status_index
+
+Revision ID: c7e9a1b3d5f6
+Revises: b4d6f8a02c35
+Create Date: 2026-10-18 16:20:48.905113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7e9a1b3d5f6'
+down_revision: Union[str, Sequence[str], None] = 'b4d6f8a02c35'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_loans_status_due_date', 'loans', ['status', 'due_date'], unique=False)
+    # Các loan quá hạn trước khi có job overdue vẫn mang status ACTIVE
+    op.execute(
+        "UPDATE loans SET status = 'overdue' "
+        "WHERE status = 'active' AND return_date IS NULL AND due_date < CURRENT_DATE"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("UPDATE loans SET status = 'active' WHERE status = 'overdue'")
+    op.drop_index('ix_loans_status_due_date', table_name='loans')
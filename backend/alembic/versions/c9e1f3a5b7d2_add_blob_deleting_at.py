@@ -0,0 +1,28 @@
+"""add_blob_deleting_at
+
+Revision ID: c9e1f3a5b7d2
+Revises: b8d0f2a4c6e9
+Create Date: 2026-10-18 23:41:07.215384
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c9e1f3a5b7d2'
+down_revision: Union[str, Sequence[str], None] = 'b8d0f2a4c6e9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('blobs', sa.Column('deleting_at', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('blobs', 'deleting_at')
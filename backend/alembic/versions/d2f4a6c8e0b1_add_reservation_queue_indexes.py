@@ -0,0 +1,36 @@
+"""add_reservation_queue_indexes
+
+Revision ID: d2f4a6c8e0b1
+Revises: c7e9a1b3d5f6
+Create Date: 2026-10-18 17:42:11.530218
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2f4a6c8e0b1'
+down_revision: Union[str, Sequence[str], None] = 'c7e9a1b3d5f6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        'ix_reservations_member_id_status', 'reservations', ['member_id', 'status'], unique=False
+    )
+    op.create_index(
+        'ix_reservations_pending_queue', 'reservations', ['book_id', 'reservation_date', 'id'], unique=False,
+        postgresql_where=sa.text("status = 'pending'"),
+        sqlite_where=sa.text("status = 'pending'"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_reservations_pending_queue', table_name='reservations')
+    op.drop_index('ix_reservations_member_id_status', table_name='reservations')
@@ -0,0 +1,51 @@
+"""add_book_loan_leaderboard
+
+Revision ID: e2a4c6f81d09
+Revises: d81e5b07c2f3
+Create Date: 2026-10-18 10:41:55.602317
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2a4c6f81d09'
+down_revision: Union[str, Sequence[str], None] = 'd81e5b07c2f3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('books', sa.Column('total_loans', sa.Integer(), server_default='0', nullable=False))
+    op.create_index(op.f('ix_books_total_loans'), 'books', ['total_loans'], unique=False)
+    op.create_table('book_loan_daily',
+    sa.Column('book_id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('loans', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['book_id'], ['books.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('book_id', 'day')
+    )
+    op.create_index('ix_book_loan_daily_day', 'book_loan_daily', ['day'], unique=False)
+
+    # Backfill từ lịch sử loans hiện có
+    op.execute(
+        "UPDATE books SET total_loans = "
+        "(SELECT count(*) FROM loans WHERE loans.book_id = books.id)"
+    )
+    op.execute(
+        "INSERT INTO book_loan_daily (book_id, day, loans) "
+        "SELECT book_id, loan_date, count(*) FROM loans "
+        "WHERE book_id IS NOT NULL GROUP BY book_id, loan_date"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_book_loan_daily_day', table_name='book_loan_daily')
+    op.drop_table('book_loan_daily')
+    op.drop_index(op.f('ix_books_total_loans'), table_name='books')
+    op.drop_column('books', 'total_loans')
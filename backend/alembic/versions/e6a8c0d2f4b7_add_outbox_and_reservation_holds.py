@@ -0,0 +1,51 @@
+"""add_outbox_and_reservation_holds
+
+Revision ID: e6a8c0d2f4b7
+Revises: d2f4a6c8e0b1
+Create Date: 2026-10-18 19:05:37.118402
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e6a8c0d2f4b7'
+down_revision: Union[str, Sequence[str], None] = 'd2f4a6c8e0b1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('outbox_events',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('topic', sa.String(), nullable=False),
+    sa.Column('payload', sa.JSON(), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('last_error', sa.String(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+    sa.Column('processed_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(
+        'ix_outbox_events_unprocessed', 'outbox_events', ['id'], unique=False,
+        postgresql_where=sa.text('processed_at IS NULL'),
+        sqlite_where=sa.text('processed_at IS NULL'),
+    )
+    op.add_column('reservations', sa.Column('hold_expires_at', sa.Date(), nullable=True))
+    op.create_index(
+        'ix_reservations_held_expiry', 'reservations', ['hold_expires_at'], unique=False,
+        postgresql_where=sa.text("status = 'held'"),
+        sqlite_where=sa.text("status = 'held'"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_reservations_held_expiry', table_name='reservations')
+    op.drop_column('reservations', 'hold_expires_at')
+    op.drop_index('ix_outbox_events_unprocessed', table_name='outbox_events')
+    op.drop_table('outbox_events')
@@ -0,0 +1,54 @@
+"""add_hot_path_indexes
+
+Revision ID: f5b7d9e13a62
+Revises: e2a4c6f81d09
+Create Date: 2026-10-18 11:08:13.274091
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f5b7d9e13a62'
+down_revision: Union[str, Sequence[str], None] = 'e2a4c6f81d09'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+REDUNDANT_ID_INDEXES = ['books', 'members', 'loans', 'reservations', 'fines']
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Index trên id trùng với primary key
+    for table in REDUNDANT_ID_INDEXES:
+        op.drop_index(op.f(f'ix_{table}_id'), table_name=table)
+
+    op.create_index('ix_loans_member_id_status', 'loans', ['member_id', 'status'], unique=False)
+    op.create_index('ix_loans_book_id_status', 'loans', ['book_id', 'status'], unique=False)
+    op.create_index(
+        'ix_loans_open_due_date', 'loans', ['due_date'], unique=False,
+        postgresql_where=sa.text('return_date IS NULL'),
+        sqlite_where=sa.text('return_date IS NULL'),
+    )
+    op.create_index(
+        'ix_reservations_book_id_member_id_status', 'reservations',
+        ['book_id', 'member_id', 'status'], unique=False
+    )
+    op.create_index('ix_fines_loan_id', 'fines', ['loan_id'], unique=False)
+    op.create_index('ix_fines_status_amount', 'fines', ['status', 'amount'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_fines_status_amount', table_name='fines')
+    op.drop_index('ix_fines_loan_id', table_name='fines')
+    op.drop_index('ix_reservations_book_id_member_id_status', table_name='reservations')
+    op.drop_index('ix_loans_open_due_date', table_name='loans')
+    op.drop_index('ix_loans_book_id_status', table_name='loans')
+    op.drop_index('ix_loans_member_id_status', table_name='loans')
+
+    for table in REDUNDANT_ID_INDEXES:
+        op.create_index(op.f(f'ix_{table}_id'), table, ['id'], unique=False)
@@ -0,0 +1,119 @@
+"""Cache key-value dùng chung cho các lớp read-through.
+
+Hai backend có cùng interface (async):
+- `MemoryCache`: LRU trong process, có TTL. Mặc định.
+- `RedisCache`: dùng khi `CACHE_URL` được cấu hình; bất kỳ server nói giao thức
+  Redis nào (Redis, Valkey, KeyDB, ...) đều dùng được. Cần cài gói `redis`.
+
+Ngoài get/set, backend hỗ trợ tag (xóa mọi key gắn với một tag) và bộ đếm
+version (đổi version = vô hiệu cả một namespace mà không cần quét key).
+"""
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+from app.core.config import settings
+
+
+class MemoryCache:
+    def __init__(self, max_entries: int, default_ttl: int):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self._data: "OrderedDict[str, Tuple[float, bytes, Tuple[str, ...]]]" = OrderedDict()
+        self._tags: Dict[str, Set[str]] = {}
+        self._versions: Dict[str, int] = {}
+
+    async def get(self, key: str) -> Optional[bytes]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires_at, value, _ = entry
+        if expires_at < time.monotonic():
+            self._remove(key)
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: bytes, ttl: Optional[int] = None, tags: Iterable[str] = ()):
+        self._remove(key)
+        tags = tuple(tags)
+        self._data[key] = (time.monotonic() + (ttl or self.default_ttl), value, tags)
+        for tag in tags:
+            self._tags.setdefault(tag, set()).add(key)
+        while len(self._data) > self.max_entries:
+            self._remove(next(iter(self._data)))
+
+    async def delete(self, *keys: str):
+        for key in keys:
+            self._remove(key)
+
+    async def invalidate_tag(self, tag: str):
+        for key in self._tags.pop(tag, set()):
+            self._remove(key)
+
+    async def get_version(self, name: str) -> int:
+        return self._versions.get(name, 0)
+
+    async def incr_version(self, name: str) -> int:
+        self._versions[name] = self._versions.get(name, 0) + 1
+        return self._versions[name]
+
+    def _remove(self, key: str):
+        entry = self._data.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry[2]:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+
+class RedisCache:
+    PREFIX = "library:"
+
+    def __init__(self, url: str, default_ttl: int):
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            raise RuntimeError("CACHE_URL is set but the 'redis' package is not installed")
+        self.default_ttl = default_ttl
+        self._client = redis.from_url(url)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self._client.get(self.PREFIX + key)
+
+    async def set(self, key: str, value: bytes, ttl: Optional[int] = None, tags: Iterable[str] = ()):
+        ttl = ttl or self.default_ttl
+        async with self._client.pipeline(transaction=False) as pipe:
+            pipe.set(self.PREFIX + key, value, ex=ttl)
+            for tag in tags:
+                tag_key = f"{self.PREFIX}tag:{tag}"
+                pipe.sadd(tag_key, self.PREFIX + key)
+                pipe.expire(tag_key, ttl)
+            await pipe.execute()
+
+    async def delete(self, *keys: str):
+        if keys:
+            await self._client.delete(*[self.PREFIX + key for key in keys])
+
+    async def invalidate_tag(self, tag: str):
+        tag_key = f"{self.PREFIX}tag:{tag}"
+        keys = await self._client.smembers(tag_key)
+        await self._client.delete(tag_key, *keys)
+
+    async def get_version(self, name: str) -> int:
+        return int(await self._client.get(f"{self.PREFIX}version:{name}") or 0)
+
+    async def incr_version(self, name: str) -> int:
+        return await self._client.incr(f"{self.PREFIX}version:{name}")
+
+
+def create_cache():
+    if settings.CACHE_URL:
+        return RedisCache(settings.CACHE_URL, settings.CACHE_TTL_SECONDS)
+    return MemoryCache(settings.CACHE_MAX_ENTRIES, settings.CACHE_TTL_SECONDS)
+
+
+cache = create_cache()
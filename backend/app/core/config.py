@@ -6,9 +6,87 @@ class Settings(BaseSettings):
     
     DATABASE_URL: Optional[str] = None
 
+    # Connection pool Postgres (xem app/db/pool.py): "queue" hoặc "null" (pgbouncer / serverless)
+    DB_POOL_MODE: str = "queue"
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: int = 30
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = False
+    # Kết nối qua pgbouncer chế độ transaction: không dùng prepared statement có tên cố định
+    DB_PGBOUNCER: bool = False
+
+    # SQLite (khi không có DATABASE_URL): WAL + pragma + hàng đợi một writer (app/db/sqlite.py)
+    SQLITE_TUNED: bool = True
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    SQLITE_CACHE_SIZE_KB: int = 65536
+    SQLITE_MMAP_SIZE: int = 268435456
+    SQLITE_READ_POOL_SIZE: int = 8
+    # Thời gian tối đa một transaction ghi chờ tới lượt (giây)
+    SQLITE_WRITER_TIMEOUT: int = 30
+
     SUPABASE_URL: Optional[str] = None
     SUPABASE_KEY: Optional[str] = None
 
+    # Lưu file: "local" | "supabase" | "s3"; để trống thì dùng supabase nếu đã cấu hình
+    STORAGE_BACKEND: Optional[str] = None
+    STORAGE_BUCKET: str = "library-files"
+    # Bucket không công khai cho PDF (supabase/s3): chỉ đọc qua /books/{id}/content
+    STORAGE_PRIVATE_BUCKET: str = "library-private"
+    STORAGE_MAX_CONCURRENT_UPLOADS: int = 8
+    STORAGE_HTTP_POOL_SIZE: int = 20
+    UPLOAD_DIR: str = "uploaded_books"
+    # Khóa ký token đọc PDF do /loans/check-access cấp; để trống thì mỗi process tự sinh
+    # (nhiều worker phải đặt chung một giá trị) và thời hạn token (giây)
+    CONTENT_TOKEN_SECRET: Optional[str] = None
+    CONTENT_TOKEN_SECONDS: int = 1800
+
+    # Storage S3-compatible (AWS S3, MinIO, Cloudflare R2, ...)
+    S3_ENDPOINT_URL: Optional[str] = None
+    S3_REGION: str = "us-east-1"
+    S3_ACCESS_KEY_ID: Optional[str] = None
+    S3_SECRET_ACCESS_KEY: Optional[str] = None
+    # URL công khai của bucket nếu khác endpoint (vd. CDN)
+    S3_PUBLIC_URL: Optional[str] = None
+
+    # Chu kỳ đối soát bộ đếm dashboard với database (giây)
+    DASHBOARD_REFRESH_SECONDS: int = 60
+
+    # Cache đọc: để trống CACHE_URL thì dùng LRU trong process
+    CACHE_URL: Optional[str] = None
+    CACHE_TTL_SECONDS: int = 60
+    CACHE_MAX_ENTRIES: int = 2048
+
+    # Thumbnail ảnh bìa (cần gói Pillow): chu kỳ quét các sách chưa có thumbnail (giây)
+    THUMBNAIL_SWEEP_SECONDS: int = 300
+    # Khoảng cách tối thiểu giữa hai lần tải ảnh bìa từ xa (giây)
+    THUMBNAIL_FETCH_INTERVAL_SECONDS: float = 1.0
+    # Lỗi tạm thời: thử lại sau base * 2^(lần lỗi - 1) giây (tối đa max), bỏ cuộc sau MAX_ATTEMPTS lần
+    THUMBNAIL_RETRY_BASE_SECONDS: int = 60
+    THUMBNAIL_RETRY_MAX_SECONDS: int = 86400
+    THUMBNAIL_MAX_ATTEMPTS: int = 8
+
+    # Giờ chạy job đánh dấu quá hạn + cộng phí phạt mỗi ngày (HH:MM, giờ server)
+    OVERDUE_JOB_AT: str = "00:05"
+    # Bearer token cho /jobs/nightly (Vercel Cron gửi `Authorization: Bearer $CRON_SECRET`);
+    # để trống thì endpoint bị tắt
+    CRON_SECRET: Optional[str] = None
+
+    # Dọn blob không còn ai tham chiếu: chu kỳ chạy và thời gian ân hạn (giây)
+    BLOB_GC_INTERVAL_SECONDS: int = 3600
+    BLOB_GC_GRACE_SECONDS: int = 3600
+
+    # Giữ sách cho người đặt trước khi có bản được trả (ngày)
+    RESERVATION_HOLD_DAYS: int = 3
+
+    # Outbox sự kiện nội bộ: chu kỳ quét (giây), số lần thử lại, thời gian giữ sự kiện đã xử lý (ngày)
+    OUTBOX_POLL_SECONDS: int = 30
+    OUTBOX_MAX_ATTEMPTS: int = 5
+    # Thử lại sự kiện lỗi theo cấp số nhân: base * 2^(lần lỗi - 1), tối đa max (giây)
+    OUTBOX_RETRY_BASE_SECONDS: int = 30
+    OUTBOX_RETRY_MAX_SECONDS: int = 3600
+    OUTBOX_RETENTION_DAYS: int = 7
+
     class Config:
         case_sensitive = True
         env_file = ".env"
@@ -0,0 +1,40 @@
+"""Token đọc PDF của sách (`/books/{id}/content?token=...`).
+
+`/loans/check-access` cấp token sau khi kiểm tra loan. Token ký HMAC gồm book_id,
+member_id và hạn dùng, nên client không tự đổi sang sách hay thành viên khác
+được. Endpoint đọc vẫn kiểm tra lại loan ở mỗi request: trả sách là hết đọc.
+"""
+import base64
+import hashlib
+import hmac
+import secrets
+import time
+from typing import Optional
+
+from app.core.config import settings
+
+_secret = (settings.CONTENT_TOKEN_SECRET or secrets.token_urlsafe(32)).encode()
+
+
+def _signature(payload: str) -> str:
+    digest = hmac.new(_secret, payload.encode(), hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest).decode().rstrip("=")
+
+
+def issue(book_id: int, member_id: int) -> str:
+    payload = f"{book_id}.{member_id}.{int(time.time()) + settings.CONTENT_TOKEN_SECONDS}"
+    return f"{payload}.{_signature(payload)}"
+
+
+def verify(token: str, book_id: int) -> Optional[int]:
+    """member_id của token nếu chữ ký đúng, đúng sách và còn hạn; không thì None."""
+    try:
+        token_book, member_id, expires, signature = token.split(".")
+        valid = (
+            hmac.compare_digest(signature, _signature(f"{token_book}.{member_id}.{expires}"))
+            and int(token_book) == book_id
+            and int(expires) >= time.time()
+        )
+    except ValueError:
+        return None
+    return int(member_id) if valid else None
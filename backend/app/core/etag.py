@@ -0,0 +1,125 @@
+"""ETag / Last-Modified cho các endpoint danh sách.
+
+Mỗi bảng có một bộ đếm version lưu trong cache backend (xem app/core/cache.py).
+Session event ghi nhận bảng nào bị insert/update/delete trong transaction; sau
+commit các bảng đó được đánh dấu "pending" và middleware tăng version trước khi
+gửi response (nên client nhận 201/200 xong là version đã đổi).
+
+Với GET tới một resource đã đăng ký, ETag được tính từ path + query + version
+của các bảng mà resource phụ thuộc - chỉ vài lần đọc cache, không chạm DB. Nếu
+khớp `If-None-Match` thì trả 304 ngay, không gọi router.
+
+Với backend cache trong process, version không chia sẻ giữa các worker nên
+ETag còn gắn với khung thời gian CACHE_TTL_SECONDS: 304 sai tối đa một khung.
+"""
+import hashlib
+import time
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Dict, Set, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.core.cache import cache, MemoryCache
+from app.core.config import settings
+
+_pending: Set[str] = set()
+_boot_time = time.time()
+
+
+@event.listens_for(Session, "after_flush")
+def _track_flush(session, flush_context):
+    changed = session.info.setdefault("changed_tables", set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        table = getattr(obj, "__tablename__", None)
+        if table:
+            changed.add(table)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _track_dml(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        table = getattr(orm_execute_state.statement, "table", None)
+        if table is not None:
+            orm_execute_state.session.info.setdefault("changed_tables", set()).add(table.name)
+
+
+@event.listens_for(Session, "after_commit")
+def _mark_pending(session):
+    _pending.update(session.info.pop("changed_tables", ()))
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changes(session):
+    session.info.pop("changed_tables", None)
+
+
+async def bump_pending():
+    """Tăng version của các bảng vừa thay đổi. Job nền gọi trực tiếp sau khi commit."""
+    while _pending:
+        table = _pending.pop()
+        await cache.incr_version(f"table:{table}")
+        await cache.set(f"modified:{table}", str(time.time()).encode(), ttl=365 * 24 * 3600)
+
+
+async def _validators(path: str, query: str, tables: Tuple[str, ...]) -> Tuple[str, float]:
+    versions = [str(await cache.get_version(f"table:{table}")) for table in tables]
+    modified = [await cache.get(f"modified:{table}") for table in tables]
+    last_modified = max([float(m) for m in modified if m] + [_boot_time])
+    if isinstance(cache, MemoryCache):
+        window = int(time.time() // settings.CACHE_TTL_SECONDS)
+        versions.append(f"w{window}")
+        last_modified = max(last_modified, window * settings.CACHE_TTL_SECONDS)
+    digest = hashlib.sha1(f"{path}?{query}|{','.join(versions)}".encode()).hexdigest()[:20]
+    return f'W/"{digest}"', last_modified
+
+
+def _not_modified(headers: Dict[str, str], etag: str, last_modified: float) -> bool:
+    if_none_match = headers.get("if-none-match")
+    if if_none_match is not None:
+        return etag in [tag.strip() for tag in if_none_match.split(",")] or if_none_match.strip() == "*"
+    if_modified_since = headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return int(last_modified) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+class ConditionalGetMiddleware:
+    def __init__(self, app, resources: Dict[str, Tuple[str, ...]]):
+        self.app = app
+        self.resources = resources
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        tables = self.resources.get(scope["path"]) if scope["method"] in ("GET", "HEAD") else None
+        if tables is None:
+            async def send_after_bump(message):
+                if message["type"] == "http.response.start" or (
+                    message["type"] == "http.response.body" and not message.get("more_body")
+                ):
+                    await bump_pending()
+                await send(message)
+            return await self.app(scope, receive, send_after_bump)
+
+        await bump_pending()
+        etag, last_modified = await _validators(scope["path"], scope["query_string"].decode(), tables)
+        validator_headers = [
+            (b"etag", etag.encode()),
+            (b"last-modified", formatdate(last_modified, usegmt=True).encode()),
+        ]
+        request_headers = {k.decode().lower(): v.decode() for k, v in scope["headers"]}
+        if _not_modified(request_headers, etag, last_modified):
+            await send({"type": "http.response.start", "status": 304, "headers": validator_headers})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        async def send_with_etag(message):
+            if message["type"] == "http.response.start" and message["status"] == 200:
+                message = {**message, "headers": list(message.get("headers", [])) + validator_headers}
+            await send(message)
+        await self.app(scope, receive, send_with_etag)
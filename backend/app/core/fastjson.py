@@ -0,0 +1,74 @@
+"""Đường trả JSON nhanh cho các endpoint danh sách.
+
+Mặc định FastAPI validate lại kết quả qua `response_model` (từ ORM, với
+`from_attributes`) rồi encode bằng `json` của thư viện chuẩn. Với trang 100 dòng
+phần này tốn hơn cả câu SQL. Endpoint nào muốn bỏ qua thì:
+
+1. select đúng các cột của schema (`schema_columns`), không load entity ORM;
+2. trả `FastJSONResponse(rows)`: dict của từng dòng được serialize thẳng,
+   không validate lần nữa;
+3. khai báo schema bằng `responses={200: {"model": ...}}` thay vì `response_model`:
+   FastAPI không áp `response_model` lên Response trả trực tiếp, nên khai báo đó
+   chỉ làm tài liệu OpenAPI và dễ lệch khỏi dữ liệu thật mà không ai biết
+   (tests/test_list_responses.py kiểm tra hai bên khớp nhau).
+
+Dùng `orjson` nếu đã cài (extra `fast-json`), nếu không thì dùng `json`.
+"""
+import json
+from datetime import date
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Type
+
+from fastapi import Response
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from sqlalchemy import inspect
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _default(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, date):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, default=_default)
+    return json.dumps(content, default=_default, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def list_response(rows: List[Dict], response: Response) -> FastJSONResponse:
+    """Trả `rows` kèm các header endpoint đã đặt trên `response` được inject (vd. X-Next-Cursor).
+
+    FastAPI chỉ gộp header đó khi endpoint trả dữ liệu, không phải khi trả Response.
+    """
+    return FastJSONResponse(rows, headers=dict(response.headers))
+
+
+def schema_columns(model, schema: Type[BaseModel], prefix: Optional[str] = None) -> List:
+    """Các cột của `model` (kể cả column_property) ứng với trường của `schema`,
+    gắn nhãn `<prefix>__<tên>` nếu có prefix."""
+    columns = inspect(model).column_attrs
+    return [
+        getattr(model, name).label(f"{prefix}__{name}" if prefix else name)
+        for name in schema.model_fields if name in columns
+    ]
+
+
+def nest(row: Dict, prefix: str) -> Optional[Dict]:
+    """Tách các cột `<prefix>__*` của `row` thành object con (None nếu outer join không khớp)."""
+    start = f"{prefix}__"
+    values = {key[len(start):]: row.pop(key) for key in list(row) if key.startswith(start)}
+    return values if values.get("id") is not None else None
@@ -0,0 +1,133 @@
+import base64
+import binascii
+import json
+from datetime import date
+from typing import Dict, List, Optional
+
+from fastapi import HTTPException, Response
+from sqlalchemy import Select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(last_id: int) -> str:
+    return base64.urlsafe_b64encode(f"id:{last_id}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        prefix, value = base64.urlsafe_b64decode(padded).decode().split(":", 1)
+        if prefix != "id":
+            raise ValueError(prefix)
+        return int(value)
+    except (ValueError, binascii.Error, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def encode_offset_cursor(offset: int) -> str:
+    """Cursor cho trang tìm kiếm xếp theo độ liên quan (rank không seek được như id)."""
+    return base64.urlsafe_b64encode(f"o:{offset}".encode()).decode().rstrip("=")
+
+
+def decode_offset_cursor(cursor: str) -> Optional[int]:
+    """Offset trong cursor tìm kiếm; None nếu là loại cursor khác (vd. cursor id)."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        prefix, value = base64.urlsafe_b64decode(padded).decode().split(":", 1)
+        if prefix != "o":
+            return None
+        offset = int(value)
+        if offset < 0:
+            raise ValueError(value)
+        return offset
+    except (ValueError, binascii.Error, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def encode_keyset_cursor(*values) -> str:
+    """Cursor cho trang sắp xếp theo nhiều cột (vd. due_date, id)."""
+    raw = "k:" + json.dumps([v.isoformat() if isinstance(v, date) else v for v in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_keyset_cursor(cursor: str) -> List:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        prefix, value = base64.urlsafe_b64decode(padded).decode().split(":", 1)
+        if prefix != "k":
+            raise ValueError(prefix)
+        values = json.loads(value)
+        if not isinstance(values, list):
+            raise ValueError(value)
+        return values
+    except (ValueError, binascii.Error, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _page(stmt: Select, id_column, skip: int, limit: int, cursor: Optional[str]) -> Select:
+    stmt = stmt.order_by(id_column.desc())
+    if cursor:
+        stmt = stmt.where(id_column < decode_cursor(cursor))
+    else:
+        stmt = stmt.offset(skip)
+    return stmt.limit(limit)
+
+
+async def paginate(
+    db: AsyncSession,
+    stmt: Select,
+    id_column,
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+):
+    """Trả về một trang kết quả sắp xếp theo id giảm dần.
+
+    Có `cursor` thì seek trực tiếp trên id (keyset) nên trang sâu cũng nhanh như
+    trang đầu; không có thì giữ nguyên hành vi skip/limit cũ. Cursor của trang
+    kế tiếp được trả qua header `X-Next-Cursor` để body vẫn là một list.
+    """
+    result = await db.execute(_page(stmt, id_column, skip, limit, cursor))
+    rows = result.unique().scalars().all()
+    if limit > 0 and len(rows) == limit:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(rows[-1].id)
+    return rows
+
+
+async def paginate_mappings(
+    db: AsyncSession,
+    stmt: Select,
+    id_column,
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+) -> List[Dict]:
+    """Như `paginate` nhưng cho câu select theo cột: trả về dict, cột id phải có nhãn `id`."""
+    result = await db.execute(_page(stmt, id_column, skip, limit, cursor))
+    rows = [dict(row) for row in result.mappings()]
+    if limit > 0 and len(rows) == limit:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(rows[-1]["id"])
+    return rows
+
+
+async def paginate_ranked(
+    db: AsyncSession,
+    stmt: Select,
+    response: Response,
+    offset: int = 0,
+    limit: int = 100,
+) -> List[Dict]:
+    """Trang kết quả tìm kiếm đã sắp xếp theo độ liên quan (`stmt` có sẵn order_by).
+
+    Cursor trang kế tiếp mang offset (`encode_offset_cursor`) để client duyệt tiếp
+    theo đúng thứ tự rank như với cursor id.
+    """
+    result = await db.execute(stmt.offset(offset).limit(limit))
+    rows = [dict(row) for row in result.mappings()]
+    if limit > 0 and len(rows) == limit:
+        response.headers[NEXT_CURSOR_HEADER] = encode_offset_cursor(offset + limit)
+    return rows
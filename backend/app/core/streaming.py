@@ -0,0 +1,100 @@
+"""Serialize một luồng bản ghi (dict) thành JSON / NDJSON / CSV theo từng phần.
+
+Các generator nhận async iterator các dict và yield từng chunk text, dùng với
+StreamingResponse: server không bao giờ giữ toàn bộ kết quả trong bộ nhớ.
+"""
+import csv
+import enum
+import io
+import json
+from datetime import date
+from decimal import Decimal
+from typing import AsyncIterator, Dict, Optional, Sequence
+
+from fastapi.responses import StreamingResponse
+
+CHUNK_SIZE = 64 * 1024
+
+
+class ExportFormat(str, enum.Enum):
+    JSON = "json"
+    NDJSON = "ndjson"
+    CSV = "csv"
+
+
+MEDIA_TYPES = {
+    ExportFormat.JSON: "application/json",
+    ExportFormat.NDJSON: "application/x-ndjson",
+    ExportFormat.CSV: "text/csv; charset=utf-8",
+}
+
+
+def _default(value):
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _dumps(row: Dict) -> str:
+    return json.dumps(row, default=_default, ensure_ascii=False)
+
+
+async def json_array(rows: AsyncIterator[Dict]) -> AsyncIterator[str]:
+    yield "["
+    first = True
+    async for row in rows:
+        yield ("" if first else ",") + _dumps(row)
+        first = False
+    yield "]"
+
+
+async def ndjson_lines(rows: AsyncIterator[Dict]) -> AsyncIterator[str]:
+    async for row in rows:
+        yield _dumps(row) + "\n"
+
+
+async def csv_lines(rows: AsyncIterator[Dict], columns: Sequence[str]) -> AsyncIterator[str]:
+    # BOM để Excel nhận đúng UTF-8 (tên tiếng Việt)
+    yield "\ufeff"
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns, extrasaction="ignore")
+    writer.writeheader()
+    async for row in rows:
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerow(row)
+    yield buffer.getvalue()
+
+
+async def _coalesce(chunks: AsyncIterator[str]) -> AsyncIterator[str]:
+    """Gộp các chunk nhỏ (một dòng) thành khối ~CHUNK_SIZE để giảm số lần gửi."""
+    pending, size = [], 0
+    async for chunk in chunks:
+        pending.append(chunk)
+        size += len(chunk)
+        if size >= CHUNK_SIZE:
+            yield "".join(pending)
+            pending, size = [], 0
+    if pending:
+        yield "".join(pending)
+
+
+def stream_rows(
+    rows: AsyncIterator[Dict],
+    fmt: ExportFormat,
+    columns: Sequence[str],
+    filename: str,
+    headers: Optional[Dict[str, str]] = None,
+) -> StreamingResponse:
+    headers = dict(headers or {})
+    if fmt == ExportFormat.CSV:
+        body = csv_lines(rows, columns)
+        headers["Content-Disposition"] = f'attachment; filename="{filename}.csv"'
+    elif fmt == ExportFormat.NDJSON:
+        body = ndjson_lines(rows)
+    else:
+        body = json_array(rows)
+    return StreamingResponse(_coalesce(body), media_type=MEDIA_TYPES[fmt], headers=headers)
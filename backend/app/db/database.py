@@ -1,31 +1,69 @@
 import os
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.orm import sessionmaker, declarative_base
 
+from app.core.config import settings
+from app.db.pool import InstrumentedQueuePool, engine_options, instrument
+from app.db.sqlite import (
+    RoutingSession, apply_pragmas, use_immediate_transactions, reader_engine_options, writer_engine_options
+)
+
 # Lấy biến môi trường
 SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL")
 
 engine = None
+async_engine = None
+# Engine ghi riêng của chế độ SQLite tuned (None nếu không dùng)
+writer_engine = None
 
 # Logic thông minh: Tự chọn Engine dựa trên biến môi trường
 if SQLALCHEMY_DATABASE_URL and SQLALCHEMY_DATABASE_URL.startswith("postgresql"):
     # Cấu hình cho PRODUCTION (Supabase/Postgres)
     if SQLALCHEMY_DATABASE_URL.startswith("postgres://"):
         SQLALCHEMY_DATABASE_URL = SQLALCHEMY_DATABASE_URL.replace("postgres://", "postgresql://", 1)
-    engine = create_engine(SQLALCHEMY_DATABASE_URL, pool_pre_ping=True)
+    # Kích thước / chế độ pool theo settings (app/db/pool.py)
+    engine = create_engine(SQLALCHEMY_DATABASE_URL, **engine_options(async_driver=False))
+    # Engine async cho các router (asyncpg)
+    ASYNC_DATABASE_URL = SQLALCHEMY_DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://", 1)
+    async_engine = create_async_engine(ASYNC_DATABASE_URL, **engine_options())
 else:
     # Cấu hình cho LOCAL (SQLite)
     print("--- Running with Local SQLite ---")
     SQLALCHEMY_DATABASE_URL = "sqlite:///./library.db"
     # [QUAN TRỌNG] check_same_thread=False là bắt buộc cho SQLite
     engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+    ASYNC_DATABASE_URL = "sqlite+aiosqlite:///./library.db"
+    if settings.SQLITE_TUNED:
+        # WAL + pragma; đọc qua pool nhiều kết nối, ghi xếp hàng qua một kết nối writer
+        apply_pragmas(engine)
+        async_engine = create_async_engine(ASYNC_DATABASE_URL, **reader_engine_options())
+        writer_engine = create_async_engine(ASYNC_DATABASE_URL, **writer_engine_options())
+        for tuned in (async_engine, writer_engine):
+            apply_pragmas(tuned.sync_engine)
+        use_immediate_transactions(writer_engine.sync_engine)
+        instrument(writer_engine.sync_engine)
+        RoutingSession.writer = writer_engine.sync_engine
+    else:
+        async_engine = create_async_engine(ASYNC_DATABASE_URL, poolclass=InstrumentedQueuePool)
+
+instrument(async_engine.sync_engine)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# expire_on_commit=False: tránh lazy-load (không được phép trong async) sau khi commit
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine, class_=AsyncSession, sync_session_class=RoutingSession,
+    autoflush=False, expire_on_commit=False
+)
 Base = declarative_base()
 
-def get_db():
+def get_sync_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+async def get_db():
+    async with AsyncSessionLocal() as db:
+        yield db
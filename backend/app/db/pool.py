@@ -0,0 +1,139 @@
+"""Cấu hình và đo đạc connection pool của engine.
+
+Chế độ pool (`DB_POOL_MODE`):
+- "queue" (mặc định): pool trong process, kích thước theo DB_POOL_SIZE / DB_MAX_OVERFLOW,
+  đợi tối đa DB_POOL_TIMEOUT giây, đóng kết nối cũ hơn DB_POOL_RECYCLE giây. Không
+  pre-ping mỗi lần checkout (DB_POOL_PRE_PING) - kết nối hỏng được pool tự loại bỏ.
+- "null": không giữ kết nối (NullPool) - dùng sau pgbouncer / Supabase transaction
+  pooler (cổng 6543) hoặc môi trường serverless, nơi pool đã nằm ở phía pooler.
+
+`DB_PGBOUNCER=true` tắt cache prepared statement của asyncpg và đặt tên statement
+ngẫu nhiên, vì pgbouncer chế độ transaction không giữ statement giữa các transaction.
+
+Số liệu (checkout, thời gian chờ, timeout, kết nối mới) xem qua `/health/db/pool`.
+"""
+import time
+from collections import deque
+from typing import Dict
+from uuid import uuid4
+
+from sqlalchemy import event, exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool
+
+from app.core.config import settings
+
+WAIT_SAMPLES = 1000
+
+
+class PoolStats:
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.connects = 0
+        self.invalidated = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self._waits = deque(maxlen=WAIT_SAMPLES)
+
+    def record_wait(self, seconds: float):
+        self.checkouts += 1
+        self.wait_total += seconds
+        self.wait_max = max(self.wait_max, seconds)
+        self._waits.append(seconds)
+
+    def _percentile(self, fraction: float) -> float:
+        if not self._waits:
+            return 0.0
+        ordered = sorted(self._waits)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+    def report(self) -> Dict:
+        return {
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "connects": self.connects,
+            "invalidated": self.invalidated,
+            "wait_ms": {
+                "avg": round(self.wait_total / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+                "p50": round(self._percentile(0.5) * 1000, 3),
+                "p95": round(self._percentile(0.95) * 1000, 3),
+                "max": round(self.wait_max * 1000, 3),
+            },
+        }
+
+
+stats = PoolStats()
+
+
+class _TimedCheckout:
+    """Đo thời gian lấy kết nối từ pool (gồm cả mở kết nối mới nếu phải mở)."""
+    # Subclass có thể dùng PoolStats riêng (vd. pool writer của SQLite)
+    stats = stats
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            self.stats.timeouts += 1
+            raise
+        self.stats.record_wait(time.perf_counter() - start)
+        return connection
+
+
+class InstrumentedQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    pass
+
+
+class InstrumentedNullPool(_TimedCheckout, NullPool):
+    pass
+
+
+def engine_options(async_driver: bool = True) -> Dict:
+    """Tham số create_engine / create_async_engine cho Postgres theo settings."""
+    options: Dict = {"pool_pre_ping": settings.DB_POOL_PRE_PING}
+    if settings.DB_POOL_MODE == "null":
+        options["poolclass"] = InstrumentedNullPool if async_driver else NullPool
+    else:
+        options.update(
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+            # Dùng lại kết nối mới nhất trước: kết nối thừa nằm yên và hết hạn ở phía server
+            pool_use_lifo=True,
+        )
+        if async_driver:
+            options["poolclass"] = InstrumentedQueuePool
+    if async_driver and settings.DB_PGBOUNCER:
+        options["connect_args"] = {
+            "statement_cache_size": 0,
+            "prepared_statement_cache_size": 0,
+            "prepared_statement_name_func": lambda: f"__asyncpg_{uuid4()}__",
+        }
+    return options
+
+
+def instrument(engine):
+    """Đếm kết nối mới / bị loại bỏ của engine (sync engine bên dưới AsyncEngine)."""
+    @event.listens_for(engine, "connect")
+    def _connect(dbapi_connection, connection_record):
+        getattr(engine.pool, "stats", stats).connects += 1
+
+    @event.listens_for(engine, "invalidate")
+    def _invalidate(dbapi_connection, connection_record, exception):
+        getattr(engine.pool, "stats", stats).invalidated += 1
+
+
+def pool_status(engine) -> Dict:
+    pool = engine.pool
+    status = {"pool": type(pool).__name__, **getattr(pool, "stats", stats).report()}
+    if isinstance(pool, AsyncAdaptedQueuePool):
+        status.update(
+            size=pool.size(),
+            checked_in=pool.checkedin(),
+            checked_out=pool.checkedout(),
+            overflow=max(pool.overflow(), 0),
+            timeout=pool.timeout(),
+        )
+    return status
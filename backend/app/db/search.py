@@ -0,0 +1,198 @@
+import re
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import Response
+from sqlalchemy import Select, or_, text, literal_column, func, column, table, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.pagination import decode_offset_cursor, paginate_mappings, paginate_ranked
+
+# Mỗi bảng tìm kiếm: tên bảng nguồn -> các cột được index full-text.
+SEARCH_FIELDS = {
+    "books": ("title", "author", "isbn"),
+    "members": ("full_name", "email"),
+}
+
+# Cột cho phép tìm chuỗi con (ILIKE '%q%') trên Postgres, được hỗ trợ bởi index trigram.
+TRIGRAM_FIELDS = {
+    "books": "isbn",
+    "members": "email",
+}
+
+# Index tiền tố FTS5 cho các độ dài này: "c"*, "clean"*, "mountain"* đọc doclist của index
+# tiền tố theo thứ tự rowid và dừng sau một trang; tiền tố dài hơn phải gộp doclist mọi từ
+# khớp (nhanh với từ hiếm, chậm với từ rất phổ biến). Mỗi độ dài tăng kích thước index
+FTS_PREFIXES = "1 2 3 4 5 6 7 8"
+# bm25 phải đọc toàn bộ doclist của từng từ khóa: chỉ xếp hạng khi số dòng khớp không quá
+# ngưỡng này, nhiều hơn (vd. các phím gõ đầu tiên) thì trả dòng mới nhất trước
+RANK_LIMIT = 1000
+# Từ khóa ngắn hơn (vd. "c", "cl") khớp gần như mọi dòng: không xếp hạng, khỏi đếm thử
+RANK_MIN_LENGTH = 3
+
+
+def _sqlite_ddl(name: str, fields: Tuple[str, ...]) -> List[str]:
+    cols = ", ".join(fields)
+    new_vals = ", ".join(f"new.{f}" for f in fields)
+    old_vals = ", ".join(f"old.{f}" for f in fields)
+    fts = f"{name}_fts"
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+        f"{cols}, content='{name}', content_rowid='id', "
+        f"tokenize='unicode61 remove_diacritics 2', prefix='{FTS_PREFIXES}')",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {name} BEGIN "
+        f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new_vals}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {name} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old_vals}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE ON {name} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old_vals}); "
+        f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new_vals}); END",
+    ]
+
+
+def _postgres_ddl(name: str, fields: Tuple[str, ...]) -> List[str]:
+    document = " || ' ' || ".join(f"coalesce({f}, '')" for f in fields)
+    trigram = TRIGRAM_FIELDS[name]
+    return [
+        "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+        f"ALTER TABLE {name} ADD COLUMN IF NOT EXISTS search_vector tsvector "
+        f"GENERATED ALWAYS AS (to_tsvector('simple', {document})) STORED",
+        f"CREATE INDEX IF NOT EXISTS ix_{name}_search_vector ON {name} USING GIN (search_vector)",
+        f"CREATE INDEX IF NOT EXISTS ix_{name}_{trigram}_trgm ON {name} USING GIN ({trigram} gin_trgm_ops)",
+    ]
+
+
+def search_index_ddl(dialect: str) -> List[str]:
+    statements = []
+    for name, fields in SEARCH_FIELDS.items():
+        if dialect == "sqlite":
+            statements += _sqlite_ddl(name, fields)
+        elif dialect == "postgresql":
+            statements += _postgres_ddl(name, fields)
+    return statements
+
+
+def drop_search_index_ddl(dialect: str) -> List[str]:
+    statements = []
+    for name in SEARCH_FIELDS:
+        if dialect == "sqlite":
+            statements += [f"DROP TRIGGER IF EXISTS {name}_fts_{t}" for t in ("ai", "ad", "au")]
+            statements.append(f"DROP TABLE IF EXISTS {name}_fts")
+        elif dialect == "postgresql":
+            statements += [
+                f"DROP INDEX IF EXISTS ix_{name}_{TRIGRAM_FIELDS[name]}_trgm",
+                f"DROP INDEX IF EXISTS ix_{name}_search_vector",
+                f"ALTER TABLE {name} DROP COLUMN IF EXISTS search_vector",
+            ]
+    return statements
+
+
+def install_search_indexes(engine):
+    """Tạo bảng FTS5 cho SQLite local (idempotent), rebuild nếu bảng FTS mới được tạo.
+
+    Chỉ dùng cho SQLite (không chạy migration). Trên Postgres index full-text do
+    migration c3f1d2a9b8e4 tạo: DDL lúc khởi động sẽ giữ khóa ACCESS EXCLUSIVE trên
+    books/members ở mỗi lần import app (mỗi cold start serverless).
+    """
+    if engine.dialect.name != "sqlite":
+        return
+    with engine.begin() as conn:
+        existing = dict(conn.execute(
+            text("SELECT name, sql FROM sqlite_master WHERE type = 'table'")
+        ).all())
+        # Bảng FTS tạo với cấu hình index tiền tố cũ: tạo lại
+        outdated = [
+            name for name in SEARCH_FIELDS
+            if f"{name}_fts" in existing and f"prefix='{FTS_PREFIXES}'" not in existing[f"{name}_fts"]
+        ]
+        for name in outdated:
+            conn.execute(text(f"DROP TABLE {name}_fts"))
+        missing = [name for name in SEARCH_FIELDS if f"{name}_fts" not in existing or name in outdated]
+
+        for statement in search_index_ddl("sqlite"):
+            conn.execute(text(statement))
+
+        # Bảng FTS5 external-content cần rebuild một lần cho các dòng có sẵn
+        for name in missing:
+            conn.execute(text(f"INSERT INTO {name}_fts({name}_fts) VALUES ('rebuild')"))
+
+
+def _tokens(q: str) -> List[str]:
+    # Gộp ISBN dạng "978-0-13..." thành một token số liền
+    q = re.sub(r"(?<=\d)[-\s](?=\d)", "", q)
+    return re.findall(r"\w+", q)
+
+
+def apply_search(query, model, q: str, dialect: str):
+    """Lọc `query` theo từ khóa bằng index full-text.
+
+    Mỗi từ được so khớp theo tiền tố (gõ "clea" ra "Clean Code"). Trả về
+    (query, rank, id_column): `rank` là biểu thức sắp xếp theo độ liên quan
+    (tăng dần), hoặc None nếu dialect không có index full-text và phải dùng
+    ILIKE; `id_column` là cột dùng để duyệt theo id giảm dần.
+    """
+    name = model.__tablename__
+    fields = [getattr(model, f) for f in SEARCH_FIELDS[name]]
+    tokens = _tokens(q)
+
+    if dialect == "sqlite" and tokens:
+        fts = _fts(name)
+        query = query.join(fts, fts.c.rowid == model.id).filter(_match(name, tokens))
+        # Sắp theo rowid của bảng FTS (không phải model.id): FTS5 duyệt doclist ngược
+        # và dừng sau LIMIT thay vì sắp xếp mọi dòng khớp
+        return query, fts.c.rank, fts.c.rowid
+
+    if dialect == "postgresql" and tokens:
+        vector = literal_column(f"{name}.search_vector")
+        tsquery = func.to_tsquery("simple", " & ".join(f"{t}:*" for t in tokens))
+        substring = getattr(model, TRIGRAM_FIELDS[name])
+        query = query.filter(
+            or_(vector.op("@@")(tsquery), substring.ilike(f"%{''.join(tokens)}%"))
+        )
+        return query, func.ts_rank(vector, tsquery).desc(), model.id
+
+    search = f"%{q}%"
+    return query.filter(or_(*[f.ilike(search) for f in fields])), None, model.id
+
+
+def _fts(name: str):
+    return table(f"{name}_fts", column("rowid"), column("rank"))
+
+
+def _match(name: str, tokens: List[str]):
+    return literal_column(f"{name}_fts").op("MATCH")(" ".join(f'"{t}"*' for t in tokens))
+
+
+async def _rankable(db: AsyncSession, model, q: str) -> bool:
+    """SQLite: số dòng khớp không quá RANK_LIMIT (đếm tới RANK_LIMIT + 1 rồi dừng)."""
+    name = model.__tablename__
+    matches = select(_fts(name).c.rowid).where(_match(name, _tokens(q))).limit(RANK_LIMIT + 1)
+    return await db.scalar(select(func.count()).select_from(matches.subquery())) <= RANK_LIMIT
+
+
+async def search_page(
+    db: AsyncSession,
+    query: Select,
+    model,
+    q: str,
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+) -> List[Dict]:
+    """Một trang kết quả tìm kiếm của `query` (select theo cột, cột id có nhãn `id`).
+
+    Không có cursor hoặc cursor offset: xếp theo độ liên quan (`paginate_ranked`).
+    Cursor id, dialect không có index full-text, từ khóa dài nhất ngắn hơn
+    RANK_MIN_LENGTH, hoặc SQLite có quá RANK_LIMIT dòng khớp: theo id giảm dần như
+    danh sách thường.
+    """
+    dialect = db.get_bind().dialect.name
+    query, rank, id_column = apply_search(query, model, q, dialect)
+    offset = decode_offset_cursor(cursor) if cursor else skip
+    if rank is not None and offset is not None:
+        if max(map(len, _tokens(q))) >= RANK_MIN_LENGTH and (
+            dialect != "sqlite" or await _rankable(db, model, q)
+        ):
+            return await paginate_ranked(db, query.order_by(rank, id_column.desc()), response, offset, limit)
+        skip, cursor = offset, None
+    return await paginate_mappings(db, query, id_column, response, skip=skip, limit=limit, cursor=cursor)
@@ -0,0 +1,105 @@
+"""Chế độ SQLite cho production (`SQLITE_TUNED`, mặc định bật).
+
+- Pragma cho mỗi kết nối (event `connect`): WAL, synchronous=NORMAL, busy_timeout,
+  cache_size, mmap_size. Với WAL, reader không chặn writer và ngược lại.
+- Hàng đợi một writer: mọi câu ghi đi qua engine writer có pool đúng một kết nối,
+  nên các transaction ghi trong process xếp hàng ở pool (có timeout, có số liệu ở
+  `/health/db/pool`) thay vì tranh nhau khóa file và gặp "database is locked".
+  Transaction ghi mở bằng `BEGIN IMMEDIATE` để process khác (CLI, worker uvicorn
+  khác) chờ theo busy_timeout thay vì lỗi khi nâng khóa đọc lên khóa ghi.
+- Câu đọc đi qua engine reader với nhiều kết nối (mỗi kết nối aiosqlite một thread).
+
+`RoutingSession` chọn engine: flush ORM và INSERT/UPDATE/DELETE đi writer; từ câu ghi
+đầu tiên tới hết transaction, mọi câu (kể cả đọc) dùng writer để đọc được dữ liệu
+vừa ghi. Câu đọc trước đó dùng reader và thấy dữ liệu đã commit mới nhất.
+"""
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.dml import UpdateBase
+
+from app.core.config import settings
+from app.db.pool import InstrumentedQueuePool, PoolStats
+
+_WRITING = "sqlite_writer"
+
+
+class WriterPool(InstrumentedQueuePool):
+    stats = PoolStats()
+
+
+def pragmas():
+    return {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "busy_timeout": settings.SQLITE_BUSY_TIMEOUT_MS,
+        # Số âm: đơn vị KiB
+        "cache_size": -settings.SQLITE_CACHE_SIZE_KB,
+        "mmap_size": settings.SQLITE_MMAP_SIZE,
+    }
+
+
+def apply_pragmas(engine):
+    """Đặt pragma cho mọi kết nối mới của `engine` (sync engine, hoặc `.sync_engine` của async)."""
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas().items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+
+def use_immediate_transactions(engine):
+    """Tự mở transaction bằng BEGIN IMMEDIATE (tắt BEGIN ngầm của driver sqlite3)."""
+    @event.listens_for(engine, "connect")
+    def _disable_implicit_begin(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine, "begin")
+    def _begin_immediate(conn):
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+
+def writer_engine_options():
+    return {
+        "poolclass": WriterPool,
+        "pool_size": 1,
+        "max_overflow": 0,
+        "pool_timeout": settings.SQLITE_WRITER_TIMEOUT,
+    }
+
+
+def reader_engine_options():
+    return {
+        "poolclass": InstrumentedQueuePool,
+        "pool_size": settings.SQLITE_READ_POOL_SIZE,
+        "max_overflow": 0,
+    }
+
+
+class RoutingSession(Session):
+    # Sync engine của writer, gán trong database.py khi bật SQLITE_TUNED
+    writer = None
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if self.writer is not None and (
+            self.info.get(_WRITING) or self._flushing or isinstance(clause, UpdateBase)
+        ):
+            self.info[_WRITING] = True
+            return self.writer
+        return super().get_bind(mapper, clause=clause, **kw)
+
+
+def begin_write(session):
+    """Đưa mọi câu còn lại của transaction (kể cả câu đọc đầu tiên) qua writer.
+
+    Dùng khi phải đọc rồi mới quyết định ghi (vd. đếm giới hạn mượn): SQLite bỏ qua
+    FOR UPDATE, nên khóa ghi (BEGIN IMMEDIATE của writer) phải có trước câu đọc.
+    Không có tác dụng trên Postgres (dùng FOR UPDATE như bình thường).
+    """
+    session.info[_WRITING] = True
+
+
+@event.listens_for(RoutingSession, "after_transaction_end")
+def _release_writer(session, transaction):
+    if transaction.parent is None:
+        session.info.pop(_WRITING, None)
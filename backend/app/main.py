@@ -1,25 +1,72 @@
 from fastapi import FastAPI, Depends
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
 from dotenv import load_dotenv
+from contextlib import asynccontextmanager
+import asyncio
 import os
 
 from app.core.config import settings
-from app.db.database import get_db, engine, Base
-from app.routers import books, members, loans, analytics, reservations
+from app.core.etag import ConditionalGetMiddleware
+from app.core.pagination import NEXT_CURSOR_HEADER
+from app.db.database import get_db, engine, async_engine, writer_engine, Base, AsyncSessionLocal
+from app.db.pool import pool_status
+from app.db.search import install_search_indexes
+from app.routers import books, members, loans, analytics, reservations, jobs
+from app.services import blobs, book_cache, events, thumbnails
+from app.services.dashboard import counters
+from app.services.overdue import run_nightly
+from app.storage import PRIVATE_FOLDERS, ImmutableStaticFiles, close_http_client
 
 load_dotenv()
 
 Base.metadata.create_all(bind=engine)
+# Chỉ SQLite local: bảng FTS5; index full-text trên Postgres do Alembic tạo
+install_search_indexes(engine)
 
-app = FastAPI(title=settings.PROJECT_NAME)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Job nền: đối soát bộ đếm dashboard, dọn blob không còn tham chiếu, đánh dấu quá hạn,
+    # xử lý sự kiện outbox (giữ sách cho người đặt trước khi có bản được trả)
+    tasks = [
+        asyncio.create_task(counters.run_periodic(AsyncSessionLocal)),
+        asyncio.create_task(blobs.run_gc(AsyncSessionLocal)),
+        asyncio.create_task(run_nightly(AsyncSessionLocal)),
+        asyncio.create_task(events.run_worker(AsyncSessionLocal)),
+    ]
+    # Tạo thumbnail ảnh bìa (chỉ khi đã cài Pillow)
+    if thumbnails.available():
+        tasks.append(asyncio.create_task(thumbnails.run_worker(AsyncSessionLocal)))
+    yield
+    # Chờ các task dừng hẳn (trả kết nối về pool) rồi mới đóng engine, khi event loop
+    # còn chạy: kết nối aiosqlite bị bỏ lại sẽ bị đóng muộn trên loop đã tắt
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    for db_engine in (async_engine, writer_engine):
+        if db_engine is not None:
+            await db_engine.dispose()
+    await close_http_client()
 
-UPLOAD_DIR = "uploaded_books"
+app = FastAPI(title=settings.PROJECT_NAME, lifespan=lifespan)
+
+UPLOAD_DIR = settings.UPLOAD_DIR
 if not os.path.exists(UPLOAD_DIR):
     os.makedirs(UPLOAD_DIR)
-app.mount("/uploaded_books", StaticFiles(directory=UPLOAD_DIR), name="uploaded_books")
+app.mount(f"/{UPLOAD_DIR}", ImmutableStaticFiles(directory=UPLOAD_DIR, private_dirs=PRIVATE_FOLDERS), name="uploaded_books")
+
+# Danh sách -> các bảng mà dữ liệu trả về phụ thuộc (cho ETag/304)
+app.add_middleware(
+    ConditionalGetMiddleware,
+    resources={
+        "/books/": ("books",),
+        "/members/": ("members",),
+        "/members/summary": ("members", "loans", "fines"),
+        "/loans/": ("loans", "books", "members", "fines"),
+        "/reservations/": ("reservations", "books", "members"),
+    },
+)
 
 app.add_middleware(
     CORSMiddleware,
@@ -27,6 +74,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, "ETag", "Last-Modified"],
 )
 
 app.include_router(books.router)
@@ -34,15 +82,34 @@ app.include_router(members.router)
 app.include_router(loans.router)
 app.include_router(analytics.router)
 app.include_router(reservations.router)
+app.include_router(jobs.router)
 
 @app.get("/")
 def read_root():
     return {"message": "Welcome to Library Manager API", "status": "ready"}
 
 @app.get("/health/db")
-def test_db_connection(db: Session = Depends(get_db)):
+async def test_db_connection(db: AsyncSession = Depends(get_db)):
     try:
-        db.execute(text("SELECT 1"))
+        await db.execute(text("SELECT 1"))
         return {"database": "connected", "status": "healthy"}
     except Exception as e:
-        return {"database": "disconnected", "error": str(e)}
\ No newline at end of file
+        return {"database": "disconnected", "error": str(e)}
+
+@app.get("/health/db/pool")
+def db_pool_status():
+    """Trạng thái pool kết nối async: đang mượn, overflow, thời gian chờ checkout."""
+    status = pool_status(async_engine)
+    # SQLite tuned: hàng đợi ghi là pool một kết nối riêng
+    if writer_engine is not None:
+        status["writer"] = pool_status(writer_engine)
+    return status
+
+@app.get("/health/outbox")
+async def outbox_status(db: AsyncSession = Depends(get_db)):
+    """Sự kiện outbox đang chờ, đang chờ thử lại và dead-letter (đã lỗi quá số lần cho phép)."""
+    return await events.dead_letters(db)
+
+@app.get("/health/cache")
+def cache_stats():
+    return book_cache.stats()
@@ -1,6 +1,6 @@
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, Date, Numeric, CheckConstraint
-from sqlalchemy.orm import relationship
-from sqlalchemy.sql import func
+from sqlalchemy import and_, or_, Column, Integer, String, Boolean, ForeignKey, Date, DateTime, Numeric, CheckConstraint, Index, JSON
+from sqlalchemy.orm import relationship, column_property
+from sqlalchemy.sql import func, text
 from app.db.database import Base
 import enum
 
@@ -11,16 +11,32 @@ class BookStatus(str, enum.Enum):
 class LoanStatus(str, enum.Enum):
     ACTIVE = "active"
     RETURNED = "returned"
+    # Do job overdue (app/services/overdue.py) đặt cho loan quá hạn chưa trả
     OVERDUE = "overdue"
 
+# Loan chưa trả (sách vẫn đang ở chỗ thành viên)
+OPEN_LOAN_STATUSES = (LoanStatus.ACTIVE, LoanStatus.OVERDUE)
+
+class ReservationStatus(str, enum.Enum):
+    PENDING = "pending"
+    # Đã giữ một bản sách cho thành viên tới `hold_expires_at`
+    HELD = "held"
+    FULFILLED = "fulfilled"
+    EXPIRED = "expired"
+
 class FineStatus(str, enum.Enum):
     PENDING = "pending"
     PAID = "paid"
 
+class ImportStatus(str, enum.Enum):
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
 class Member(Base):
     __tablename__ = "members"
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     email = Column(String, unique=True, index=True, nullable=False)
     full_name = Column(String, nullable=False)
     phone = Column(String, nullable=True)
@@ -33,7 +49,7 @@ class Member(Base):
 class Book(Base):
     __tablename__ = "books"
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     title = Column(String, index=True, nullable=False)
     author = Column(String, index=True, nullable=False)
     edition = Column(String, nullable=True)
@@ -41,9 +57,19 @@ class Book(Base):
     isbn = Column(String, unique=True, index=True, nullable=False)
     total_copies = Column(Integer, default=1, nullable=False)
     available_copies = Column(Integer, default=1, nullable=False)
+    # Tổng số lượt mượn từ trước tới nay, được borrow cập nhật (leaderboard)
+    total_loans = Column(Integer, default=0, server_default="0", nullable=False, index=True)
     
     file_path = Column(String, nullable=True)
+    # Response chỉ cho biết có PDF hay không; file đọc qua /books/{id}/content
+    has_file = column_property(file_path.isnot(None))
     image_path = Column(String, nullable=True)
+    # {"small": {"webp": url, "jpeg": url}, "medium": ..., "large": ...}
+    # NULL = chưa xử lý, {} = không tạo được thumbnail (ảnh gốc lỗi/không có)
+    cover_thumbnails = Column(JSON, nullable=True)
+    # Số lần tạo thumbnail lỗi tạm thời liên tiếp và thời điểm được thử lại
+    thumbnail_attempts = Column(Integer, default=0, server_default="0", nullable=False)
+    thumbnail_retry_at = Column(DateTime, nullable=True)
 
     __table_args__ = (
         CheckConstraint('available_copies >= 0', name='check_available_copies_positive'),
@@ -56,7 +82,7 @@ class Book(Base):
 class Loan(Base):
     __tablename__ = "loans"
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     member_id = Column(Integer, ForeignKey("members.id"), nullable=False)
     book_id = Column(Integer, ForeignKey("books.id", ondelete="SET NULL"), nullable=True)
     loan_date = Column(Date, server_default=func.current_date(), nullable=False)
@@ -66,30 +92,159 @@ class Loan(Base):
 
     __table_args__ = (
         CheckConstraint('due_date >= loan_date', name='check_due_date_valid'),
+        # Đếm loan đang mượn của member (giới hạn mượn)
+        Index("ix_loans_member_id_status", "member_id", "status"),
+        # delete_book, check_loan_access
+        Index("ix_loans_book_id_status", "book_id", "status"),
+        # Đếm/liệt kê loan theo trạng thái (dashboard, overdue-list theo hạn trả)
+        Index("ix_loans_status_due_date", "status", "due_date"),
+        # Loan quá hạn: chỉ index các loan chưa trả
+        Index(
+            "ix_loans_open_due_date", "due_date",
+            postgresql_where=text("return_date IS NULL"),
+            sqlite_where=text("return_date IS NULL"),
+        ),
     )
 
     member = relationship("Member", back_populates="loans")
     book = relationship("Book", back_populates="loans")
     fines = relationship("Fine", back_populates="loan")
 
+def loan_is_overdue(today):
+    """Điều kiện SQL: loan quá hạn tính tới `today`.
+
+    Không chỉ dựa vào trạng thái OVERDUE do job hằng đêm đặt: loan ACTIVE đã qua
+    hạn trả cũng tính là quá hạn, kể cả khi job chưa chạy (vd. trên serverless).
+    """
+    return or_(
+        Loan.status == LoanStatus.OVERDUE,
+        and_(Loan.status == LoanStatus.ACTIVE, Loan.due_date < today),
+    )
+
 class Reservation(Base):
     __tablename__ = "reservations"
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     member_id = Column(Integer, ForeignKey("members.id"), nullable=False)
     book_id = Column(Integer, ForeignKey("books.id"), nullable=False)
     reservation_date = Column(Date, server_default=func.current_date())
-    status = Column(String, default="pending")
+    status = Column(String, default=ReservationStatus.PENDING)
+    hold_expires_at = Column(Date, nullable=True)
+
+    __table_args__ = (
+        Index("ix_reservations_book_id_member_id_status", "book_id", "member_id", "status"),
+        # Lọc danh sách đặt trước theo thành viên
+        Index("ix_reservations_member_id_status", "member_id", "status"),
+        # Hàng đợi của từng sách: người kế tiếp = phần tử đầu của index
+        Index(
+            "ix_reservations_pending_queue", "book_id", "reservation_date", "id",
+            postgresql_where=text("status = 'pending'"),
+            sqlite_where=text("status = 'pending'"),
+        ),
+        # Tìm các lượt giữ sách đã hết hạn
+        Index(
+            "ix_reservations_held_expiry", "hold_expires_at",
+            postgresql_where=text("status = 'held'"),
+            sqlite_where=text("status = 'held'"),
+        ),
+    )
 
     member = relationship("Member", back_populates="reservations")
     book = relationship("Book", back_populates="reservations")
 
+class BookLoanDaily(Base):
+    """Số lượt mượn của một cuốn sách trong một ngày (cho leaderboard theo khoảng thời gian)."""
+    __tablename__ = "book_loan_daily"
+
+    book_id = Column(Integer, ForeignKey("books.id", ondelete="CASCADE"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    loans = Column(Integer, default=0, nullable=False)
+
+    __table_args__ = (
+        Index("ix_book_loan_daily_day", "day"),
+    )
+
 class Fine(Base):
     __tablename__ = "fines"
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     loan_id = Column(Integer, ForeignKey("loans.id"), nullable=False)
     amount = Column(Numeric(10, 2), nullable=False)
     status = Column(String, default=FineStatus.PENDING, nullable=False)
 
-    loan = relationship("Loan", back_populates="fines")
\ No newline at end of file
+    __table_args__ = (
+        Index("ix_fines_loan_id", "loan_id"),
+        # SUM(amount) theo status đọc thẳng từ index
+        Index("ix_fines_status_amount", "status", "amount"),
+    )
+
+    loan = relationship("Loan", back_populates="fines")
+
+class ImportJob(Base):
+    __tablename__ = "import_jobs"
+
+    id = Column(Integer, primary_key=True)
+    filename = Column(String, nullable=False)
+    status = Column(String, default=ImportStatus.RUNNING, nullable=False)
+    # Số bản ghi đã xử lý xong (đã commit) - dùng để resume
+    processed_rows = Column(Integer, default=0, nullable=False)
+    inserted = Column(Integer, default=0, nullable=False)
+    skipped = Column(Integer, default=0, nullable=False)
+    failed = Column(Integer, default=0, nullable=False)
+    last_error = Column(String, nullable=True)
+    started_at = Column(DateTime, server_default=func.now())
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+class Blob(Base):
+    """File đã upload lên storage, định danh theo SHA-256 nội dung.
+
+    `ref_count` đếm số cột (books.file_path, image_path, cover_thumbnails) đang
+    trỏ tới `url`. Khi về 0, `released_at` được ghi lại và job GC xóa blob sau
+    một khoảng ân hạn. `deleting_at`: lúc GC nhận xóa object trên storage (dòng
+    bị xóa sau khi xóa object xong).
+    """
+    __tablename__ = "blobs"
+
+    digest = Column(String(64), primary_key=True)
+    key = Column(String, nullable=False)
+    url = Column(String, unique=True, nullable=False)
+    size = Column(Integer, nullable=False)
+    content_type = Column(String, nullable=True)
+    ref_count = Column(Integer, default=0, nullable=False)
+    released_at = Column(DateTime, nullable=True, index=True)
+    deleting_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, server_default=func.now())
+
+class OutboxEvent(Base):
+    """Sự kiện nội bộ, ghi cùng transaction với thay đổi phát sinh ra nó.
+
+    Worker trong app/services/events.py đọc các sự kiện chưa xử lý theo thứ tự
+    id, gọi handler theo `topic` rồi ghi `processed_at`. Sự kiện lỗi được thử lại
+    từ `next_attempt_at`; lỗi quá số lần cho phép thì ghi `dead_at` (dead-letter).
+    """
+    __tablename__ = "outbox_events"
+
+    id = Column(Integer, primary_key=True)
+    topic = Column(String, nullable=False)
+    payload = Column(JSON, nullable=False)
+    attempts = Column(Integer, default=0, nullable=False)
+    last_error = Column(String, nullable=True)
+    next_attempt_at = Column(DateTime, nullable=True)
+    dead_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, server_default=func.now())
+    processed_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        # Hàng đợi: chỉ index các sự kiện chưa xử lý
+        Index(
+            "ix_outbox_events_unprocessed", "id",
+            postgresql_where=text("processed_at IS NULL"),
+            sqlite_where=text("processed_at IS NULL"),
+        ),
+        # Dead-letter: ít dòng, tra cứu qua /health/outbox
+        Index(
+            "ix_outbox_events_dead", "id",
+            postgresql_where=text("dead_at IS NOT NULL"),
+            sqlite_where=text("dead_at IS NOT NULL"),
+        ),
+    )
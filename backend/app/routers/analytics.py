@@ -1,11 +1,17 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import func, desc, and_
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, func, tuple_
 from datetime import date
-from typing import List, Any
+from typing import AsyncIterator, Dict, List, Any, Optional
 
 from app.db.database import get_db
-from app.models import Book, Member, Loan, LoanStatus, Fine
+from app.models import Loan, Member, Book, loan_is_overdue
+from app.core.pagination import NEXT_CURSOR_HEADER, encode_keyset_cursor, decode_keyset_cursor
+from app.core.streaming import ExportFormat, stream_rows
+from app.services import leaderboard
+from app.services.dashboard import counters
+from app.services.leaderboard import LeaderboardWindow
+from app.services.overdue import FINE_PER_DAY, days_overdue
 
 router = APIRouter(
     prefix="/analytics",
@@ -13,40 +19,17 @@ router = APIRouter(
 )
 
 @router.get("/dashboard")
-def get_dashboard_stats(db: Session = Depends(get_db)):
-    total_books = db.query(Book).count()
-    total_members = db.query(Member).count()
-    
-    active_loans = db.query(Loan).filter(
-        Loan.status == LoanStatus.ACTIVE
-    ).count()
-
-    overdue_loans = db.query(Loan).filter(
-        and_(
-            Loan.return_date == None,
-            Loan.due_date < date.today()
-        )
-    ).count()
-
-    pending_fines = db.query(func.sum(Fine.amount)).filter(
-        Fine.status == "pending"
-    ).scalar() or 0
-
-    return {
-        "total_books": total_books,
-        "total_members": total_members,
-        "active_loans": active_loans,
-        "overdue_loans": overdue_loans,
-        "pending_fines": float(pending_fines)
-    }
+async def get_dashboard_stats(db: AsyncSession = Depends(get_db)):
+    # Đọc từ bộ đếm trong bộ nhớ; độ trễ tối đa xem app/services/dashboard.py
+    return await counters.snapshot(db)
 
 @router.get("/top-books")
-def get_top_books(limit: int = 5, db: Session = Depends(get_db)):
-    
-    results = db.query(
-        Book, 
-        func.count(Loan.id).label('total_loans')
-    ).join(Loan).group_by(Book.id).order_by(desc('total_loans')).limit(limit).all()
+async def get_top_books(
+    limit: int = 5,
+    window: LeaderboardWindow = LeaderboardWindow.ALL,
+    db: AsyncSession = Depends(get_db)
+):
+    results = await leaderboard.top_books(db, window, limit)
 
     response = []
     for book, count in results:
@@ -55,36 +38,75 @@ def get_top_books(limit: int = 5, db: Session = Depends(get_db)):
             "author": book.author,
             "isbn": book.isbn,
             "total_loans": count,
-            "available_copies": book.available_copies
+            "available_copies": book.available_copies,
+            "image_path": book.image_path,
+            "cover_thumbnails": book.cover_thumbnails
         })
     
     return response
 
+OVERDUE_COLUMNS = (
+    "loan_id", "member_name", "member_email", "book_title", "due_date", "days_overdue", "estimated_fine",
+)
+OVERDUE_PAGE_SIZE = 100
+
+
+async def _iterate(rows) -> AsyncIterator[Dict]:
+    for row in rows:
+        yield dict(row)
+
+
+async def _stream(db: AsyncSession, stmt) -> AsyncIterator[Dict]:
+    # Đọc theo lô từ cursor phía server, không load hết kết quả vào bộ nhớ
+    result = await db.stream(stmt.execution_options(yield_per=1000))
+    async for row in result.mappings():
+        yield dict(row)
+
+
 @router.get("/overdue-list")
-def get_overdue_loans_detail(db: Session = Depends(get_db)):
+async def get_overdue_loans_detail(
+    format: ExportFormat = ExportFormat.JSON,
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_db)
+):
+    """Loan quá hạn, trễ lâu nhất trước; số ngày trễ và tiền phạt tính trong SQL.
+
+    JSON trả từng trang (mặc định 100 bản ghi, cursor trang sau ở X-Next-Cursor).
+    NDJSON/CSV không truyền `limit` thì stream toàn bộ danh sách (xuất file).
+    """
     today = date.today()
-    
-    overdue_loans = db.query(Loan).options(
-        joinedload(Loan.book),
-        joinedload(Loan.member)
-    ).filter(
-        and_(
-            Loan.return_date == None,
-            Loan.due_date < today
+    days = days_overdue(db, today)
+    stmt = (
+        select(
+            Loan.id.label("loan_id"),
+            Member.full_name.label("member_name"),
+            Member.email.label("member_email"),
+            func.coalesce(Book.title, "Unknown Book").label("book_title"),
+            Loan.due_date,
+            days.label("days_overdue"),
+            (days * FINE_PER_DAY).label("estimated_fine"),
         )
-    ).all()
+        .join(Member, Member.id == Loan.member_id)
+        .outerjoin(Book, Book.id == Loan.book_id)
+        .where(loan_is_overdue(today))
+        .order_by(Loan.due_date, Loan.id)
+    )
+    if cursor:
+        try:
+            due_date, loan_id = decode_keyset_cursor(cursor)
+            stmt = stmt.where(tuple_(Loan.due_date, Loan.id) > (date.fromisoformat(due_date), int(loan_id)))
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    if limit is None and format == ExportFormat.JSON:
+        limit = OVERDUE_PAGE_SIZE
 
-    response = []
-    for loan in overdue_loans:
-        days_overdue = (today - loan.due_date).days
-        response.append({
-            "loan_id": loan.id,
-            "member_name": loan.member.full_name,
-            "member_email": loan.member.email,
-            "book_title": loan.book.title if loan.book else "Unknown Book",
-            "due_date": loan.due_date,
-            "days_overdue": days_overdue,
-            "estimated_fine": days_overdue * 5000
-        })
-        
-    return response
\ No newline at end of file
+    headers = {}
+    if limit is None:
+        rows = _stream(db, stmt)
+    else:
+        page = (await db.execute(stmt.limit(limit))).mappings().all()
+        if len(page) == limit:
+            headers[NEXT_CURSOR_HEADER] = encode_keyset_cursor(page[-1]["due_date"], page[-1]["loan_id"])
+        rows = _iterate(page)
+    return stream_rows(rows, format, OVERDUE_COLUMNS, "overdue-loans", headers)
@@ -1,16 +1,20 @@
-import os
-import uuid
+import json
 from typing import List, Optional
-from fastapi.concurrency import run_in_threadpool
-from fastapi import APIRouter, Depends, HTTPException, status, File, UploadFile, Form
-from sqlalchemy.orm import Session
-from sqlalchemy import or_
-from supabase import create_client, Client
+from fastapi import APIRouter, Depends, HTTPException, status, File, UploadFile, Form, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.db.database import get_db
-from app.models import Book, Loan, LoanStatus
+from app.db.search import search_page
+from app.models import Book, Loan, ImportJob, OPEN_LOAN_STATUSES
 from app.schemas import BookResponse
-from app.core.config import settings
+from app.core import content_tokens, fastjson
+from app.core.fastjson import schema_columns
+from app.core.pagination import paginate_mappings, NEXT_CURSOR_HEADER
+from app.services import blobs, book_import, book_cache, thumbnails
+from app.services.dashboard import counters
+from app.storage.serve import serve_file
 
 router = APIRouter(
     prefix="/books",
@@ -18,52 +22,126 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
-# --- CẤU HÌNH SUPABASE TỪ SETTINGS ---
-SUPABASE_URL = settings.SUPABASE_URL
-SUPABASE_KEY = settings.SUPABASE_KEY
-BUCKET_NAME = "library-files"
-
-# Khởi tạo Client an toàn
-supabase: Optional[Client] = None
-if SUPABASE_URL and SUPABASE_KEY:
-    try:
-        supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
-    except Exception as e:
-        print(f"Supabase Init Error: {e}")
-
-@router.get("/", response_model=List[BookResponse])
-def read_books(
+@router.get("/", responses={200: {"model": List[BookResponse]}})
+async def read_books(
+    response: Response,
     skip: int = 0, 
     limit: int = 100, 
     q: Optional[str] = None, 
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_db)
 ):
-    query = db.query(Book)
+    params = {"q": q, "skip": skip, "limit": limit, "cursor": cursor}
+    cached = await book_cache.get_page(params)
+    if cached:
+        body, next_cursor = cached
+        return _json_page(body, next_cursor)
+
+    generation = await book_cache.generation()
+    # Chỉ các cột của BookResponse, serialize thẳng từ dòng kết quả (app/core/fastjson.py)
+    query = select(*schema_columns(Book, BookResponse))
     if q:
-        search = f"%{q}%"
-        query = query.filter(
-            or_(
-                Book.title.ilike(search),
-                Book.author.ilike(search),
-                Book.isbn.ilike(search)
-            )
-        )
-    return query.order_by(Book.id.desc()).offset(skip).limit(limit).all()
+        # Tìm kiếm xếp theo độ liên quan; trang sau dùng cursor offset (cursor id vẫn duyệt theo id)
+        rows = await search_page(db, query, Book, q, response, skip=skip, limit=limit, cursor=cursor)
+    else:
+        rows = await paginate_mappings(db, query, Book.id, response, skip=skip, limit=limit, cursor=cursor)
+
+    body = fastjson.dumps(rows)
+    next_cursor = response.headers.get(NEXT_CURSOR_HEADER)
+    await book_cache.set_page(params, body, next_cursor, [row["id"] for row in rows], generation)
+    return _json_page(body, next_cursor)
+
+def _json_page(body: bytes, next_cursor: Optional[str]) -> Response:
+    response = Response(content=body, media_type="application/json")
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return response
+
+@router.post("/import")
+async def import_books(
+    file: UploadFile = File(...),
+    job_id: Optional[int] = Form(None),
+    chunk_size: int = Form(book_import.DEFAULT_CHUNK_SIZE, ge=1, le=10000),
+    db: AsyncSession = Depends(get_db)
+):
+    """Import CSV/JSONL; trả về NDJSON tiến độ sau mỗi chunk. Gửi lại `job_id` để resume."""
+    try:
+        fmt = book_import.detect_format(file.filename or "")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if job_id is not None:
+        job = await db.get(ImportJob, job_id)
+        if not job:
+            raise HTTPException(status_code=404, detail="Import job not found")
+    else:
+        job = await book_import.create_job(db, file.filename)
+
+    async def events():
+        records = book_import.iter_records(file.file, fmt)
+        async for event in book_import.run_import(db, job, records, chunk_size):
+            yield json.dumps(event) + "\n"
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+@router.get("/import/{job_id}")
+async def read_import_job(job_id: int, db: AsyncSession = Depends(get_db)):
+    job = await db.get(ImportJob, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    return book_import.progress(job)
 
 @router.get("/{book_id}", response_model=BookResponse)
-def read_book(book_id: int, db: Session = Depends(get_db)):
-    book = db.query(Book).filter(Book.id == book_id).first()
+async def read_book(book_id: int, db: AsyncSession = Depends(get_db)):
+    body = await book_cache.get_book(book_id)
+    if body is None:
+        generation = await book_cache.generation()
+        book = await db.get(Book, book_id)
+        if book is None:
+            raise HTTPException(status_code=404, detail="Book not found")
+        body = book_cache.serialize_book(book)
+        await book_cache.set_book(book_id, body, generation)
+    return Response(content=body, media_type="application/json")
+
+@router.get("/{book_id}/content")
+async def read_book_content(book_id: int, token: str, request: Request, db: AsyncSession = Depends(get_db)):
+    """File PDF của sách cho trình đọc; chỉ thành viên đang mượn sách mới đọc được.
+
+    `token` do `/loans/check-access` cấp (app/core/content_tokens.py); loan vẫn được
+    kiểm tra lại ở mỗi request. Hỗ trợ HTTP Range nên trình đọc PDF tải trang đầu
+    ngay mà không chờ cả file.
+    """
+    member_id = content_tokens.verify(token, book_id)
+    if member_id is None:
+        raise HTTPException(status_code=403, detail="Link đọc sách không hợp lệ hoặc đã hết hạn.")
+
+    book = await db.get(Book, book_id)
     if book is None:
         raise HTTPException(status_code=404, detail="Book not found")
-    return book
+    if not book.file_path:
+        raise HTTPException(status_code=404, detail="Sách này chưa có file PDF để đọc.")
 
-def upload_to_supabase(path: str, file_content: bytes, content_type: str):
-    supabase.storage.from_(BUCKET_NAME).upload(
-        path=path, 
-        file=file_content, 
-        file_options={"content-type": content_type}
+    has_access = await db.scalar(
+        select(Loan.id).where(
+            Loan.book_id == book_id,
+            Loan.member_id == member_id,
+            Loan.status.in_(OPEN_LOAN_STATUSES)
+        ).limit(1)
     )
-    return supabase.storage.from_(BUCKET_NAME).get_public_url(path)
+    if has_access is None:
+        raise HTTPException(status_code=403, detail="Bạn chưa mượn cuốn sách này hoặc đã trả rồi!")
+
+    try:
+        return await serve_file(
+            book.file_path,
+            request,
+            media_type="application/pdf",
+            filename=f"book-{book_id}.pdf",
+            # Chỉ cache ở client (nội dung cần quyền), ngắn hạn để trả sách là hết đọc lại được
+            headers={"Cache-Control": "private, max-age=3600"},
+        )
+    except (ValueError, FileNotFoundError):
+        raise HTTPException(status_code=404, detail="File not found")
 
 @router.post("/", response_model=BookResponse, status_code=status.HTTP_201_CREATED)
 async def create_book(
@@ -75,56 +153,28 @@ async def create_book(
     publication_year: Optional[int] = Form(None),
     file: Optional[UploadFile] = File(None),
     cover_image: Optional[UploadFile] = File(None),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     clean_isbn = isbn.replace("-", "").replace(" ", "")
-    if db.query(Book).filter(Book.isbn == clean_isbn).first():
+    if await db.scalar(select(Book.id).where(Book.isbn == clean_isbn)):
         raise HTTPException(status_code=400, detail=f"Sách với ISBN {clean_isbn} đã tồn tại!")
 
-    if (file or cover_image) and not supabase:
-        raise HTTPException(status_code=500, detail="Server chưa cấu hình Supabase!")
-
-    # 3. Xử lý Upload PDF (Tối ưu hóa với ThreadPool)
-    file_url = None
+    # 3. Băm PDF và ảnh bìa; file trùng nội dung với blob đã có thì không upload lại,
+    # file mới được upload song song, stream từng chunk tới storage
+    uploads = {}
     if file:
-        try:
-            # Đọc file vào RAM (Async)
-            file_content = await file.read()
-            file_ext = file.filename.split(".")[-1]
-            file_name = f"pdfs/{uuid.uuid4()}.{file_ext}"
-            
-            # [OPTIMIZATION] Chạy việc upload nặng trong luồng riêng để không chặn Server
-            print(f"Đang upload PDF {len(file_content)/1024/1024:.2f} MB...")
-            file_url = await run_in_threadpool(
-                upload_to_supabase, 
-                path=file_name, 
-                file_content=file_content, 
-                content_type=file.content_type
-            )
-            print("Upload PDF xong!")
-        except Exception as e:
-            print(f"Lỗi upload PDF: {e}")
-            raise HTTPException(status_code=500, detail=f"Lỗi upload file: {str(e)}")
-
-    # 4. Xử lý Upload Ảnh bìa
-    image_url = None
+        uploads["file"] = await blobs.from_upload(file, "pdfs")
     if cover_image:
-        try:
-            img_content = await cover_image.read()
-            img_ext = cover_image.filename.split(".")[-1]
-            img_name = f"covers/{uuid.uuid4()}.{img_ext}"
-            
-            # [OPTIMIZATION] Chạy upload ảnh trong luồng riêng
-            image_url = await run_in_threadpool(
-                upload_to_supabase,
-                path=img_name,
-                file_content=img_content,
-                content_type=cover_image.content_type
-            )
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Lỗi upload ảnh: {str(e)}")
-    else:
-        image_url = f"https://covers.openlibrary.org/b/isbn/{clean_isbn}-L.jpg"
+        uploads["cover"] = await blobs.from_upload(cover_image, "covers")
+    try:
+        urls = dict(zip(uploads, await blobs.acquire(db, list(uploads.values()))))
+    except Exception as e:
+        print(f"Lỗi upload file: {e}")
+        raise HTTPException(status_code=500, detail=f"Lỗi upload file: {str(e)}")
+
+    file_url = urls.get("file")
+    # 4. Không có ảnh bìa thì dùng ảnh theo ISBN
+    image_url = urls.get("cover", f"https://covers.openlibrary.org/b/isbn/{clean_isbn}-L.jpg")
 
     new_book = Book(
         title=title, author=author, isbn=clean_isbn, total_copies=total_copies,
@@ -133,43 +183,34 @@ async def create_book(
     )
     
     db.add(new_book)
-    db.commit()
-    db.refresh(new_book)
-    return new_book
-    # 5. Lưu vào DB
-    new_book = Book(
-        title=title,
-        author=author,
-        isbn=clean_isbn,
-        total_copies=total_copies,
-        available_copies=total_copies,
-        edition=edition,
-        publication_year=publication_year,
-        file_path=file_url,
-        image_path=image_url
-    )
-    
-    db.add(new_book)
-    db.commit()
-    db.refresh(new_book)
+    await db.commit()
+    counters.adjust(total_books=1)
+    await book_cache.invalidate_books([], catalogue_changed=True)
+    await db.refresh(new_book)
+    thumbnails.enqueue(new_book.id)
     return new_book
 
 @router.delete("/{book_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_book(book_id: int, db: Session = Depends(get_db)):
-    book = db.query(Book).filter(Book.id == book_id).first()
+async def delete_book(book_id: int, db: AsyncSession = Depends(get_db)):
+    book = await db.get(Book, book_id)
     if not book:
         raise HTTPException(status_code=404, detail="Book not found")
 
-    active_loans = db.query(Loan).filter(
-        Loan.book_id == book_id, 
-        Loan.status == LoanStatus.ACTIVE
-    ).count()
+    active_loans = await db.scalar(
+        select(func.count(Loan.id)).where(
+            Loan.book_id == book_id, 
+            Loan.status.in_(OPEN_LOAN_STATUSES)
+        )
+    )
     
     if active_loans > 0:
         raise HTTPException(status_code=400, detail="Không thể xóa sách đang được mượn!")
 
-    db.delete(book)
-    db.commit()
+    await blobs.release(db, [book.file_path, book.image_path, *thumbnails.urls(book.cover_thumbnails)])
+    await db.delete(book)
+    await db.commit()
+    counters.adjust(total_books=-1)
+    await book_cache.invalidate_books([book_id], catalogue_changed=True)
     return
 
 @router.put("/{book_id}", response_model=BookResponse)
@@ -181,9 +222,9 @@ async def update_book(
     total_copies: Optional[int] = Form(None),
     # Nhận file ảnh mới (Optional)
     cover_image: Optional[UploadFile] = File(None),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    book = db.query(Book).filter(Book.id == book_id).first()
+    book = await db.get(Book, book_id)
     if not book:
         raise HTTPException(status_code=404, detail="Book not found")
 
@@ -199,24 +240,22 @@ async def update_book(
         book.available_copies += diff
 
     # Xử lý Upload Ảnh mới (Nếu người dùng chọn ảnh mới)
-    if cover_image and supabase:
+    if cover_image:
         try:
-            img_content = await cover_image.read()
-            img_ext = cover_image.filename.split(".")[-1]
-            img_name = f"covers/{uuid.uuid4()}.{img_ext}"
-
-            # Dùng lại hàm upload_to_supabase đã viết ở trên
-            image_url = await run_in_threadpool(
-                upload_to_supabase,
-                path=img_name,
-                file_content=img_content,
-                content_type=cover_image.content_type
-            )
-            # Cập nhật đường dẫn mới vào DB
+            [image_url] = await blobs.acquire(db, [await blobs.from_upload(cover_image, "covers")])
+            # Cập nhật đường dẫn mới vào DB; ảnh cũ và thumbnail cũ hết hiệu lực
+            await blobs.release(db, [book.image_path, *thumbnails.urls(book.cover_thumbnails)])
             book.image_path = image_url
+            book.cover_thumbnails = None
+            book.thumbnail_attempts = 0
+            book.thumbnail_retry_at = None
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Lỗi upload ảnh cập nhật: {str(e)}")
 
-    db.commit()
-    db.refresh(book)
+    await db.commit()
+    # Đổi tên/tác giả có thể làm cuốn sách khớp với các trang tìm kiếm khác
+    await book_cache.invalidate_books([book_id], catalogue_changed=bool(title or author))
+    await db.refresh(book)
+    if cover_image:
+        thumbnails.enqueue(book_id)
     return book
\ No newline at end of file
@@ -0,0 +1,25 @@
+import secrets
+
+from fastapi import APIRouter, Depends, Header, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+
+from app.core.config import settings
+from app.db.database import get_db
+from app.services.overdue import run_all
+
+router = APIRouter(prefix="/jobs", tags=["Jobs"])
+
+
+def require_cron_secret(authorization: Optional[str] = Header(None)):
+    if not settings.CRON_SECRET:
+        raise HTTPException(status_code=403, detail="Cron jobs are disabled (CRON_SECRET is not set)")
+    if not authorization or not secrets.compare_digest(authorization, f"Bearer {settings.CRON_SECRET}"):
+        raise HTTPException(status_code=401, detail="Invalid cron secret")
+
+
+# Vercel Cron chỉ gọi bằng GET
+@router.get("/nightly", dependencies=[Depends(require_cron_secret)])
+async def run_nightly_job(db: AsyncSession = Depends(get_db)):
+    """Chạy một lượt job hằng đêm (quá hạn, phí phạt, giữ sách, outbox); chạy lại cho cùng kết quả."""
+    return await run_all(db)
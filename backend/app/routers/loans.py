@@ -1,11 +1,28 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session, joinedload
+from fastapi import APIRouter, Depends, HTTPException, status, Response
+from sqlalchemy import select, update, insert, func, bindparam
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, selectinload
 from datetime import timedelta, date
-from typing import List
+from collections import Counter
+from typing import Dict, List, Optional
 
 from app.db.database import get_db
-from app.models import Loan, Book, Member, Fine, LoanStatus, FineStatus
-from app.schemas import LoanCreate, LoanResponse
+from app.db.sqlite import begin_write
+from app.models import (
+    Loan, Book, Member, Fine, Reservation, LoanStatus, FineStatus, ReservationStatus, OPEN_LOAN_STATUSES,
+    loan_is_overdue
+)
+from app.schemas import (
+    LoanCreate, LoanResponse, LoanListItem, LoanBatchCreate, LoanBatchReturn, LoanBatchItem, LoanBatchResponse,
+    BookBrief, MemberBrief
+)
+from app.core import content_tokens
+from app.core.fastjson import list_response, schema_columns, nest
+from app.core.pagination import paginate_mappings
+from app.services import leaderboard, book_cache, events
+from app.services.dashboard import counters
+from app.services.overdue import FINE_PER_DAY
+from app.services.reservations import OPEN_RESERVATION_STATUSES
 
 router = APIRouter(
     prefix="/loans",
@@ -14,36 +31,108 @@ router = APIRouter(
 )
 
 MAX_LOANS_PER_MEMBER = 3
-FINE_PER_DAY = 5000  # Phí phạt 5000đ/ngày
+
+async def _load_loans(db: AsyncSession, loan_ids: List[int]) -> Dict[int, Loan]:
+    # Load lại loan kèm quan hệ cho LoanResponse (async không cho phép lazy-load)
+    if not loan_ids:
+        return {}
+    result = await db.execute(
+        select(Loan).where(Loan.id.in_(loan_ids)).options(
+            joinedload(Loan.book),
+            joinedload(Loan.member),
+            selectinload(Loan.fines)
+        ).execution_options(populate_existing=True)
+    )
+    return {loan.id: loan for loan in result.scalars()}
+
+async def _load_loan(db: AsyncSession, loan_id: int) -> Loan:
+    return (await _load_loans(db, [loan_id]))[loan_id]
+
+def _batch_response(results: List[LoanBatchItem]) -> LoanBatchResponse:
+    succeeded = sum(1 for item in results if item.success)
+    return LoanBatchResponse(succeeded=succeeded, failed=len(results) - succeeded, results=results)
 
 @router.post("/borrow", response_model=LoanResponse, status_code=status.HTTP_201_CREATED)
-def borrow_book(loan_in: LoanCreate, db: Session = Depends(get_db)):
-    book = db.query(Book).filter(Book.id == loan_in.book_id).first()
-    if not book:
-        raise HTTPException(status_code=404, detail="Book not found")
-    if book.available_copies < 1:
-        raise HTTPException(status_code=400, detail="Book is out of stock")
-
-    member = db.query(Member).filter(Member.id == loan_in.member_id).first()
-    if not member:
-        raise HTTPException(status_code=404, detail="Member not found")
-    if not member.is_active:
-         raise HTTPException(status_code=400, detail="Member is not active")
-
-    active_loans_count = db.query(Loan).filter(
-        Loan.member_id == loan_in.member_id,
-        Loan.status == LoanStatus.ACTIVE
-    ).count()
-    
-    if active_loans_count >= MAX_LOANS_PER_MEMBER:
-        raise HTTPException(
-            status_code=400, 
-            detail=f"Member has reached the limit of {MAX_LOANS_PER_MEMBER} active loans"
+async def borrow_book(loan_in: LoanCreate, db: AsyncSession = Depends(get_db)):
+    try:
+        # Từ chối sớm khi sách hết hàng (đọc không khóa): khi hàng nghìn người cùng mượn
+        # một cuốn, phần lớn request trả 400 mà không phải xếp hàng chờ khóa ghi.
+        # Bản đang giữ cho thành viên đã trừ kho nên vẫn đi tiếp. Kho còn hàng ở đây
+        # chưa phải cam kết: UPDATE có điều kiện bên dưới mới quyết định.
+        in_stock = (await db.execute(
+            select(
+                Book.available_copies > 0,
+                select(Reservation.id).where(
+                    Reservation.book_id == loan_in.book_id,
+                    Reservation.member_id == loan_in.member_id,
+                    Reservation.status == ReservationStatus.HELD
+                ).exists()
+            ).where(Book.id == loan_in.book_id)
+        )).first()
+        if in_stock is not None and not any(in_stock):
+            raise HTTPException(status_code=400, detail="Book is out of stock")
+        # Trả kết nối đọc trước khi chờ writer; phần còn lại chạy trọn trên writer
+        # (SQLite) để request đang xếp hàng không giữ chỗ trong pool reader
+        await db.rollback()
+        begin_write(db)
+
+        # Thứ tự khóa chung cho mọi đường mượn/trả/giữ sách: member -> reservation ->
+        # book (theo id tăng dần). Mượn lẻ và mượn theo lô song song cho cùng member /
+        # cùng sách chờ nhau thay vì deadlock trên Postgres.
+        # FOR UPDATE trên member để các lượt mượn song song của cùng một người
+        # không cùng vượt qua bước đếm giới hạn
+        member = await db.scalar(
+            select(Member).where(Member.id == loan_in.member_id).with_for_update()
         )
+        if not member:
+            raise HTTPException(status_code=404, detail="Member not found")
+        if not member.is_active:
+             raise HTTPException(status_code=400, detail="Member is not active")
 
-    try:
-        book.available_copies -= 1
+        # Trừ kho bằng một UPDATE có điều kiện (atomic) thay vì đọc-sửa-ghi trong Python:
+        # hai request mượn cùng lúc không thể cùng lấy cuốn cuối cùng.
+        # Reservation của thành viên cho cuốn này được đánh dấu fulfilled; nếu đang
+        # giữ sách (hold_expires_at có giá trị) thì bản đã giữ đã được trừ kho trước đó.
+        holds = (await db.scalars(
+            update(Reservation)
+            .where(
+                Reservation.book_id == loan_in.book_id,
+                Reservation.member_id == loan_in.member_id,
+                Reservation.status.in_(OPEN_RESERVATION_STATUSES)
+            )
+            .values(status=ReservationStatus.FULFILLED)
+            .returning(Reservation.hold_expires_at)
+            .execution_options(synchronize_session=False)
+        )).all()
+        if any(holds):
+            stock = update(Book).where(Book.id == loan_in.book_id)
+        else:
+            stock = update(Book).where(Book.id == loan_in.book_id, Book.available_copies > 0).values(
+                available_copies=Book.available_copies - 1
+            )
+        reserved_book_id = await db.scalar(
+            stock.values(total_loans=Book.total_loans + 1)
+            .returning(Book.id)
+            .execution_options(synchronize_session=False)
+        )
+        if reserved_book_id is None:
+            if await db.scalar(select(Book.id).where(Book.id == loan_in.book_id)) is None:
+                raise HTTPException(status_code=404, detail="Book not found")
+            raise HTTPException(status_code=400, detail="Book is out of stock")
+
+        active_loans_count = await db.scalar(
+            select(func.count(Loan.id)).where(
+                Loan.member_id == loan_in.member_id,
+                Loan.status.in_(OPEN_LOAN_STATUSES)
+            )
+        )
         
+        if active_loans_count >= MAX_LOANS_PER_MEMBER:
+            raise HTTPException(
+                status_code=400, 
+                detail=f"Member has reached the limit of {MAX_LOANS_PER_MEMBER} active loans"
+            )
+
         due_date = date.today() + timedelta(days=loan_in.days)
         new_loan = Loan(
             member_id=loan_in.member_id,
@@ -53,17 +142,259 @@ def borrow_book(loan_in: LoanCreate, db: Session = Depends(get_db)):
         )
         
         db.add(new_loan)
-        db.commit()
-        db.refresh(new_loan)
-        return new_loan
-        
+        await leaderboard.record_loans(db, {loan_in.book_id: 1})
+        await db.commit()
+        counters.adjust(active_loans=1)
+        await book_cache.invalidate_books([loan_in.book_id])
+
+    except HTTPException:
+        # Hoàn lại lượt trừ kho
+        await db.rollback()
+        raise
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(status_code=500, detail=f"Transaction failed: {str(e)}")
+
+    return await _load_loan(db, new_loan.id)
+
+@router.post("/borrow/batch", response_model=LoanBatchResponse)
+async def borrow_books_batch(batch_in: LoanBatchCreate, db: AsyncSession = Depends(get_db)):
+    """Mượn cả giỏ sách cho một thành viên trong một transaction.
+
+    Member được kiểm tra một lần, sách được lấy bằng một query và kho được trừ
+    bằng một UPDATE duy nhất. Từng cuốn thành công/thất bại độc lập nhau.
+    Khóa theo cùng thứ tự với mượn lẻ: member -> reservation -> book (id tăng dần).
+    """
+    try:
+        # Đếm giới hạn mượn trước khi trừ kho: trên SQLite phải giữ writer ngay từ đầu,
+        # nếu không các lô song song của cùng member cùng đọc một số loan cũ
+        begin_write(db)
+        member = await db.scalar(
+            select(Member).where(Member.id == batch_in.member_id).with_for_update()
+        )
+        if not member:
+            raise HTTPException(status_code=404, detail="Member not found")
+        if not member.is_active:
+            raise HTTPException(status_code=400, detail="Member is not active")
+
+        active_loans_count = await db.scalar(
+            select(func.count(Loan.id)).where(
+                Loan.member_id == batch_in.member_id,
+                Loan.status.in_(OPEN_LOAN_STATUSES)
+            )
+        )
+        remaining = MAX_LOANS_PER_MEMBER - active_loans_count
+
+        # Reservation còn hiệu lực của thành viên cho giỏ này (khóa trước sách, như mượn lẻ).
+        # Sách đang được giữ cho thành viên: bản giữ đã trừ kho, không cần còn hàng
+        reserved = (await db.execute(
+            select(Reservation.book_id, Reservation.status).where(
+                Reservation.member_id == batch_in.member_id,
+                Reservation.book_id.in_(set(batch_in.book_ids)),
+                Reservation.status.in_(OPEN_RESERVATION_STATUSES)
+            )
+            .order_by(Reservation.id)
+            .with_for_update()
+        )).all()
+        held = {book_id for book_id, status in reserved if status == ReservationStatus.HELD}
+
+        stock = dict((await db.execute(
+            select(Book.id, Book.available_copies)
+            .where(Book.id.in_(set(batch_in.book_ids)))
+            .order_by(Book.id)
+            .with_for_update()
+        )).all())
+
+        errors: Dict[int, str] = {}
+        accepted: List[int] = []
+        seen = set()
+        for index, book_id in enumerate(batch_in.book_ids):
+            if book_id in seen:
+                errors[index] = "Duplicate book in basket"
+            elif book_id not in stock:
+                errors[index] = "Book not found"
+            elif stock[book_id] < 1 and book_id not in held:
+                errors[index] = "Book is out of stock"
+            elif len(accepted) >= remaining:
+                errors[index] = f"Member has reached the limit of {MAX_LOANS_PER_MEMBER} active loans"
+            else:
+                accepted.append(book_id)
+            seen.add(book_id)
+
+        # Trừ kho có điều kiện cho cả giỏ; cuốn nào hết hàng do request song song thì không được trả về
+        granted = {book_id for book_id in accepted if book_id in held}
+        if granted:
+            await db.execute(
+                update(Book)
+                .where(Book.id.in_(granted))
+                .values(total_loans=Book.total_loans + 1)
+                .execution_options(synchronize_session=False)
+            )
+        from_stock = [book_id for book_id in accepted if book_id not in held]
+        if from_stock:
+            granted |= set((await db.scalars(
+                update(Book)
+                .where(Book.id.in_(from_stock), Book.available_copies > 0)
+                .values(
+                    available_copies=Book.available_copies - 1,
+                    total_loans=Book.total_loans + 1
+                )
+                .returning(Book.id)
+                .execution_options(synchronize_session=False)
+            )).all())
+        if granted:
+            await db.execute(
+                update(Reservation)
+                .where(
+                    Reservation.member_id == batch_in.member_id,
+                    Reservation.book_id.in_(granted),
+                    Reservation.status.in_(OPEN_RESERVATION_STATUSES)
+                )
+                .values(status=ReservationStatus.FULFILLED)
+                .execution_options(synchronize_session=False)
+            )
+
+        due_date = date.today() + timedelta(days=batch_in.days)
+        loan_ids: Dict[int, int] = {}
+        if granted:
+            rows = (await db.execute(
+                insert(Loan).returning(Loan.id, Loan.book_id),
+                [
+                    {
+                        "member_id": batch_in.member_id,
+                        "book_id": book_id,
+                        "due_date": due_date,
+                        "status": LoanStatus.ACTIVE,
+                    }
+                    for book_id in accepted if book_id in granted
+                ]
+            )).all()
+            loan_ids = {book_id: loan_id for loan_id, book_id in rows}
+            await leaderboard.record_loans(db, {book_id: 1 for book_id in loan_ids})
+
+        await db.commit()
+        counters.adjust(active_loans=len(loan_ids))
+        await book_cache.invalidate_books(loan_ids)
+
+    except HTTPException:
+        await db.rollback()
+        raise
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(status_code=500, detail=f"Transaction failed: {str(e)}")
+
+    loans = await _load_loans(db, list(loan_ids.values()))
+    results = []
+    for index, book_id in enumerate(batch_in.book_ids):
+        if index not in errors and book_id in loan_ids:
+            results.append(LoanBatchItem(
+                book_id=book_id, success=True, loan=loans[loan_ids[book_id]]
+            ))
+        else:
+            results.append(LoanBatchItem(
+                book_id=book_id, success=False, detail=errors.get(index, "Book is out of stock")
+            ))
+    return _batch_response(results)
+
+@router.post("/return/batch", response_model=LoanBatchResponse)
+async def return_books_batch(batch_in: LoanBatchReturn, db: AsyncSession = Depends(get_db)):
+    """Trả nhiều loan trong một transaction, tạo phí phạt và cộng kho theo lô."""
+    try:
+        today = date.today()
+        requested = set(batch_in.loan_ids)
+        was_overdue = set((await db.scalars(
+            select(Loan.id).where(Loan.id.in_(requested), loan_is_overdue(today))
+        )).all())
+
+        # Đổi trạng thái có điều kiện: loan đã trả (kể cả bởi request song song) sẽ không khớp
+        returned_rows = (await db.execute(
+            update(Loan)
+            .where(Loan.id.in_(requested), Loan.status != LoanStatus.RETURNED)
+            .values(return_date=today, status=LoanStatus.RETURNED)
+            .returning(Loan.id, Loan.book_id, Loan.due_date)
+            .execution_options(synchronize_session=False)
+        )).all()
+        returned = {loan_id: (book_id, due_date) for loan_id, book_id, due_date in returned_rows}
+
+        existing = set()
+        if len(returned) < len(requested):
+            existing = set((await db.scalars(
+                select(Loan.id).where(Loan.id.in_(requested - returned.keys()))
+            )).all())
+
+        fines = {
+            loan_id: (today - due_date).days * FINE_PER_DAY
+            for loan_id, (_, due_date) in returned.items() if today > due_date
+        }
+        # Loan đã qua job overdue có sẵn Fine PENDING (tính tới hôm qua): chốt số tiền cuối
+        accrued = (await db.execute(
+            select(Fine.id, Fine.loan_id, Fine.amount).where(
+                Fine.loan_id.in_(fines.keys()), Fine.status == FineStatus.PENDING
+            )
+        )).all() if fines else []
+        if accrued:
+            fines_table = Fine.__table__
+            await db.execute(
+                fines_table.update()
+                .where(fines_table.c.id == bindparam("f_id"))
+                .values(amount=bindparam("f_amount")),
+                [{"f_id": fine_id, "f_amount": fines[loan_id]} for fine_id, loan_id, _ in accrued]
+            )
+        accrued_loans = {loan_id for _, loan_id, _ in accrued}
+        new_fines = [
+            {"loan_id": loan_id, "amount": amount, "status": FineStatus.PENDING}
+            for loan_id, amount in fines.items() if loan_id not in accrued_loans
+        ]
+        if new_fines:
+            await db.execute(insert(Fine), new_fines)
+
+        copies_back = Counter(book_id for book_id, _ in returned.values() if book_id)
+        if copies_back:
+            books = Book.__table__
+            await db.execute(
+                books.update()
+                .where(books.c.id == bindparam("b_id"))
+                .values(available_copies=books.c.available_copies + bindparam("b_count")),
+                [{"b_id": book_id, "b_count": count} for book_id, count in sorted(copies_back.items())]
+            )
+            # Giữ sách cho người đặt trước được xử lý ở worker, không chặn request trả
+            for book_id, count in copies_back.items():
+                await events.emit(db, events.BOOK_RETURNED, {"book_id": book_id, "copies": count})
+
+        await db.commit()
+        if copies_back:
+            events.notify()
+        counters.adjust(
+            active_loans=-len(returned),
+            overdue_loans=-len(was_overdue & returned.keys()),
+            pending_fines=sum(fines.values()) - sum(float(amount) for _, _, amount in accrued)
+        )
+        await book_cache.invalidate_books(copies_back)
+
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Transaction failed: {str(e)}")
 
+    loans = await _load_loans(db, list(returned))
+    results = []
+    seen = set()
+    for loan_id in batch_in.loan_ids:
+        if loan_id in returned and loan_id not in seen:
+            results.append(LoanBatchItem(
+                loan_id=loan_id, book_id=returned[loan_id][0], success=True, loan=loans[loan_id]
+            ))
+        elif loan_id in returned or loan_id in existing:
+            results.append(LoanBatchItem(
+                loan_id=loan_id, success=False, detail="This loan is already returned"
+            ))
+        else:
+            results.append(LoanBatchItem(loan_id=loan_id, success=False, detail="Loan not found"))
+        seen.add(loan_id)
+    return _batch_response(results)
+
 @router.post("/return/{loan_id}", response_model=LoanResponse)
-def return_book(loan_id: int, db: Session = Depends(get_db)):
-    loan = db.query(Loan).filter(Loan.id == loan_id).first()
+async def return_book(loan_id: int, db: AsyncSession = Depends(get_db)):
+    loan = await db.get(Loan, loan_id)
     
     if not loan:
         raise HTTPException(status_code=404, detail="Loan not found")
@@ -73,47 +404,138 @@ def return_book(loan_id: int, db: Session = Depends(get_db)):
 
     try:
         today = date.today()
-        loan.return_date = today
-        loan.status = LoanStatus.RETURNED
+        fine_amount = 0
+        # Chỉ một request trả được loan này; request song song thứ hai sẽ không khớp dòng nào
+        returned = await db.scalar(
+            update(Loan)
+            .where(Loan.id == loan_id, Loan.status != LoanStatus.RETURNED)
+            .values(return_date=today, status=LoanStatus.RETURNED)
+            .returning(Loan.id)
+            .execution_options(synchronize_session=False)
+        )
+        if returned is None:
+            raise HTTPException(status_code=400, detail="This loan is already returned")
         
+        accrued_amount = 0
         if today > loan.due_date:
             overdue_days = (today - loan.due_date).days
             fine_amount = overdue_days * FINE_PER_DAY
-            
-            new_fine = Fine(
-                loan_id=loan.id,
-                amount=fine_amount,
-                status=FineStatus.PENDING
+
+            # Loan đã qua job overdue có sẵn Fine PENDING (tính tới hôm qua): chốt số tiền cuối
+            accrued = await db.scalar(
+                select(Fine).where(Fine.loan_id == loan.id, Fine.status == FineStatus.PENDING)
             )
-            db.add(new_fine)
+            if accrued:
+                accrued_amount = float(accrued.amount)
+                accrued.amount = fine_amount
+            else:
+                new_fine = Fine(
+                    loan_id=loan.id,
+                    amount=fine_amount,
+                    status=FineStatus.PENDING
+                )
+                db.add(new_fine)
             
         if loan.book_id:
-            book = db.query(Book).filter(Book.id == loan.book_id).first()
-            if book:
-                book.available_copies += 1
+            await db.execute(
+                update(Book)
+                .where(Book.id == loan.book_id)
+                .values(available_copies=Book.available_copies + 1)
+                .execution_options(synchronize_session=False)
+            )
+            await events.emit(db, events.BOOK_RETURNED, {"book_id": loan.book_id, "copies": 1})
         
-        db.commit()
-        db.refresh(loan)
-        return loan
+        await db.commit()
+        if loan.book_id:
+            events.notify()
+        counters.adjust(
+            active_loans=-1,
+            overdue_loans=-1 if loan.status == LoanStatus.OVERDUE or today > loan.due_date else 0,
+            pending_fines=fine_amount - accrued_amount
+        )
+        if loan.book_id:
+            await book_cache.invalidate_books([loan.book_id])
 
+    except HTTPException:
+        await db.rollback()
+        raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Transaction failed: {str(e)}")
 
-@router.get("/", response_model=List[LoanResponse])
-def read_loans(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    loans = db.query(Loan).options(
-        joinedload(Loan.book), 
-        joinedload(Loan.member),
-        joinedload(Loan.fines)
-    ).order_by(Loan.id.desc()).offset(skip).limit(limit).all()
-    return loans
+    return await _load_loan(db, loan.id)
+
+LOAN_FIELDS = ("book_id", "member_id", "loan_date", "due_date", "return_date", "status")
+LOAN_EXPANSIONS = ("book", "member", "fines")
+# Quan hệ được expand bằng join (dạng rút gọn BookBrief / MemberBrief)
+EXPAND_JOINS = {
+    "book": (Book, Loan.book_id, BookBrief),
+    "member": (Member, Loan.member_id, MemberBrief),
+}
+
+def _parse_list(value: str, allowed, name: str) -> List[str]:
+    items = [item.strip() for item in value.split(",") if item.strip()]
+    unknown = set(items) - set(allowed)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown {name}: {', '.join(sorted(unknown))}")
+    return items
+
+@router.get("/", responses={200: {"model": List[LoanListItem]}})
+async def read_loans(
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    expand: str = "book,member",
+    db: AsyncSession = Depends(get_db)
+):
+    """Danh sách loan, chỉ select các cột cần trả.
+
+    - `fields`: các trường của loan, phân cách bởi dấu phẩy (mặc định tất cả; `id` luôn có).
+    - `expand`: quan hệ đi kèm - `book`, `member` (dạng rút gọn, join trong cùng câu
+      lệnh) và `fines` (một query riêng cho cả trang, không nhân dòng trước LIMIT).
+    """
+    selected = _parse_list(fields, LOAN_FIELDS, "fields") if fields is not None else LOAN_FIELDS
+    expanded = set(_parse_list(expand, LOAN_EXPANSIONS, "expand"))
+
+    query = select(Loan.id.label("id"), *(getattr(Loan, name).label(name) for name in selected))
+    joins = [relation for relation in EXPAND_JOINS if relation in expanded]
+    for relation in joins:
+        model, foreign_key, schema = EXPAND_JOINS[relation]
+        query = query.outerjoin(model, model.id == foreign_key).add_columns(
+            *schema_columns(model, schema, relation)
+        )
+    rows = await paginate_mappings(db, query, Loan.id, response, skip=skip, limit=limit, cursor=cursor)
+
+    for row in rows:
+        for relation in joins:
+            row[relation] = nest(row, relation)
+
+    if "fines" in expanded:
+        fines: Dict[int, List[Dict]] = {row["id"]: [] for row in rows}
+        if fines:
+            result = await db.execute(
+                select(Fine.id, Fine.loan_id, Fine.amount, Fine.status)
+                .where(Fine.loan_id.in_(fines))
+                .order_by(Fine.id)
+            )
+            for fine_id, loan_id, amount, fine_status in result:
+                fines[loan_id].append({"id": fine_id, "amount": amount, "status": fine_status})
+        for row in rows:
+            row["fines"] = fines[row["id"]]
+    return list_response(rows, response)
 
 @router.get("/check-access")
-def check_loan_access(book_id: int, member_id: int, db: Session = Depends(get_db)):
-    loan = db.query(Loan).filter(
-        Loan.book_id == book_id,
-        Loan.member_id == member_id,
-        Loan.status == LoanStatus.ACTIVE
-    ).first()
-    return {"has_access": loan is not None}
\ No newline at end of file
+async def check_loan_access(book_id: int, member_id: int, db: AsyncSession = Depends(get_db)):
+    """Kiểm tra thành viên đang mượn sách; nếu có, kèm token đọc PDF (`/books/{id}/content?token=`)."""
+    loan = await db.scalar(
+        select(Loan.id).where(
+            Loan.book_id == book_id,
+            Loan.member_id == member_id,
+            Loan.status.in_(OPEN_LOAN_STATUSES)
+        ).limit(1)
+    )
+    if loan is None:
+        return {"has_access": False, "content_token": None}
+    return {"has_access": True, "content_token": content_tokens.issue(book_id, member_id)}
@@ -1,11 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, status, Response
+from sqlalchemy import select, func, case, distinct
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
-from sqlalchemy import or_
+from datetime import date
 
 from app.db.database import get_db
-from app.models import Member, Loan, LoanStatus
-from app.schemas import MemberCreate, MemberResponse
+from app.db.search import search_page
+from app.models import Member, Loan, Fine, FineStatus, OPEN_LOAN_STATUSES, loan_is_overdue
+from app.schemas import MemberCreate, MemberResponse, MemberSummary
+from app.core.fastjson import list_response, schema_columns
+from app.core.pagination import (
+    paginate_mappings, encode_cursor, decode_cursor, NEXT_CURSOR_HEADER
+)
+from app.services.dashboard import counters
 
 router = APIRouter(
     prefix="/members",
@@ -14,8 +21,8 @@ router = APIRouter(
 )
 
 @router.post("/", response_model=MemberResponse, status_code=status.HTTP_201_CREATED)
-def create_member(member_in: MemberCreate, db: Session = Depends(get_db)):
-    existing_member = db.query(Member).filter(Member.email == member_in.email).first()
+async def create_member(member_in: MemberCreate, db: AsyncSession = Depends(get_db)):
+    existing_member = await db.scalar(select(Member).where(Member.email == member_in.email))
     if existing_member:
         raise HTTPException(status_code=400, detail="Email already registered")
     
@@ -26,46 +33,93 @@ def create_member(member_in: MemberCreate, db: Session = Depends(get_db)):
         is_active=True
     )
     db.add(new_member)
-    db.commit()
-    db.refresh(new_member)
+    await db.commit()
+    counters.adjust(total_members=1)
+    await db.refresh(new_member)
     return new_member
 
-@router.get("/", response_model=List[MemberResponse])
-def read_members(
+@router.get("/", responses={200: {"model": List[MemberResponse]}})
+async def read_members(
+    response: Response,
     skip: int = 0, 
     limit: int = 100, 
     q: Optional[str] = None,
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_db)
 ):
-    query = db.query(Member)
+    query = select(*schema_columns(Member, MemberResponse))
     
     if q:
-        search = f"%{q}%"
-        query = query.filter(
-            or_(
-                Member.full_name.ilike(search),
-                Member.email.ilike(search)
-            )
+        rows = await search_page(db, query, Member, q, response, skip=skip, limit=limit, cursor=cursor)
+    else:
+        rows = await paginate_mappings(db, query, Member.id, response, skip=skip, limit=limit, cursor=cursor)
+    return list_response(rows, response)
+
+@router.get("/summary", response_model=List[MemberSummary])
+async def read_member_summaries(
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_db)
+):
+    """Thành viên kèm số loan đang mượn, số loan quá hạn và tổng phạt chưa trả.
+
+    Một câu lệnh cho cả trang: chọn trang member (keyset theo id giảm dần như
+    `paginate`), rồi gộp loans LEFT JOIN fines của riêng các member đó theo member_id.
+    """
+    page = select(Member).order_by(Member.id.desc()).limit(limit)
+    if cursor:
+        page = page.where(Member.id < decode_cursor(cursor))
+    else:
+        page = page.offset(skip)
+    page = page.subquery()
+
+    # Loan có nhiều fine bị nhân dòng khi join: đếm loan theo id phân biệt
+    stats = (
+        select(
+            Loan.member_id,
+            func.count(distinct(case((Loan.status.in_(OPEN_LOAN_STATUSES), Loan.id)))).label("active_loans"),
+            func.count(distinct(case((loan_is_overdue(date.today()), Loan.id)))).label("overdue_loans"),
+            func.sum(case((Fine.status == FineStatus.PENDING, Fine.amount), else_=0)).label("unpaid_fines"),
         )
-        
-    return query.order_by(Member.id.desc()).offset(skip).limit(limit).all()
+        .join(page, page.c.id == Loan.member_id)
+        .outerjoin(Fine, Fine.loan_id == Loan.id)
+        .group_by(Loan.member_id)
+        .subquery()
+    )
+
+    result = await db.execute(
+        select(
+            page,
+            func.coalesce(stats.c.active_loans, 0).label("active_loans"),
+            func.coalesce(stats.c.overdue_loans, 0).label("overdue_loans"),
+            func.coalesce(stats.c.unpaid_fines, 0).label("unpaid_fines"),
+        )
+        .outerjoin(stats, stats.c.member_id == page.c.id)
+        .order_by(page.c.id.desc())
+    )
+    rows = result.mappings().all()
+    if limit > 0 and len(rows) == limit:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(rows[-1]["id"])
+    return rows
 
 @router.get("/{member_id}", response_model=MemberResponse)
-def read_member(member_id: int, db: Session = Depends(get_db)):
-    member = db.query(Member).filter(Member.id == member_id).first()
+async def read_member(member_id: int, db: AsyncSession = Depends(get_db)):
+    member = await db.get(Member, member_id)
     if member is None:
         raise HTTPException(status_code=404, detail="Member not found")
     return member
 
 @router.put("/{member_id}", response_model=MemberResponse)
-def update_member(member_id: int, member_in: MemberCreate, db: Session = Depends(get_db)):
-    member = db.query(Member).filter(Member.id == member_id).first()
+async def update_member(member_id: int, member_in: MemberCreate, db: AsyncSession = Depends(get_db)):
+    member = await db.get(Member, member_id)
     if not member:
         raise HTTPException(status_code=404, detail="Member not found")
         
     member.full_name = member_in.full_name
     member.phone = member_in.phone
     
-    db.commit()
-    db.refresh(member)
+    await db.commit()
+    await db.refresh(member)
     return member
\ No newline at end of file
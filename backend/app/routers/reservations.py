@@ -1,29 +1,38 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session, joinedload
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, status, Response
+from sqlalchemy import select, delete
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
 from datetime import date
 
 from app.db.database import get_db
-from app.models import Reservation, Book, Member
-from app.schemas import ReservationCreate, ReservationResponse
+from app.models import Reservation, Book, Member, ReservationStatus
+from app.schemas import ReservationCreate, ReservationResponse, BookResponse, MemberResponse
+from app.core.fastjson import list_response, schema_columns, nest
+from app.core.pagination import paginate_mappings
+from app.services import book_cache, events
+from app.services.reservations import (
+    PENDING, OPEN_RESERVATION_STATUSES, queue_positions, release_copies, expire_holds
+)
 
 router = APIRouter(prefix="/reservations", tags=["Reservations"])
 
 @router.post("/reserve", response_model=ReservationResponse, status_code=status.HTTP_201_CREATED)
-def reserve_book(reservation: ReservationCreate, db: Session = Depends(get_db)):
-    book = db.query(Book).filter(Book.id == reservation.book_id).first()
+async def reserve_book(reservation: ReservationCreate, db: AsyncSession = Depends(get_db)):
+    book = await db.get(Book, reservation.book_id)
     if not book:
         raise HTTPException(status_code=404, detail="Book not found")
     
-    member = db.query(Member).filter(Member.id == reservation.member_id).first()
+    member = await db.get(Member, reservation.member_id)
     if not member:
         raise HTTPException(status_code=404, detail="Member not found")
     
-    existing_reservation = db.query(Reservation).filter(
-        Reservation.book_id == reservation.book_id,
-        Reservation.member_id == reservation.member_id,
-        Reservation.status == 'pending'
-    ).first()
+    existing_reservation = await db.scalar(
+        select(Reservation.id).where(
+            Reservation.book_id == reservation.book_id,
+            Reservation.member_id == reservation.member_id,
+            Reservation.status.in_(OPEN_RESERVATION_STATUSES)
+        )
+    )
     
     if existing_reservation:
         raise HTTPException(status_code=400, detail="Member already has a pending reservation for this book")
@@ -32,29 +41,80 @@ def reserve_book(reservation: ReservationCreate, db: Session = Depends(get_db)):
         book_id=reservation.book_id,
         member_id=reservation.member_id,
         reservation_date=date.today(),
-        status="pending"
+        status=PENDING
     )
     
     db.add(new_reservation)
-    db.commit()
-    db.refresh(new_reservation)
+    await db.commit()
     
+    # Gán sẵn quan hệ đã load để response không phải lazy-load
+    new_reservation.book = book
+    new_reservation.member = member
+    new_reservation.queue_position = (await queue_positions(db, [book.id])).get(new_reservation.id)
     return new_reservation
 
-@router.get("/", response_model=List[ReservationResponse])
-def get_reservations(db: Session = Depends(get_db)):
-    reservations = db.query(Reservation).options(
-        joinedload(Reservation.book),
-        joinedload(Reservation.member)
-    ).all()
-    return reservations
+@router.get("/", responses={200: {"model": List[ReservationResponse]}})
+async def get_reservations(
+    response: Response,
+    book_id: Optional[int] = None,
+    member_id: Optional[int] = None,
+    status: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_db)
+):
+    query = (
+        select(
+            *schema_columns(Reservation, ReservationResponse),
+            *schema_columns(Book, BookResponse, "book"),
+            *schema_columns(Member, MemberResponse, "member"),
+        )
+        .outerjoin(Book, Book.id == Reservation.book_id)
+        .outerjoin(Member, Member.id == Reservation.member_id)
+    )
+    if book_id is not None:
+        query = query.where(Reservation.book_id == book_id)
+    if member_id is not None:
+        query = query.where(Reservation.member_id == member_id)
+    if status is not None:
+        query = query.where(Reservation.status == status)
+    rows = await paginate_mappings(db, query, Reservation.id, response, skip=skip, limit=limit, cursor=cursor)
+
+    # Vị trí hàng đợi tính bằng window function trên toàn bộ hàng đợi của các sách
+    # trong trang (không chỉ các dòng đã lọc), một query cho cả trang
+    positions = await queue_positions(db, {row["book_id"] for row in rows if row["status"] == PENDING})
+    for row in rows:
+        row["queue_position"] = positions.get(row["id"])
+        row["book"] = nest(row, "book")
+        row["member"] = nest(row, "member")
+    return list_response(rows, response)
 
 @router.delete("/{reservation_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_reservation(reservation_id: int, db: Session = Depends(get_db)):
-    reservation = db.query(Reservation).filter(Reservation.id == reservation_id).first()
-    if not reservation:
+async def delete_reservation(reservation_id: int, db: AsyncSession = Depends(get_db)):
+    # Trạng thái lấy từ chính câu DELETE (dòng đã khóa), không từ lần đọc trước đó:
+    # lượt mượn song song có thể vừa chuyển lượt giữ sang FULFILLED và lấy bản đã giữ
+    deleted = (await db.execute(
+        delete(Reservation)
+        .where(Reservation.id == reservation_id)
+        .returning(Reservation.book_id, Reservation.status)
+        .execution_options(synchronize_session=False)
+    )).first()
+    if deleted is None:
         raise HTTPException(status_code=404, detail="Reservation not found")
-    
-    db.delete(reservation)
-    db.commit()
-    return
\ No newline at end of file
+
+    # Hủy lượt đang giữ sách: bản đã giữ về lại kho cho người kế tiếp
+    # (khóa reservation trước rồi mới tới sách, cùng thứ tự với đường mượn)
+    held_book_id = deleted.book_id if deleted.status == ReservationStatus.HELD else None
+    if held_book_id:
+        await release_copies(db, {held_book_id: 1})
+    await db.commit()
+    if held_book_id:
+        events.notify()
+        await book_cache.invalidate_books([held_book_id])
+    return
+
+@router.post("/expire-holds")
+async def expire_reservation_holds(db: AsyncSession = Depends(get_db)):
+    """Hủy ngay các lượt giữ sách đã hết hạn (job hằng đêm cũng chạy bước này)."""
+    return {"expired": await expire_holds(db)}
\ No newline at end of file
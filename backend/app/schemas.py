@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, field_validator
-from typing import Optional, List
+from typing import Optional, List, Dict
 from datetime import date
 from decimal import Decimal
 
@@ -25,8 +25,9 @@ class BookCreate(BookBase):
 class BookResponse(BookBase):
     id: int
     available_copies: int
-    file_path: Optional[str] = None
+    has_file: bool = False
     image_path: Optional[str] = None 
+    cover_thumbnails: Optional[Dict[str, Dict[str, str]]] = None
 
     class Config:
         from_attributes = True
@@ -47,6 +48,11 @@ class MemberResponse(MemberBase):
     class Config:
         from_attributes = True
 
+class MemberSummary(MemberResponse):
+    active_loans: int = 0
+    overdue_loans: int = 0
+    unpaid_fines: float = 0
+
 class FineResponse(BaseModel):
     id: int
     amount: float
@@ -79,6 +85,51 @@ class LoanResponse(LoanBase):
     class Config:
         from_attributes = True
 
+class BookBrief(BaseModel):
+    id: int
+    title: str
+    author: str
+    isbn: str
+
+class MemberBrief(BaseModel):
+    id: int
+    full_name: str
+    email: str
+
+class LoanListItem(BaseModel):
+    """Một dòng của GET /loans/: chỉ các trường được chọn qua `fields`/`expand`."""
+    id: int
+    book_id: Optional[int] = None
+    member_id: Optional[int] = None
+    loan_date: Optional[date] = None
+    due_date: Optional[date] = None
+    return_date: Optional[date] = None
+    status: Optional[str] = None
+
+    book: Optional[BookBrief] = None
+    member: Optional[MemberBrief] = None
+    fines: Optional[List[FineResponse]] = None
+
+class LoanBatchCreate(BaseModel):
+    member_id: int
+    book_ids: List[int] = Field(..., min_length=1, max_length=50)
+    days: int = Field(14, ge=1, le=14, description="Number of days to borrow")
+
+class LoanBatchReturn(BaseModel):
+    loan_ids: List[int] = Field(..., min_length=1, max_length=50)
+
+class LoanBatchItem(BaseModel):
+    book_id: Optional[int] = None
+    loan_id: Optional[int] = None
+    success: bool
+    detail: Optional[str] = None
+    loan: Optional[LoanResponse] = None
+
+class LoanBatchResponse(BaseModel):
+    succeeded: int
+    failed: int
+    results: List[LoanBatchItem]
+
 class ReservationBase(BaseModel):
     member_id: int
     book_id: int
@@ -90,6 +141,10 @@ class ReservationResponse(ReservationBase):
     id: int
     reservation_date: date
     status: str
+    # Vị trí trong hàng đợi của sách (1 = người kế tiếp); None nếu không còn pending
+    queue_position: Optional[int] = None
+    # Hạn nhận sách khi reservation đang ở trạng thái held
+    hold_expires_at: Optional[date] = None
     
     book: Optional[BookResponse] = None
     member: Optional[MemberResponse] = None
@@ -0,0 +1,261 @@
+"""Lưu file theo nội dung (content-addressed) với đếm tham chiếu.
+
+File upload được băm SHA-256 (đọc lại từ bản spool của request, không qua
+mạng) rồi tra bảng `blobs`:
+- digest đã có: chỉ tăng `ref_count`, không upload lại;
+- chưa có: upload lên storage tại key `<folder>/<digest><ext>` rồi ghi blob.
+
+Mọi thay đổi `ref_count` nằm trong transaction của thao tác trên sách, nên
+commit/rollback cùng nhau. Blob có `ref_count` về 0 được ghi `released_at` và
+job `run_gc` xóa sau `BLOB_GC_GRACE_SECONDS` (nếu trong lúc đó có upload trùng
+nội dung thì blob được dùng lại). File upload trước khi có bảng `blobs` không
+được đếm nên không bao giờ bị GC.
+
+`acquire` không giữ transaction ghi (SQLite: writer, Postgres: kết nối đang mở
+transaction) trong lúc gọi storage qua mạng: tra digest bằng một câu đọc ở session
+riêng, upload ngoài transaction, rồi mới tăng `ref_count`/ghi blob bằng các câu
+ghi ngắn trong transaction của thao tác. Nếu transaction đó rollback, file vừa
+upload được ghi thành blob `ref_count` 0 (transaction riêng) để GC dọn như mọi
+blob khác.
+
+GC cũng không gọi storage khi đang giữ khóa: một transaction ngắn đánh dấu
+`deleting_at` các blob sẽ xóa rồi commit, xóa object trên storage, rồi một
+transaction ngắn nữa xóa các dòng đó. `acquire` gặp blob đang được đánh dấu thì
+chờ GC xong rồi upload lại (cùng key, nên không được upload trước khi GC xóa xong).
+"""
+import asyncio
+import hashlib
+import os
+import time
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Iterable, List, Optional, Set
+
+from fastapi import UploadFile
+from sqlalchemy import select, update, delete, case, event, or_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.database import AsyncSessionLocal
+from app.models import Blob
+from app.storage import storage, store_bytes, store_upload
+
+HASH_CHUNK_SIZE = 1024 * 1024
+# Số blob GC đánh dấu rồi xóa mỗi lượt
+GC_BATCH = 100
+# `acquire` chờ GC xóa xong blob đang được đánh dấu (kiểm tra lại sau mỗi khoảng)
+GC_WAIT_SECONDS = 30
+GC_POLL_SECONDS = 0.2
+
+# Blob đã upload trong transaction đang mở của session, chưa commit (session.info)
+_UPLOADED = "blobs_uploaded"
+_cleanup_tasks = set()
+
+
+@dataclass
+class PendingBlob:
+    digest: str
+    key: str
+    size: int
+    content_type: Optional[str]
+    file: Optional[UploadFile] = None
+    data: Optional[bytes] = None
+
+
+async def from_upload(file: UploadFile, folder: str) -> PendingBlob:
+    digest = hashlib.sha256()
+    size = 0
+    while chunk := await file.read(HASH_CHUNK_SIZE):
+        digest.update(chunk)
+        size += len(chunk)
+    await file.seek(0)
+    ext = os.path.splitext(file.filename or "")[1].lower()
+    return PendingBlob(digest.hexdigest(), f"{folder}/{digest.hexdigest()}{ext}", size, file.content_type, file=file)
+
+
+def from_bytes(data: bytes, folder: str, ext: str, content_type: str) -> PendingBlob:
+    digest = hashlib.sha256(data).hexdigest()
+    return PendingBlob(digest, f"{folder}/{digest}{ext}", len(data), content_type, data=data)
+
+
+async def _upload(blob: PendingBlob) -> str:
+    # Key chứa digest nên nội dung tại key không bao giờ đổi
+    if blob.file is not None:
+        return await store_upload(storage, blob.key, blob.file, immutable=True)
+    return await store_bytes(storage, blob.key, blob.data, blob.content_type, immutable=True)
+
+
+async def acquire(db: AsyncSession, blobs: List[PendingBlob]) -> List[str]:
+    """Tăng tham chiếu cho từng blob (upload song song các blob chưa có), trả về URL theo thứ tự.
+
+    Gọi trước các câu ghi khác của transaction: câu ghi của `acquire` chạy sau upload,
+    nhưng transaction đã giữ writer từ trước thì vẫn giữ suốt lúc upload.
+    """
+    found = await _lookup({blob.digest for blob in blobs})
+    # Mỗi digest upload một lần (vd. hai thumbnail trùng nội dung)
+    missing = {blob.digest: blob for blob in blobs if blob.digest not in found}
+    uploaded = dict(zip(missing, await asyncio.gather(*(_upload(blob) for blob in missing.values()))))
+    db.info.setdefault(_UPLOADED, []).extend((missing[digest], url) for digest, url in uploaded.items())
+
+    table = Blob.__table__
+    urls = []
+    for blob in blobs:
+        if blob.digest in found:
+            url = (await db.execute(
+                update(Blob)
+                .where(Blob.digest == blob.digest, Blob.deleting_at.is_(None))
+                .values(ref_count=Blob.ref_count + 1, released_at=None)
+                .returning(Blob.url)
+            )).scalar_one_or_none()
+            if url is None:
+                # `_lookup` vừa lùi released_at: chỉ xảy ra khi upload lâu hơn thời gian ân hạn
+                raise RuntimeError(f"Blob {blob.digest} was collected during upload")
+        else:
+            url = uploaded[blob.digest]
+            # Hai request cùng upload một file mới: request sau chỉ tăng ref_count
+            await db.execute(_insert(db, blob, url, ref_count=1).on_conflict_do_update(
+                index_elements=[table.c.digest],
+                set_={"ref_count": table.c.ref_count + 1, "released_at": None},
+            ))
+        urls.append(url)
+    return urls
+
+
+async def _lookup(digests: Set[str]) -> Set[str]:
+    """Các digest đã có blob dùng lại được, trong session riêng (không giữ transaction của caller).
+
+    Blob đã được release thì lùi `released_at` về bây giờ (transaction ngắn) để GC
+    không nhận xóa trong lúc upload các blob còn lại. Blob GC đang xóa: chờ GC xong.
+    """
+    deadline = time.monotonic() + GC_WAIT_SECONDS
+    async with AsyncSessionLocal() as lookup:
+        while True:
+            rows = (await lookup.execute(
+                select(Blob.digest, Blob.released_at, Blob.deleting_at).where(Blob.digest.in_(digests))
+            )).all()
+            deleting = [row.digest for row in rows if row.deleting_at is not None]
+            released = {row.digest for row in rows if row.released_at is not None and row.deleting_at is None}
+            if released and not deleting:
+                touched = set((await lookup.scalars(
+                    update(Blob)
+                    .where(Blob.digest.in_(released), Blob.released_at.is_not(None), Blob.deleting_at.is_(None))
+                    .values(released_at=datetime.now())
+                    .returning(Blob.digest)
+                    .execution_options(synchronize_session=False)
+                )).all())
+                await lookup.commit()
+                if touched != released:
+                    # GC vừa đánh dấu (hoặc request khác vừa dùng lại): đọc lại
+                    continue
+            await lookup.rollback()
+            if not deleting:
+                return {row.digest for row in rows}
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"Blobs still being collected: {', '.join(deleting)}")
+            await asyncio.sleep(GC_POLL_SECONDS)
+
+
+def _insert(db: AsyncSession, blob: PendingBlob, url: str, **values):
+    dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+    return dialect.insert(Blob.__table__).values(
+        digest=blob.digest, key=blob.key, url=url, size=blob.size, content_type=blob.content_type, **values
+    )
+
+
+@event.listens_for(Session, "after_commit")
+def _forget_uploads(session):
+    session.info.pop(_UPLOADED, None)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _abandon_uploads(session, transaction):
+    # Transaction ngoài cùng kết thúc mà không commit (rollback, đóng session)
+    uploads = session.info.pop(_UPLOADED, None) if transaction.parent is None else None
+    if uploads:
+        task = asyncio.get_running_loop().create_task(_abandon(uploads))
+        _cleanup_tasks.add(task)
+        task.add_done_callback(_cleanup_tasks.discard)
+
+
+async def _abandon(uploads):
+    """Ghi file upload của transaction đã rollback thành blob không còn tham chiếu.
+
+    Digest đã có trong bảng (request khác commit cùng nội dung) thì object thuộc
+    về blob đó, không đụng tới.
+    """
+    try:
+        async with AsyncSessionLocal() as db:
+            for blob, url in uploads:
+                await db.execute(
+                    _insert(db, blob, url, ref_count=0, released_at=datetime.now())
+                    .on_conflict_do_nothing(index_elements=[Blob.__table__.c.digest])
+                )
+            await db.commit()
+    except Exception as e:
+        print(f"Blob cleanup error: {e}")
+
+
+async def release(db: AsyncSession, urls: Iterable[Optional[str]]):
+    """Giảm tham chiếu của các URL không còn được dùng (URL ngoài bảng blobs bị bỏ qua)."""
+    now = datetime.now()
+    for url, count in Counter(url for url in urls if url).items():
+        await db.execute(
+            update(Blob)
+            .where(Blob.url == url)
+            .values(
+                ref_count=Blob.ref_count - count,
+                released_at=case((Blob.ref_count - count <= 0, now), else_=None),
+            )
+        )
+
+
+async def collect_garbage(db: AsyncSession) -> int:
+    now = datetime.now()
+    cutoff = now - timedelta(seconds=settings.BLOB_GC_GRACE_SECONDS)
+    released = (Blob.released_at < cutoff, Blob.ref_count <= 0)
+    # Đánh dấu lượt này rồi commit ngay; nhận lại cả dấu cũ của lượt chạy bị ngắt giữa chừng.
+    # Điều kiện kiểm tra lại trong câu UPDATE: blob có thể vừa được dùng lại
+    claimable = (*released, or_(Blob.deleting_at.is_(None), Blob.deleting_at < cutoff))
+    claimed = (await db.execute(
+        update(Blob)
+        .where(Blob.digest.in_(select(Blob.digest).where(*claimable).limit(GC_BATCH)), *claimable)
+        .values(deleting_at=now)
+        .returning(Blob.digest, Blob.key)
+        .execution_options(synchronize_session=False)
+    )).all()
+    await db.commit()
+    if not claimed:
+        return 0
+
+    # Xóa object ngoài transaction; xóa lỗi thì bỏ dấu, lần chạy sau thử lại
+    results = await asyncio.gather(*(storage.delete(key) for _, key in claimed), return_exceptions=True)
+    deleted, failed = [], []
+    for (digest, key), result in zip(claimed, results):
+        if isinstance(result, Exception):
+            print(f"Blob GC: cannot delete {key}: {result}")
+            failed.append(digest)
+        else:
+            deleted.append(digest)
+    if deleted:
+        await db.execute(delete(Blob).where(Blob.digest.in_(deleted)))
+    if failed:
+        await db.execute(
+            update(Blob).where(Blob.digest.in_(failed)).values(deleting_at=None)
+            .execution_options(synchronize_session=False)
+        )
+    await db.commit()
+    return len(deleted)
+
+
+async def run_gc(session_factory):
+    while True:
+        try:
+            async with session_factory() as db:
+                while await collect_garbage(db) == GC_BATCH:
+                    pass
+        except Exception as e:
+            print(f"Blob GC error: {e}")
+        await asyncio.sleep(settings.BLOB_GC_INTERVAL_SECONDS)
@@ -0,0 +1,102 @@
+"""Read-through cache cho chi tiết sách và các trang catalogue (/books/).
+
+Giá trị cache là JSON đã serialize sẵn, nên cache hit không chạm tới DB lẫn
+Pydantic. Vô hiệu hóa:
+- sửa một cuốn (update, mượn/trả làm đổi available_copies): xóa key chi tiết và
+  mọi trang có chứa cuốn đó (qua tag `book:<id>`);
+- thêm/xóa/import sách: tăng version của namespace catalogue, mọi trang cũ hết
+  hiệu lực vì thứ tự và phân trang đã thay đổi.
+
+Mỗi lần vô hiệu hóa còn tăng bộ đếm `generation()`. Request đọc lấy generation
+trước khi query DB và truyền vào `set_book`/`set_page`: nếu trong lúc đó có
+writer commit rồi vô hiệu hóa, giá trị vừa đọc có thể là dòng cũ nên bị bỏ, thay
+vì nằm trong cache tới hết TTL.
+"""
+from typing import Dict, Iterable, Optional, Tuple
+from urllib.parse import urlencode
+
+from app.core.cache import cache
+from app.schemas import BookResponse
+
+CATALOGUE = "catalogue"
+GENERATION = "books"
+
+_stats: Dict[str, Dict[str, int]] = {
+    "book": {"hits": 0, "misses": 0},
+    "catalogue": {"hits": 0, "misses": 0},
+}
+
+
+def _record(kind: str, hit: bool):
+    _stats[kind]["hits" if hit else "misses"] += 1
+
+
+def stats() -> Dict[str, Dict]:
+    report = {}
+    for kind, counts in _stats.items():
+        total = counts["hits"] + counts["misses"]
+        report[kind] = {**counts, "hit_rate": round(counts["hits"] / total, 4) if total else None}
+    return report
+
+
+def serialize_book(book) -> bytes:
+    return BookResponse.model_validate(book).model_dump_json().encode()
+
+
+async def get_book(book_id: int) -> Optional[bytes]:
+    body = await cache.get(f"book:{book_id}")
+    _record("book", body is not None)
+    return body
+
+
+async def generation() -> int:
+    """Lấy trước khi đọc DB cho một lần set_book/set_page."""
+    return await cache.get_version(GENERATION)
+
+
+async def _set_if_current(key: str, value: bytes, tags: Iterable[str], generation: int):
+    # Kiểm tra cả sau khi set: invalidate chen giữa lần kiểm tra và lần set đã tăng
+    # generation nhưng chưa thấy key này. Invalidate sau lần kiểm tra cuối thì xóa
+    # được key qua tag.
+    if await cache.get_version(GENERATION) != generation:
+        return
+    await cache.set(key, value, tags=tags)
+    if await cache.get_version(GENERATION) != generation:
+        await cache.delete(key)
+
+
+async def set_book(book_id: int, body: bytes, generation: int):
+    await _set_if_current(f"book:{book_id}", body, [f"book:{book_id}"], generation)
+
+
+async def _page_key(params: Dict) -> str:
+    version = await cache.get_version(CATALOGUE)
+    return f"books:page:{version}:{urlencode(sorted((k, v) for k, v in params.items() if v is not None))}"
+
+
+async def get_page(params: Dict) -> Optional[Tuple[bytes, Optional[str]]]:
+    value = await cache.get(await _page_key(params))
+    _record("catalogue", value is not None)
+    if value is None:
+        return None
+    # Dòng đầu là cursor trang sau (có thể rỗng), phần còn lại là body JSON
+    next_cursor, body = value.split(b"\n", 1)
+    return body, next_cursor.decode() or None
+
+
+async def set_page(
+    params: Dict, body: bytes, next_cursor: Optional[str], book_ids: Iterable[int], generation: int
+):
+    value = (next_cursor or "").encode() + b"\n" + body
+    await _set_if_current(
+        await _page_key(params), value, [f"book:{book_id}" for book_id in book_ids], generation
+    )
+
+
+async def invalidate_books(book_ids: Iterable[int], catalogue_changed: bool = False):
+    """Gọi sau khi commit thay đổi của các sách `book_ids`."""
+    await cache.incr_version(GENERATION)
+    for book_id in set(book_ids):
+        await cache.invalidate_tag(f"book:{book_id}")
+    if catalogue_changed:
+        await cache.incr_version(CATALOGUE)
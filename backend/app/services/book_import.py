@@ -0,0 +1,176 @@
+"""Import sách hàng loạt từ file CSV/JSONL.
+
+File được đọc tuần tự theo từng chunk nên bộ nhớ không phụ thuộc kích thước
+file. Mỗi chunk: chuẩn hóa bằng đúng schema `BookCreate`, loại ISBN trùng bằng
+một query `IN (...)`, insert bằng executemany rồi commit cùng với tiến độ của
+`ImportJob` - vì vậy import bị ngắt giữa chừng có thể resume từ chunk kế tiếp.
+
+Chạy từ dòng lệnh (trong thư mục backend):
+
+    python -m app.services.book_import books.csv
+    python -m app.services.book_import books.jsonl --resume 12
+"""
+import argparse
+import asyncio
+import csv
+import io
+import json
+import os
+from itertools import islice
+from typing import AsyncIterator, BinaryIO, Dict, Iterator, Optional
+
+from pydantic import ValidationError
+from sqlalchemy import select, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Book, ImportJob, ImportStatus
+from app.schemas import BookCreate
+from app.services import book_cache
+from app.services.dashboard import counters
+
+DEFAULT_CHUNK_SIZE = 1000
+BOOK_FIELDS = ("title", "author", "isbn", "total_copies", "edition", "publication_year")
+
+
+def detect_format(filename: str) -> str:
+    ext = os.path.splitext(filename)[1].lower()
+    if ext in (".jsonl", ".ndjson"):
+        return "jsonl"
+    if ext == ".csv":
+        return "csv"
+    raise ValueError(f"Unsupported import format: {ext or filename}")
+
+
+def iter_records(fileobj: BinaryIO, fmt: str) -> Iterator[Dict]:
+    text_stream = io.TextIOWrapper(fileobj, encoding="utf-8-sig", newline="")
+    if fmt == "csv":
+        for row in csv.DictReader(text_stream):
+            yield {(k or "").strip().lower(): v for k, v in row.items()}
+    else:
+        for line in text_stream:
+            if line.strip():
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    yield None
+
+
+def _clean(record: Dict) -> Dict:
+    # Bỏ ô rỗng để trường Optional nhận None thay vì lỗi parse
+    return {k: v for k, v in record.items() if k in BOOK_FIELDS and v not in ("", None)}
+
+
+async def create_job(db: AsyncSession, filename: str) -> ImportJob:
+    job = ImportJob(filename=filename, status=ImportStatus.RUNNING)
+    db.add(job)
+    await db.commit()
+    return job
+
+
+async def run_import(
+    db: AsyncSession,
+    job: ImportJob,
+    records: Iterator[Dict],
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> AsyncIterator[Dict]:
+    """Chạy import cho `job`, yield tiến độ sau mỗi chunk đã commit.
+
+    Các bản ghi đã xử lý ở lần chạy trước (`job.processed_rows`) được bỏ qua.
+    """
+    records = islice(records, job.processed_rows, None)
+    job.status = ImportStatus.RUNNING
+    try:
+        while True:
+            chunk = list(islice(records, chunk_size))
+            if not chunk:
+                break
+
+            books: Dict[str, Dict] = {}
+            failed = 0
+            for record in chunk:
+                if not isinstance(record, dict):
+                    failed += 1
+                    job.last_error = "Malformed record"
+                    continue
+                try:
+                    book = BookCreate.model_validate(_clean(record))
+                except ValidationError as e:
+                    failed += 1
+                    error = e.errors()[0]
+                    job.last_error = f"{'.'.join(map(str, error['loc']))}: {error['msg']}"
+                    continue
+                # Trùng ISBN ngay trong chunk: giữ bản ghi đầu tiên
+                books.setdefault(book.isbn, book.model_dump())
+
+            existing = set()
+            if books:
+                existing = set((await db.scalars(
+                    select(Book.isbn).where(Book.isbn.in_(books.keys()))
+                )).all())
+
+            rows = [
+                {**book, "available_copies": book["total_copies"]}
+                for isbn, book in books.items() if isbn not in existing
+            ]
+            if rows:
+                await db.execute(insert(Book), rows)
+
+            job.processed_rows += len(chunk)
+            job.inserted += len(rows)
+            job.failed += failed
+            job.skipped += len(chunk) - failed - len(rows)
+            await db.commit()
+            counters.adjust(total_books=len(rows))
+            if rows:
+                await book_cache.invalidate_books([], catalogue_changed=True)
+            yield progress(job)
+
+        job.status = ImportStatus.COMPLETED
+    except Exception as e:
+        await db.rollback()
+        job.status = ImportStatus.FAILED
+        job.last_error = str(e)
+        raise
+    finally:
+        db.add(job)
+        await db.commit()
+
+    yield progress(job)
+
+
+def progress(job: ImportJob) -> Dict:
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "processed": job.processed_rows,
+        "inserted": job.inserted,
+        "skipped": job.skipped,
+        "failed": job.failed,
+        "last_error": job.last_error,
+    }
+
+
+async def _main(path: str, resume: Optional[int], chunk_size: int):
+    from app.db.database import AsyncSessionLocal
+
+    fmt = detect_format(path)
+    async with AsyncSessionLocal() as db:
+        if resume:
+            job = await db.get(ImportJob, resume)
+            if job is None:
+                raise SystemExit(f"Import job {resume} not found")
+        else:
+            job = await create_job(db, os.path.basename(path))
+
+        with open(path, "rb") as f:
+            async for event in run_import(db, job, iter_records(f, fmt), chunk_size):
+                print(json.dumps(event), flush=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk import books from CSV/JSONL")
+    parser.add_argument("path")
+    parser.add_argument("--resume", type=int, help="ID của import job cần chạy tiếp")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args()
+    asyncio.run(_main(args.path, args.resume, args.chunk_size))
@@ -0,0 +1,104 @@
+"""Bộ đếm cho /analytics/dashboard giữ trong bộ nhớ.
+
+Các đường ghi (mượn, trả, thêm/xóa sách, thêm thành viên, import) cộng delta
+vào snapshot ngay sau khi commit, nên endpoint dashboard chỉ đọc một dict.
+Snapshot được đối soát lại với database định kỳ mỗi
+`settings.DASHBOARD_REFRESH_SECONDS` giây. Đó cũng là giới hạn độ trễ:
+- thay đổi từ worker/process khác hiện ra sau tối đa một chu kỳ đối soát;
+- thay đổi trong cùng process hiện ra ngay lập tức;
+- loan quá hạn do tới ngày (không qua đường ghi nào) hiện ra ở lần đối soát kế tiếp.
+
+Mỗi bộ đếm có số phiên bản, tăng ở mỗi `adjust`. Delta tới trong lúc đối soát
+đang chạy thì không biết câu đếm đã thấy thay đổi đó hay chưa: bộ đếm đó giữ
+giá trị đang cộng dồn thay vì kết quả đếm, và snapshot được đối soát lại ở lần
+đọc kế tiếp.
+"""
+import asyncio
+import time
+from collections import Counter
+from datetime import date, datetime
+from typing import Dict, Optional
+
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models import Book, Member, Loan, Fine, OPEN_LOAN_STATUSES, loan_is_overdue
+
+
+class DashboardCounters:
+    def __init__(self, refresh_seconds: int):
+        self.refresh_seconds = refresh_seconds
+        self._values: Optional[Dict[str, float]] = None
+        self._refreshed_at = 0.0
+        self._reconciled_at: Optional[datetime] = None
+        self._versions: Counter = Counter()
+        # Có delta xen vào lần đối soát trước: đối soát lại ở lần snapshot kế tiếp
+        self._stale = False
+        self._lock = asyncio.Lock()
+
+    async def reconcile(self, db: AsyncSession):
+        started = self._versions.copy()
+        total_books = await db.scalar(select(func.count(Book.id)))
+        total_members = await db.scalar(select(func.count(Member.id)))
+        active_loans = await db.scalar(
+            select(func.count(Loan.id)).where(Loan.status.in_(OPEN_LOAN_STATUSES))
+        )
+        overdue_loans = await db.scalar(
+            select(func.count(Loan.id)).where(loan_is_overdue(date.today()))
+        )
+        pending_fines = await db.scalar(
+            select(func.sum(Fine.amount)).where(Fine.status == "pending")
+        ) or 0
+
+        values = {
+            "total_books": total_books,
+            "total_members": total_members,
+            "active_loans": active_loans,
+            "overdue_loans": overdue_loans,
+            "pending_fines": float(pending_fines),
+        }
+        touched = [key for key in values if self._versions[key] != started[key]]
+        if touched and self._values is not None:
+            for key in touched:
+                values[key] = self._values[key]
+        self._values = values
+        self._stale = bool(touched)
+        self._refreshed_at = time.monotonic()
+        self._reconciled_at = datetime.now()
+
+    async def snapshot(self, db: AsyncSession) -> Dict:
+        # Nếu job nền không chạy (vd. serverless), tự đối soát khi snapshot quá cũ
+        if self._needs_reconcile():
+            async with self._lock:
+                if self._needs_reconcile():
+                    await self.reconcile(db)
+        return {**self._values, "reconciled_at": self._reconciled_at}
+
+    def _needs_reconcile(self) -> bool:
+        return (
+            self._values is None
+            or self._stale
+            or time.monotonic() - self._refreshed_at > 2 * self.refresh_seconds
+        )
+
+    def adjust(self, **deltas):
+        """Cộng delta vào snapshot; gọi sau khi transaction đã commit."""
+        for key, delta in deltas.items():
+            if not delta:
+                continue
+            self._versions[key] += 1
+            if self._values is not None:
+                self._values[key] += delta
+
+    async def run_periodic(self, session_factory):
+        while True:
+            try:
+                async with session_factory() as db:
+                    await self.reconcile(db)
+            except Exception as e:
+                print(f"Dashboard reconcile error: {e}")
+            await asyncio.sleep(self.refresh_seconds)
+
+
+counters = DashboardCounters(settings.DASHBOARD_REFRESH_SECONDS)
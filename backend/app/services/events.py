@@ -0,0 +1,189 @@
+"""Event bus nội bộ theo mẫu transactional outbox.
+
+Request ghi sự kiện bằng `emit` trong chính transaction của nó (chỉ thêm một
+INSERT, không chờ xử lý), sau commit gọi `notify` để đánh thức worker. Worker
+`run_worker` lấy các sự kiện chưa xử lý theo lô, gom theo `topic` và gọi handler
+đã đăng ký một lần cho cả nhóm.
+
+Handler nhận `(db, payloads)` và tự commit: việc đánh dấu `processed_at` nằm
+cùng transaction đó, nên sự kiện được xử lý đúng một lần hoặc được thử lại nếu
+handler lỗi. Worker cũng quét định kỳ mỗi `OUTBOX_POLL_SECONDS` để nhận sự kiện
+do worker/process khác ghi.
+
+Lỗi handler:
+- nhóm nhiều sự kiện bị lỗi thì chạy lại từng sự kiện một, chỉ sự kiện thật sự
+  lỗi bị tính một lần thử (`attempts` theo từng sự kiện);
+- sự kiện lỗi được thử lại sau `OUTBOX_RETRY_BASE_SECONDS * 2^(attempts-1)` giây
+  (tối đa `OUTBOX_RETRY_MAX_SECONDS`), ghi ở `next_attempt_at`;
+- lỗi đủ `OUTBOX_MAX_ATTEMPTS` lần thì vào dead-letter (`dead_at`): worker bỏ qua,
+  không bị dọn, xem qua `/health/outbox`.
+"""
+import asyncio
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from sqlalchemy import select, update, delete, func, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models import OutboxEvent
+
+BOOK_RETURNED = "book.returned"
+
+BATCH_SIZE = 100
+
+Handler = Callable[[AsyncSession, List[Dict]], Awaitable[None]]
+
+_handlers: Dict[str, Handler] = {}
+_wakeup = asyncio.Event()
+
+
+def handler(topic: str):
+    """Đăng ký handler cho một topic (mỗi topic một handler)."""
+    def register(func: Handler) -> Handler:
+        _handlers[topic] = func
+        return func
+    return register
+
+
+async def emit(db: AsyncSession, topic: str, payload: Dict):
+    """Ghi sự kiện trong transaction hiện tại; chỉ được xử lý nếu transaction commit."""
+    db.add(OutboxEvent(topic=topic, payload=payload, attempts=0))
+
+
+def notify():
+    """Gọi sau commit để worker xử lý ngay, không chờ chu kỳ quét."""
+    _wakeup.set()
+
+
+def retry_delay(attempts: int) -> timedelta:
+    """Thời gian chờ trước lần thử kế tiếp, sau `attempts` lần lỗi."""
+    seconds = settings.OUTBOX_RETRY_BASE_SECONDS * 2 ** (attempts - 1)
+    return timedelta(seconds=min(seconds, settings.OUTBOX_RETRY_MAX_SECONDS))
+
+
+async def _run(db: AsyncSession, func: Optional[Handler], events: Dict[int, Dict]):
+    # Nhận sự kiện: worker khác đã xử lý (và commit) thì không còn khớp processed_at IS NULL
+    claimed = (await db.scalars(
+        update(OutboxEvent)
+        .where(OutboxEvent.id.in_(events), OutboxEvent.processed_at.is_(None))
+        .values(processed_at=datetime.now())
+        .returning(OutboxEvent.id)
+    )).all()
+    if func is None or not claimed:
+        await db.commit()
+        return
+    await func(db, [events[event_id] for event_id in sorted(claimed)])
+
+
+async def _fail(db: AsyncSession, event_id: int, attempts: int, error: Exception):
+    attempts += 1
+    now = datetime.now()
+    dead = attempts >= settings.OUTBOX_MAX_ATTEMPTS
+    await db.execute(
+        update(OutboxEvent)
+        .where(OutboxEvent.id == event_id, OutboxEvent.processed_at.is_(None))
+        .values(
+            attempts=attempts,
+            last_error=str(error)[:500],
+            next_attempt_at=None if dead else now + retry_delay(attempts),
+            dead_at=now if dead else None,
+        )
+    )
+    await db.commit()
+
+
+async def dispatch_pending(db: AsyncSession) -> int:
+    """Xử lý một lô sự kiện đã tới lượt, trả về số sự kiện đã đọc."""
+    rows = (await db.execute(
+        select(OutboxEvent.id, OutboxEvent.topic, OutboxEvent.payload, OutboxEvent.attempts)
+        .where(
+            OutboxEvent.processed_at.is_(None),
+            OutboxEvent.dead_at.is_(None),
+            or_(OutboxEvent.next_attempt_at.is_(None), OutboxEvent.next_attempt_at <= datetime.now()),
+        )
+        .order_by(OutboxEvent.id)
+        .limit(BATCH_SIZE)
+        .with_for_update(skip_locked=True)
+    )).all()
+
+    by_topic: Dict[str, Dict[int, Dict]] = defaultdict(dict)
+    attempts: Dict[int, int] = {}
+    for event_id, topic, payload, tried in rows:
+        by_topic[topic][event_id] = payload
+        attempts[event_id] = tried
+
+    for topic, events in by_topic.items():
+        func = _handlers.get(topic)
+        try:
+            await _run(db, func, events)
+            continue
+        except Exception as e:
+            await db.rollback()
+            if len(events) == 1:
+                event_id = next(iter(events))
+                print(f"Outbox handler error ({topic}): {e}")
+                await _fail(db, event_id, attempts[event_id], e)
+                continue
+        # Nhóm lỗi: chạy lại từng sự kiện để sự kiện hợp lệ không bị tính lỗi theo
+        for event_id, payload in events.items():
+            try:
+                await _run(db, func, {event_id: payload})
+            except Exception as e:
+                await db.rollback()
+                print(f"Outbox handler error ({topic}, event {event_id}): {e}")
+                await _fail(db, event_id, attempts[event_id], e)
+    return len(rows)
+
+
+async def dead_letters(db: AsyncSession, limit: int = 50) -> Dict:
+    """Số sự kiện đang chờ / đang chờ thử lại / dead-letter, kèm các dead-letter mới nhất."""
+    pending = OutboxEvent.processed_at.is_(None) & OutboxEvent.dead_at.is_(None)
+    counts = (await db.execute(
+        select(
+            func.count().filter(pending & (OutboxEvent.attempts == 0)),
+            func.count().filter(pending & (OutboxEvent.attempts > 0)),
+            func.count().filter(OutboxEvent.dead_at.is_not(None)),
+        )
+    )).one()
+    dead = (await db.execute(
+        select(
+            OutboxEvent.id, OutboxEvent.topic, OutboxEvent.payload, OutboxEvent.attempts,
+            OutboxEvent.last_error, OutboxEvent.created_at, OutboxEvent.dead_at,
+        )
+        .where(OutboxEvent.dead_at.is_not(None))
+        .order_by(OutboxEvent.id.desc())
+        .limit(limit)
+    )).mappings().all()
+    return {
+        "pending": counts[0],
+        "retrying": counts[1],
+        "dead": counts[2],
+        "dead_events": [dict(row) for row in dead],
+    }
+
+
+async def purge_processed(db: AsyncSession) -> int:
+    cutoff = datetime.now() - timedelta(days=settings.OUTBOX_RETENTION_DAYS)
+    purged = (await db.execute(
+        delete(OutboxEvent).where(OutboxEvent.processed_at < cutoff)
+    )).rowcount
+    await db.commit()
+    return purged
+
+
+async def run_worker(session_factory):
+    while True:
+        try:
+            await asyncio.wait_for(_wakeup.wait(), timeout=settings.OUTBOX_POLL_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+        _wakeup.clear()
+
+        try:
+            async with session_factory() as db:
+                while await dispatch_pending(db) == BATCH_SIZE:
+                    pass
+        except Exception as e:
+            print(f"Outbox worker error: {e}")
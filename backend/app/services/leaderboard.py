@@ -0,0 +1,77 @@
+"""Leaderboard sách được mượn nhiều nhất.
+
+Tổng toàn thời gian nằm ở cột `books.total_loans` (có index), còn các cửa sổ
+7/30/365 ngày cộng dồn từ bảng bucket theo ngày `book_loan_daily`. Cả hai được
+cập nhật trong chính transaction mượn sách, nên truy vấn không phải quét lịch
+sử `loans`: chi phí chỉ phụ thuộc vào độ dài cửa sổ, không phụ thuộc tổng số loan.
+"""
+import enum
+from datetime import date, timedelta
+from typing import Dict, Optional
+
+from sqlalchemy import select, func
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Book, BookLoanDaily
+
+
+class LeaderboardWindow(str, enum.Enum):
+    ALL = "all"
+    WEEK = "7d"
+    MONTH = "30d"
+    YEAR = "365d"
+
+
+WINDOW_DAYS = {
+    LeaderboardWindow.WEEK: 7,
+    LeaderboardWindow.MONTH: 30,
+    LeaderboardWindow.YEAR: 365,
+}
+
+
+async def record_loans(db: AsyncSession, book_counts: Dict[int, int], day: Optional[date] = None):
+    """Cộng lượt mượn vào bucket của ngày `day` (upsert, cùng transaction với loan)."""
+    if not book_counts:
+        return
+    day = day or date.today()
+    dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+    daily = BookLoanDaily.__table__
+    stmt = dialect.insert(daily).values([
+        {"book_id": book_id, "day": day, "loans": count}
+        for book_id, count in book_counts.items()
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[daily.c.book_id, daily.c.day],
+        set_={"loans": daily.c.loans + stmt.excluded.loans}
+    )
+    await db.execute(stmt)
+
+
+async def top_books(db: AsyncSession, window: LeaderboardWindow, limit: int):
+    if window == LeaderboardWindow.ALL:
+        result = await db.execute(
+            select(Book, Book.total_loans)
+            .where(Book.total_loans > 0)
+            .order_by(Book.total_loans.desc(), Book.id)
+            .limit(limit)
+        )
+        return result.all()
+
+    since = date.today() - timedelta(days=WINDOW_DAYS[window] - 1)
+    ranked = (
+        select(
+            BookLoanDaily.book_id,
+            func.sum(BookLoanDaily.loans).label("total_loans")
+        )
+        .where(BookLoanDaily.day >= since)
+        .group_by(BookLoanDaily.book_id)
+        .subquery()
+    )
+    result = await db.execute(
+        select(Book, ranked.c.total_loans)
+        .join(ranked, ranked.c.book_id == Book.id)
+        .order_by(ranked.c.total_loans.desc(), Book.id)
+        .limit(limit)
+    )
+    return result.all()
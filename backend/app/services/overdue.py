@@ -0,0 +1,138 @@
+"""Job hằng đêm: đánh dấu loan quá hạn và cộng dồn phí phạt.
+
+Ba câu lệnh set-based trong một transaction, không load loan nào lên Python:
+1. ACTIVE -> OVERDUE cho loan chưa trả có `due_date < hôm nay`;
+2. cập nhật số tiền các Fine PENDING của loan quá hạn theo số ngày trễ;
+3. tạo Fine PENDING cho loan quá hạn chưa có Fine nào.
+
+Cùng lượt chạy còn hủy các lượt giữ sách đặt trước đã hết hạn và dọn sự kiện
+outbox cũ (app/services/reservations.py, app/services/events.py).
+
+Job chạy lúc khởi động (bù các đêm server tắt) rồi mỗi ngày vào
+`OVERDUE_JOB_AT`. Chạy lại nhiều lần trong ngày hoặc ở nhiều worker cùng lúc
+cho cùng kết quả. Trên serverless task nền không sống qua các request, nên job
+còn được gọi qua `/jobs/nightly` (Vercel Cron, xem vercel.json) hoặc từ cron:
+
+    python -m app.services.overdue [--date YYYY-MM-DD]
+
+Danh sách/bộ đếm quá hạn không phụ thuộc job: loan ACTIVE đã qua hạn trả cũng
+tính là quá hạn (`loan_is_overdue` trong app/models.py).
+"""
+import argparse
+import asyncio
+import json
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Optional
+
+from sqlalchemy import select, update, exists, func, cast, literal, Date, Integer, Numeric
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.etag import bump_pending
+from app.models import Loan, Fine, LoanStatus, FineStatus
+from app.services import events, reservations
+from app.services.dashboard import counters
+
+FINE_PER_DAY = 5000  # Phí phạt 5000đ/ngày
+
+
+def days_overdue(db: AsyncSession, today: date):
+    """Biểu thức SQL: số ngày trễ của Loan tính tới `today`."""
+    if db.get_bind().dialect.name == "postgresql":
+        return literal(today, Date) - Loan.due_date
+    return cast(func.julianday(today.isoformat()) - func.julianday(Loan.due_date), Integer)
+
+
+def _fine_amount(db: AsyncSession, today: date):
+    return cast(days_overdue(db, today) * FINE_PER_DAY, Numeric(10, 2))
+
+
+async def run_overdue_job(db: AsyncSession, today: Optional[date] = None) -> Dict[str, int]:
+    today = today or date.today()
+
+    marked = (await db.execute(
+        update(Loan)
+        .where(
+            Loan.status == LoanStatus.ACTIVE,
+            Loan.return_date.is_(None),
+            Loan.due_date < today,
+        )
+        .values(status=LoanStatus.OVERDUE)
+        .execution_options(synchronize_session=False)
+    )).rowcount
+
+    amount = _fine_amount(db, today)
+    accrued = (await db.execute(
+        update(Fine)
+        .where(
+            Fine.status == FineStatus.PENDING,
+            Fine.loan_id == Loan.id,
+            Loan.status == LoanStatus.OVERDUE,
+        )
+        .values(amount=amount)
+        .execution_options(synchronize_session=False)
+    )).rowcount
+
+    # Fine đã thanh toán giữa chừng thì dừng tính tiếp, không tạo Fine mới cho loan đó
+    created = (await db.execute(
+        Fine.__table__.insert().from_select(
+            ["loan_id", "amount", "status"],
+            select(Loan.id, amount, literal(FineStatus.PENDING.value)).where(
+                Loan.status == LoanStatus.OVERDUE,
+                ~exists().where(Fine.loan_id == Loan.id),
+            ),
+        )
+    )).rowcount
+
+    await db.commit()
+    return {"marked_overdue": marked, "fines_updated": accrued, "fines_created": created}
+
+
+async def run_and_refresh(db: AsyncSession, today: Optional[date] = None) -> Dict[str, int]:
+    result = await run_overdue_job(db, today)
+    # Trạng thái loan và tổng phạt đổi hàng loạt: làm mới ETag và bộ đếm dashboard
+    await bump_pending()
+    await counters.reconcile(db)
+    return result
+
+
+def _seconds_until(at: time) -> float:
+    now = datetime.now()
+    run_at = datetime.combine(now.date(), at)
+    if run_at <= now:
+        run_at += timedelta(days=1)
+    return (run_at - now).total_seconds()
+
+
+async def run_all(db: AsyncSession) -> Dict[str, int]:
+    """Một lượt job hằng đêm: quá hạn + phí phạt, hết hạn giữ sách, dọn outbox."""
+    result = await run_and_refresh(db)
+    result["holds_expired"] = await reservations.expire_holds(db)
+    result["events_purged"] = await events.purge_processed(db)
+    return result
+
+
+async def run_nightly(session_factory):
+    at = time.fromisoformat(settings.OVERDUE_JOB_AT)
+    while True:
+        try:
+            async with session_factory() as db:
+                result = await run_all(db)
+                print(f"Overdue job: {result}")
+        except Exception as e:
+            print(f"Overdue job error: {e}")
+        await asyncio.sleep(_seconds_until(at))
+
+
+async def _main(today: Optional[date]):
+    from app.db.database import AsyncSessionLocal
+
+    async with AsyncSessionLocal() as db:
+        print(json.dumps(await run_overdue_job(db, today)), flush=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mark overdue loans and accrue fines")
+    parser.add_argument("--date", type=date.fromisoformat, help="Ngày tính quá hạn (mặc định hôm nay)")
+    args = parser.parse_args()
+    asyncio.run(_main(args.date))
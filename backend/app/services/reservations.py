@@ -0,0 +1,127 @@
+"""Hàng đợi đặt trước của từng sách và giữ sách khi có bản được trả.
+
+Thứ tự trong hàng đợi: reservation `pending` theo `reservation_date`, cùng ngày
+thì theo `id`. Cả hai truy vấn hàng đợi đi trên partial index
+`ix_reservations_pending_queue (book_id, reservation_date, id)`.
+
+Vòng đời: pending -> held (một bản sách được trừ khỏi kho và giữ tới
+`hold_expires_at`) -> fulfilled khi thành viên mượn, hoặc expired khi hết hạn
+giữ; bản đang giữ khi đó được trả về kho và chuyển cho người kế tiếp.
+"""
+from collections import Counter
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import select, update, func, bindparam
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.etag import bump_pending
+from app.models import Reservation, Book, ReservationStatus
+from app.services import book_cache, events
+
+PENDING = ReservationStatus.PENDING
+# Reservation còn hiệu lực: mỗi thành viên chỉ có một cho mỗi sách
+OPEN_RESERVATION_STATUSES = (ReservationStatus.PENDING, ReservationStatus.HELD)
+QUEUE_ORDER = (Reservation.reservation_date, Reservation.id)
+
+
+async def queue_positions(db: AsyncSession, book_ids: Iterable[int]) -> Dict[int, int]:
+    """Vị trí (từ 1) trong hàng đợi của các reservation pending thuộc `book_ids`."""
+    book_ids = set(book_ids)
+    if not book_ids:
+        return {}
+    position = func.row_number().over(partition_by=Reservation.book_id, order_by=QUEUE_ORDER)
+    result = await db.execute(
+        select(Reservation.id, position).where(
+            Reservation.book_id.in_(book_ids),
+            Reservation.status == PENDING,
+        )
+    )
+    return dict(result.all())
+
+
+async def queue_head(db: AsyncSession, book_id: int, limit: int) -> List[Reservation]:
+    """`limit` reservation pending lâu nhất của sách (một lần seek trên index).
+
+    Lấy cả nhóm trong một truy vấn: session không autoflush, nên chọn lại từng
+    người sau khi đổi status trên object sẽ trả về đúng người vừa được giữ.
+    Khóa các dòng trả về (bỏ qua dòng đang bị khóa) để hai worker giữ sách song
+    song không chọn cùng một người.
+    """
+    return (await db.scalars(
+        select(Reservation)
+        .where(Reservation.book_id == book_id, Reservation.status == PENDING)
+        .order_by(*QUEUE_ORDER)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )).all()
+
+
+async def hold_copies(db: AsyncSession, book_id: int, copies: int, today: Optional[date] = None) -> List[int]:
+    """Giữ tối đa `copies` bản đang có trong kho cho những người đầu hàng đợi."""
+    expires = (today or date.today()) + timedelta(days=settings.RESERVATION_HOLD_DAYS)
+    held = []
+    for reservation in await queue_head(db, book_id, copies):
+        # Trừ kho có điều kiện như lúc mượn: bản vừa trả có thể đã được người khác mượn
+        taken = await db.scalar(
+            update(Book)
+            .where(Book.id == book_id, Book.available_copies > 0)
+            .values(available_copies=Book.available_copies - 1)
+            .returning(Book.id)
+            .execution_options(synchronize_session=False)
+        )
+        if taken is None:
+            break
+        reservation.status = ReservationStatus.HELD
+        reservation.hold_expires_at = expires
+        held.append(reservation.id)
+    return held
+
+
+async def release_copies(db: AsyncSession, copies: Dict[int, int]):
+    """Trả các bản đang giữ về kho và phát `book.returned` để người kế tiếp được giữ."""
+    books = Book.__table__
+    await db.execute(
+        books.update()
+        .where(books.c.id == bindparam("b_id"))
+        .values(available_copies=books.c.available_copies + bindparam("b_count")),
+        [{"b_id": book_id, "b_count": count} for book_id, count in sorted(copies.items())]
+    )
+    for book_id, count in copies.items():
+        await events.emit(db, events.BOOK_RETURNED, {"book_id": book_id, "copies": count})
+
+
+@events.handler(events.BOOK_RETURNED)
+async def on_book_returned(db: AsyncSession, payloads: List[Dict]):
+    copies = Counter()
+    for payload in payloads:
+        copies[payload["book_id"]] += payload.get("copies", 1)
+
+    touched = []
+    for book_id, count in copies.items():
+        if await hold_copies(db, book_id, count):
+            touched.append(book_id)
+    await db.commit()
+    await bump_pending()
+    await book_cache.invalidate_books(touched)
+
+
+async def expire_holds(db: AsyncSession, today: Optional[date] = None) -> int:
+    """Hủy các lượt giữ đã quá `hold_expires_at`, chuyển bản sách cho người kế tiếp."""
+    today = today or date.today()
+    book_ids = (await db.scalars(
+        update(Reservation)
+        .where(Reservation.status == ReservationStatus.HELD, Reservation.hold_expires_at < today)
+        .values(status=ReservationStatus.EXPIRED)
+        .returning(Reservation.book_id)
+        .execution_options(synchronize_session=False)
+    )).all()
+    if book_ids:
+        await release_copies(db, Counter(book_ids))
+    await db.commit()
+    if book_ids:
+        events.notify()
+        await bump_pending()
+        await book_cache.invalidate_books(set(book_ids))
+    return len(book_ids)
@@ -0,0 +1,262 @@
+"""Pipeline tạo thumbnail cho ảnh bìa sách.
+
+Mỗi ảnh bìa được render thành ba kích thước (small/medium/large), mỗi kích thước
+hai định dạng WebP và JPEG, lưu qua `app.services.blobs` (content-addressed,
+Cache-Control immutable). Đường dẫn các biến thể lưu ở `Book.cover_thumbnails` và trả về
+trong `BookResponse`, nên lưới catalogue chỉ cần tải bản small thay vì ảnh gốc.
+
+Worker chạy nền trong lifespan:
+- create/update sách có ảnh bìa mới đẩy book id vào hàng đợi (`enqueue`);
+- khi hàng đợi rảnh, worker quét định kỳ các sách còn `cover_thumbnails IS NULL`
+  (sách import, sách có từ trước) theo từng lô.
+
+Lỗi tạm thời (mạng, DNS, timeout, HTTP 429/5xx, lỗi storage) giữ `cover_thumbnails`
+NULL và hẹn thử lại ở `thumbnail_retry_at` theo cấp số nhân; quá
+`THUMBNAIL_MAX_ATTEMPTS` lần hoặc lỗi vĩnh viễn (404, không phải ảnh, ảnh quá lớn)
+thì ghi `{}`. Ảnh từ xa được tải tuần tự, cách nhau ít nhất
+`THUMBNAIL_FETCH_INTERVAL_SECONDS` (Open Library giới hạn tần suất); 429/503 có
+`Retry-After` thì tạm dừng tải tới hết thời gian đó.
+
+Cần gói Pillow (extra `thumbnails`); nếu chưa cài thì worker không chạy và
+`cover_thumbnails` giữ NULL, client dùng `image_path` như cũ.
+"""
+import asyncio
+import io
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import httpx
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.etag import bump_pending
+from app.models import Book
+from app.services import blobs, book_cache
+from app.storage.base import http_client
+from app.storage.local import resolve_path
+
+# Khung tối đa (rộng, cao) của từng biến thể; ảnh nhỏ hơn khung giữ nguyên kích thước
+SIZES: Dict[str, Tuple[int, int]] = {
+    "small": (160, 240),
+    "medium": (320, 480),
+    "large": (640, 960),
+}
+FORMATS = {
+    "webp": ("WEBP", "image/webp", {"quality": 80, "method": 4}),
+    "jpeg": ("JPEG", "image/jpeg", {"quality": 82, "optimize": True, "progressive": True}),
+}
+MAX_SOURCE_BYTES = 20 * 1024 * 1024
+SWEEP_BATCH = 50
+# Mã HTTP đáng thử lại; các mã 4xx khác (404, 403, ...) coi là không có ảnh
+RETRYABLE_STATUS = {408, 425, 429, 500, 502, 503, 504}
+
+_queue: "asyncio.Queue[int]" = asyncio.Queue()
+# Thời điểm (time.monotonic) sớm nhất được tải ảnh từ xa lần kế tiếp
+_next_fetch = 0.0
+
+
+def available() -> bool:
+    try:
+        import PIL  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def enqueue(book_id: int):
+    """Gọi sau khi commit sách có ảnh bìa mới."""
+    _queue.put_nowait(book_id)
+
+
+def source_url(book: Book) -> str:
+    # Sách không có ảnh bìa (vd. import) dùng ảnh theo ISBN như lúc tạo sách
+    path = book.image_path or f"https://covers.openlibrary.org/b/isbn/{book.isbn}-L.jpg"
+    # Open Library trả ảnh 1x1 khi không có bìa, trừ khi yêu cầu default=false
+    if urlsplit(path).hostname == "covers.openlibrary.org" and "default=" not in path:
+        path += "&default=false" if "?" in path else "?default=false"
+    return path
+
+
+async def _throttle():
+    global _next_fetch
+    delay = _next_fetch - time.monotonic()
+    if delay > 0:
+        await asyncio.sleep(delay)
+    _next_fetch = time.monotonic() + settings.THUMBNAIL_FETCH_INTERVAL_SECONDS
+
+
+def _pause_fetches(resp: httpx.Response):
+    """Server báo quá tải (429/503): không tải gì thêm cho tới hết Retry-After."""
+    global _next_fetch
+    try:
+        seconds = float(resp.headers.get("Retry-After", ""))
+    except ValueError:
+        seconds = settings.THUMBNAIL_RETRY_BASE_SECONDS
+    _next_fetch = max(_next_fetch, time.monotonic() + min(seconds, settings.THUMBNAIL_RETRY_MAX_SECONDS))
+
+
+def is_transient(error: Exception) -> bool:
+    """Lỗi có thể tự hết (nên thử lại sau) hay lỗi của chính ảnh nguồn."""
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code in RETRYABLE_STATUS
+    if isinstance(error, httpx.TransportError):
+        return True
+    # Ảnh hỏng / quá lớn (ValueError, PIL.UnidentifiedImageError là OSError), file local không còn
+    if isinstance(error, (ValueError, FileNotFoundError)):
+        return False
+    try:
+        from PIL import UnidentifiedImageError
+    except ImportError:
+        pass
+    else:
+        if isinstance(error, UnidentifiedImageError):
+            return False
+    return True
+
+
+def retry_delay(attempts: int) -> timedelta:
+    seconds = settings.THUMBNAIL_RETRY_BASE_SECONDS * 2 ** (attempts - 1)
+    return timedelta(seconds=min(seconds, settings.THUMBNAIL_RETRY_MAX_SECONDS))
+
+
+async def _fetch(path: str) -> bytes:
+    if urlsplit(path).scheme in ("http", "https"):
+        await _throttle()
+        async with http_client().stream("GET", path, follow_redirects=True) as resp:
+            if resp.status_code in (429, 503):
+                _pause_fetches(resp)
+            resp.raise_for_status()
+            data = bytearray()
+            async for chunk in resp.aiter_bytes():
+                data += chunk
+                if len(data) > MAX_SOURCE_BYTES:
+                    raise ValueError("Cover image too large")
+            return bytes(data)
+
+    # Đường dẫn tương đối do LocalStorage trả về: chỉ đọc trong thư mục upload
+    local = resolve_path(settings.UPLOAD_DIR, path)
+    if os.path.getsize(local) > MAX_SOURCE_BYTES:
+        raise ValueError("Cover image too large")
+    with open(local, "rb") as f:
+        return f.read()
+
+
+def render(source: bytes) -> Dict[str, Dict[str, bytes]]:
+    """Render mọi biến thể từ ảnh gốc (CPU-bound, chạy trong threadpool)."""
+    from PIL import Image, ImageOps
+
+    with Image.open(io.BytesIO(source)) as img:
+        img = ImageOps.exif_transpose(img).convert("RGB")
+        variants: Dict[str, Dict[str, bytes]] = {}
+        for name, box in SIZES.items():
+            thumb = img.copy()
+            thumb.thumbnail(box, Image.Resampling.LANCZOS)
+            variants[name] = {}
+            for fmt, (pil_format, _, options) in FORMATS.items():
+                out = io.BytesIO()
+                thumb.save(out, pil_format, **options)
+                variants[name][fmt] = out.getvalue()
+    return variants
+
+
+def urls(thumbnails: Optional[Dict[str, Dict[str, str]]]) -> List[str]:
+    return [url for formats in (thumbnails or {}).values() for url in formats.values()]
+
+
+async def generate(db: AsyncSession, book: Book) -> Dict[str, Dict[str, str]]:
+    source = await _fetch(source_url(book))
+    variants = await run_in_threadpool(render, source)
+
+    # Lưu như mọi file upload khác (blobs): thumbnail trùng nội dung dùng chung một file
+    keys = [(name, fmt) for name, formats in variants.items() for fmt in formats]
+    pending = [
+        blobs.from_bytes(variants[name][fmt], "covers/thumbs", f".{fmt}", FORMATS[fmt][1])
+        for name, fmt in keys
+    ]
+    thumbnails: Dict[str, Dict[str, str]] = {}
+    for (name, fmt), url in zip(keys, await blobs.acquire(db, pending)):
+        thumbnails.setdefault(name, {})[fmt] = url
+    return thumbnails
+
+
+async def process(db: AsyncSession, book_id: int):
+    book = await db.get(Book, book_id)
+    if book is None:
+        return
+    image_path = book.image_path
+    attempts = book.thumbnail_attempts or 0
+    retry_at = None
+    # Không giữ transaction đọc (Postgres: một kết nối) trong lúc tải ảnh, render và upload
+    await db.commit()
+    try:
+        thumbnails = await generate(db, book)
+    except Exception as e:
+        await db.rollback()
+        attempts += 1
+        if is_transient(e) and attempts < settings.THUMBNAIL_MAX_ATTEMPTS:
+            # Giữ NULL để lần quét sau thử lại
+            print(f"Thumbnail error for book {book_id} (attempt {attempts}, will retry): {e}")
+            thumbnails = None
+            retry_at = datetime.now() + retry_delay(attempts)
+        else:
+            print(f"Thumbnail error for book {book_id} (giving up): {e}")
+            thumbnails = {}
+    else:
+        attempts = 0
+
+    # Ảnh bìa có thể đã bị đổi trong lúc render: bỏ kết quả cũ, lần enqueue sau sẽ xử lý
+    await db.refresh(book)
+    if book.image_path != image_path:
+        await db.rollback()
+        return
+    book.thumbnail_attempts = attempts
+    book.thumbnail_retry_at = retry_at
+    if thumbnails is None:
+        await db.commit()
+        return
+    await blobs.release(db, urls(book.cover_thumbnails))
+    book.cover_thumbnails = thumbnails
+    await db.commit()
+    await bump_pending()
+    await book_cache.invalidate_books([book_id])
+
+
+async def _pending_ids(db: AsyncSession) -> List[int]:
+    return list((await db.scalars(
+        select(Book.id)
+        .where(
+            Book.cover_thumbnails.is_(None),
+            or_(Book.thumbnail_retry_at.is_(None), Book.thumbnail_retry_at <= datetime.now()),
+        )
+        .order_by(Book.id)
+        .limit(SWEEP_BATCH)
+    )).all())
+
+
+async def run_worker(session_factory):
+    timeout = settings.THUMBNAIL_SWEEP_SECONDS
+    while True:
+        try:
+            if timeout:
+                book_ids = [await asyncio.wait_for(_queue.get(), timeout=timeout)]
+            else:
+                book_ids = [_queue.get_nowait()]
+        except (asyncio.TimeoutError, asyncio.QueueEmpty):
+            book_ids = []
+
+        try:
+            async with session_factory() as db:
+                if not book_ids:
+                    book_ids = await _pending_ids(db)
+                    # Còn tồn đọng (vd. sau một đợt import lớn): quét tiếp ngay, không chờ chu kỳ sau
+                    timeout = 0 if len(book_ids) == SWEEP_BATCH else settings.THUMBNAIL_SWEEP_SECONDS
+                for book_id in book_ids:
+                    await process(db, book_id)
+        except Exception as e:
+            print(f"Thumbnail worker error: {e}")
+            timeout = settings.THUMBNAIL_SWEEP_SECONDS
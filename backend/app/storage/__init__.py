@@ -0,0 +1,33 @@
+from app.core.config import settings
+from app.storage.base import (
+    PRIVATE_FOLDERS, StorageBackend, close_http_client, store_bytes, store_upload
+)
+from app.storage.local import ImmutableStaticFiles, LocalStorage
+from app.storage.s3 import S3Storage
+from app.storage.supabase import SupabaseStorage
+
+
+def create_storage() -> StorageBackend:
+    backend = settings.STORAGE_BACKEND
+    if backend is None:
+        backend = "supabase" if settings.SUPABASE_URL and settings.SUPABASE_KEY else "local"
+    if backend == "supabase":
+        return SupabaseStorage(
+            settings.SUPABASE_URL, settings.SUPABASE_KEY, settings.STORAGE_BUCKET, settings.STORAGE_PRIVATE_BUCKET
+        )
+    if backend == "s3":
+        return S3Storage(
+            settings.S3_ENDPOINT_URL,
+            settings.STORAGE_BUCKET,
+            settings.STORAGE_PRIVATE_BUCKET,
+            settings.S3_REGION,
+            settings.S3_ACCESS_KEY_ID,
+            settings.S3_SECRET_ACCESS_KEY,
+            public_url=settings.S3_PUBLIC_URL,
+        )
+    if backend == "local":
+        return LocalStorage(settings.UPLOAD_DIR)
+    raise ValueError(f"Unknown STORAGE_BACKEND: {backend}")
+
+
+storage = create_storage()
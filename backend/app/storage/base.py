@@ -0,0 +1,117 @@
+import asyncio
+from typing import AsyncIterator, Optional
+
+import httpx
+from fastapi import UploadFile
+
+from app.core.config import settings
+
+# Giới hạn số upload chạy đồng thời trên mỗi process: request vượt quá sẽ chờ
+# thay vì cùng lúc giữ buffer và kết nối tới storage.
+_upload_slots = asyncio.Semaphore(settings.STORAGE_MAX_CONCURRENT_UPLOADS)
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# Thư mục (phần đầu của key) chỉ được đọc qua endpoint có kiểm tra quyền, vd. PDF.
+# Driver từ xa lưu chúng ở bucket không công khai và trả về `private://<key>` thay vì URL
+PRIVATE_FOLDERS = ("pdfs",)
+PRIVATE_PREFIX = "private://"
+
+
+def is_private(path: str) -> bool:
+    return path.split("/", 1)[0] in PRIVATE_FOLDERS
+
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+def http_client() -> httpx.AsyncClient:
+    """Client HTTP dùng chung cho mọi driver: giữ kết nối keep-alive tới storage."""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            timeout=httpx.Timeout(60.0, connect=10.0),
+            limits=httpx.Limits(
+                max_connections=settings.STORAGE_HTTP_POOL_SIZE,
+                max_keepalive_connections=settings.STORAGE_HTTP_POOL_SIZE,
+            ),
+        )
+    return _http_client
+
+
+async def close_http_client():
+    if _http_client is not None:
+        await _http_client.aclose()
+
+
+class StorageBackend:
+    """Interface chung của các driver lưu file (PDF, ảnh bìa)."""
+
+    async def upload(
+        self,
+        path: str,
+        chunks: AsyncIterator[bytes],
+        content_type: Optional[str],
+        size: Optional[int] = None,
+        immutable: bool = False,
+    ) -> str:
+        """Ghi dữ liệu từ `chunks` vào `path`, trả về URL (hoặc đường dẫn tương đối) công khai.
+
+        `path` là key gợi ý; driver lưu theo nội dung (content-addressed) có thể
+        thay tên file bằng digest của dữ liệu. `immutable=True` báo rằng nội dung
+        tại key này không bao giờ đổi, driver gắn Cache-Control dài hạn nếu được.
+        Key trong PRIVATE_FOLDERS không có URL công khai (xem `signed_url`).
+        """
+        raise NotImplementedError
+
+    async def signed_url(self, path: str, expires_in: int) -> str:
+        """URL tạm (hết hạn sau `expires_in` giây) để đọc object không công khai tại key `path`."""
+        raise NotImplementedError
+
+    async def delete(self, path: str):
+        """Xóa file tại key `path`; không lỗi nếu file không tồn tại."""
+        raise NotImplementedError
+
+
+async def iter_upload(file: UploadFile, chunk_size: int) -> AsyncIterator[bytes]:
+    """Đọc UploadFile từng chunk; chunk tiếp theo chỉ được đọc khi chunk trước đã gửi xong."""
+    while True:
+        chunk = await file.read(chunk_size)
+        if not chunk:
+            break
+        yield chunk
+
+
+def upload_size(file: UploadFile) -> int:
+    if file.size is not None:
+        return file.size
+    file.file.seek(0, 2)
+    size = file.file.tell()
+    file.file.seek(0)
+    return size
+
+
+async def store_upload(backend: StorageBackend, path: str, file: UploadFile, immutable: bool = False) -> str:
+    async with _upload_slots:
+        return await backend.upload(
+            path,
+            iter_upload(file, backend.chunk_size),
+            file.content_type,
+            size=upload_size(file),
+            immutable=immutable,
+        )
+
+
+async def _single_chunk(data: bytes) -> AsyncIterator[bytes]:
+    yield data
+
+
+async def store_bytes(
+    backend: StorageBackend,
+    path: str,
+    data: bytes,
+    content_type: str,
+    immutable: bool = False,
+) -> str:
+    """Upload dữ liệu đã có sẵn trong bộ nhớ (vd. thumbnail vừa render)."""
+    async with _upload_slots:
+        return await backend.upload(path, _single_chunk(data), content_type, size=len(data), immutable=immutable)
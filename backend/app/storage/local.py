@@ -0,0 +1,88 @@
+import hashlib
+import os
+import uuid
+from typing import AsyncIterator, Iterable, Optional
+
+from fastapi.concurrency import run_in_threadpool
+from fastapi.staticfiles import StaticFiles
+from starlette.exceptions import HTTPException
+
+from app.storage.base import StorageBackend, IMMUTABLE_CACHE_CONTROL
+
+
+class ImmutableStaticFiles(StaticFiles):
+    """Phục vụ thư mục upload local với Cache-Control dài hạn.
+
+    Mọi file trong đó đều có tên duy nhất (digest nội dung hoặc uuid) và không
+    bao giờ bị ghi đè, nên trình duyệt/CDN có thể cache vĩnh viễn. Các thư mục
+    trong `private_dirs` (vd. PDF) không phục vụ công khai mà phải đi qua
+    endpoint có kiểm tra quyền.
+    """
+
+    def __init__(self, *args, private_dirs: Iterable[str] = (), **kwargs):
+        super().__init__(*args, **kwargs)
+        self.private_dirs = tuple(d.strip("/") + "/" for d in private_dirs)
+
+    async def get_response(self, path, scope):
+        if path.replace(os.sep, "/").lstrip("/").startswith(self.private_dirs):
+            raise HTTPException(status_code=404)
+        response = await super().get_response(path, scope)
+        if response.status_code in (200, 304):
+            response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+        return response
+
+
+def resolve_path(root: str, path: str) -> str:
+    """Đường dẫn thật của `path` (dạng LocalStorage trả về); chặn đường dẫn ra ngoài `root`."""
+    root = os.path.realpath(root)
+    local = os.path.realpath(path)
+    if os.path.commonpath([root, local]) != root:
+        raise ValueError(f"Path outside upload dir: {path}")
+    return local
+
+
+class LocalStorage(StorageBackend):
+    """Lưu file vào thư mục local (mount tĩnh tại /<root>).
+
+    Tên file là SHA-256 của nội dung (content-addressed): cùng một file upload
+    nhiều lần chỉ chiếm một chỗ, và URL không đổi khi nội dung không đổi.
+    """
+
+    chunk_size = 1024 * 1024
+
+    def __init__(self, root: str):
+        self.root = root
+
+    async def upload(
+        self,
+        path: str,
+        chunks: AsyncIterator[bytes],
+        content_type: Optional[str],
+        size: Optional[int] = None,
+        immutable: bool = False,
+    ) -> str:
+        folder, name = os.path.split(path)
+        ext = os.path.splitext(name)[1]
+        target_dir = os.path.join(self.root, folder)
+        os.makedirs(target_dir, exist_ok=True)
+        # Ghi ra file tạm rồi rename: không bao giờ lộ file ghi dở
+        tmp = os.path.join(target_dir, f".{uuid.uuid4().hex}.part")
+        digest = hashlib.sha256()
+        try:
+            with open(tmp, "wb") as f:
+                async for chunk in chunks:
+                    digest.update(chunk)
+                    await run_in_threadpool(f.write, chunk)
+            key = f"{folder}/{digest.hexdigest()}{ext}" if folder else f"{digest.hexdigest()}{ext}"
+            os.replace(tmp, os.path.join(self.root, key))
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        return f"{self.root}/{key}"
+
+    async def delete(self, path: str):
+        try:
+            os.remove(os.path.join(self.root, path))
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,182 @@
+import hashlib
+import hmac
+import re
+from datetime import datetime, timezone
+from typing import AsyncIterator, Dict, List, Optional
+from urllib.parse import quote, urlencode, urlsplit, parse_qsl
+
+import httpx
+
+from app.storage.base import PRIVATE_PREFIX, StorageBackend, IMMUTABLE_CACHE_CONTROL, http_client, is_private
+
+UNSIGNED_PAYLOAD = "UNSIGNED-PAYLOAD"
+
+
+def _hmac(key: bytes, msg: str) -> bytes:
+    return hmac.new(key, msg.encode(), hashlib.sha256).digest()
+
+
+def _canonical_query(query: str) -> str:
+    return "&".join(
+        f"{quote(k, safe='~')}={quote(v, safe='~')}"
+        for k, v in sorted(parse_qsl(query, keep_blank_values=True))
+    )
+
+
+class S3Storage(StorageBackend):
+    """Storage S3-compatible (path-style URL, chữ ký SigV4).
+
+    File nhỏ hơn một part được PUT một lần; file lớn hơn dùng multipart upload,
+    mỗi chunk 8 MB là một part, nên bộ nhớ chỉ giữ một part tại một thời điểm.
+    Upload lỗi giữa chừng sẽ bị abort để không để lại part mồ côi trên bucket.
+    Key trong PRIVATE_FOLDERS nằm ở `private_bucket` (không công khai), đọc qua
+    presigned URL.
+    """
+
+    chunk_size = 8 * 1024 * 1024
+
+    def __init__(
+        self,
+        endpoint: str,
+        bucket: str,
+        private_bucket: str,
+        region: str,
+        access_key: str,
+        secret_key: str,
+        public_url: Optional[str] = None,
+    ):
+        self.endpoint = endpoint.rstrip("/")
+        self.bucket = bucket
+        self.private_bucket = private_bucket
+        self.region = region
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self.public_base = (public_url or f"{self.endpoint}/{bucket}").rstrip("/")
+
+    def _url(self, key: str, query: str = "") -> str:
+        bucket = self.private_bucket if is_private(key) else self.bucket
+        url = f"{self.endpoint}/{bucket}/{quote(key, safe='/~')}"
+        return f"{url}?{query}" if query else url
+
+    def _object_url(self, key: str) -> str:
+        return f"{PRIVATE_PREFIX}{key}" if is_private(key) else f"{self.public_base}/{key}"
+
+    def _signature(self, now: datetime, canonical_request: str) -> str:
+        datestamp = now.strftime("%Y%m%d")
+        string_to_sign = "\n".join([
+            "AWS4-HMAC-SHA256",
+            now.strftime("%Y%m%dT%H%M%SZ"),
+            self._scope(now),
+            hashlib.sha256(canonical_request.encode()).hexdigest(),
+        ])
+        key = _hmac(("AWS4" + self.secret_key).encode(), datestamp)
+        for part in (self.region, "s3", "aws4_request"):
+            key = _hmac(key, part)
+        return hmac.new(key, string_to_sign.encode(), hashlib.sha256).hexdigest()
+
+    def _scope(self, now: datetime) -> str:
+        return f"{now.strftime('%Y%m%d')}/{self.region}/s3/aws4_request"
+
+    def _sign(self, method: str, url: str, headers: Dict[str, str]) -> Dict[str, str]:
+        now = datetime.now(timezone.utc)
+        parts = urlsplit(url)
+
+        signed = {
+            **{k.lower(): v for k, v in headers.items()},
+            "host": parts.netloc,
+            "x-amz-date": now.strftime("%Y%m%dT%H%M%SZ"),
+            "x-amz-content-sha256": UNSIGNED_PAYLOAD,
+        }
+        names = sorted(signed)
+        canonical_request = "\n".join([
+            method,
+            parts.path or "/",
+            _canonical_query(parts.query),
+            "".join(f"{name}:{signed[name].strip()}\n" for name in names),
+            ";".join(names),
+            UNSIGNED_PAYLOAD,
+        ])
+        signature = self._signature(now, canonical_request)
+
+        signed["authorization"] = (
+            f"AWS4-HMAC-SHA256 Credential={self.access_key}/{self._scope(now)}, "
+            f"SignedHeaders={';'.join(names)}, Signature={signature}"
+        )
+        del signed["host"]
+        return signed
+
+    async def _request(self, method: str, url: str, headers: Optional[Dict[str, str]] = None, content=None):
+        resp = await http_client().request(
+            method, url, content=content, headers=self._sign(method, url, headers or {})
+        )
+        resp.raise_for_status()
+        return resp
+
+    async def upload(
+        self,
+        path: str,
+        chunks: AsyncIterator[bytes],
+        content_type: Optional[str],
+        size: Optional[int] = None,
+        immutable: bool = False,
+    ) -> str:
+        object_headers = {"content-type": content_type or "application/octet-stream"}
+        if immutable:
+            object_headers["cache-control"] = IMMUTABLE_CACHE_CONTROL
+        if size is not None and size <= self.chunk_size:
+            body = b"".join([chunk async for chunk in chunks])
+            await self._request("PUT", self._url(path), object_headers, body)
+            return self._object_url(path)
+
+        created = await self._request("POST", self._url(path, "uploads"), object_headers)
+        upload_id = re.search(r"<UploadId>(.+?)</UploadId>", created.text).group(1)
+        upload_query = f"uploadId={quote(upload_id, safe='')}"
+
+        etags: List[str] = []
+        try:
+            async for chunk in chunks:
+                part = await self._request(
+                    "PUT",
+                    self._url(path, f"partNumber={len(etags) + 1}&{upload_query}"),
+                    content=chunk,
+                )
+                etags.append(part.headers["ETag"])
+
+            manifest = "".join(
+                f"<Part><PartNumber>{number}</PartNumber><ETag>{etag}</ETag></Part>"
+                for number, etag in enumerate(etags, start=1)
+            )
+            await self._request(
+                "POST",
+                self._url(path, upload_query),
+                {"content-type": "application/xml"},
+                f"<CompleteMultipartUpload>{manifest}</CompleteMultipartUpload>".encode(),
+            )
+        except BaseException:
+            try:
+                await self._request("DELETE", self._url(path, upload_query))
+            except httpx.HTTPError:
+                pass
+            raise
+        return self._object_url(path)
+
+    async def delete(self, path: str):
+        # S3 trả 204 kể cả khi key không tồn tại
+        await self._request("DELETE", self._url(path))
+
+    async def signed_url(self, path: str, expires_in: int) -> str:
+        # Presigned GET (SigV4 qua query string), chỉ ký header host
+        now = datetime.now(timezone.utc)
+        url = self._url(path)
+        parts = urlsplit(url)
+        query = urlencode({
+            "X-Amz-Algorithm": "AWS4-HMAC-SHA256",
+            "X-Amz-Credential": f"{self.access_key}/{self._scope(now)}",
+            "X-Amz-Date": now.strftime("%Y%m%dT%H%M%SZ"),
+            "X-Amz-Expires": str(expires_in),
+            "X-Amz-SignedHeaders": "host",
+        })
+        canonical_request = "\n".join([
+            "GET", parts.path, _canonical_query(query), f"host:{parts.netloc}\n", "host", UNSIGNED_PAYLOAD,
+        ])
+        return f"{url}?{query}&X-Amz-Signature={self._signature(now, canonical_request)}"
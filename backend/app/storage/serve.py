@@ -0,0 +1,76 @@
+import os
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+from fastapi import HTTPException, Request
+from fastapi.responses import FileResponse, StreamingResponse
+from starlette.background import BackgroundTask
+
+from app.core.config import settings
+from app.storage import storage
+from app.storage.base import PRIVATE_PREFIX, http_client
+from app.storage.local import resolve_path
+
+# Header của client được chuyển tiếp tới storage (đọc một đoạn, revalidate)
+FORWARD_HEADERS = ("range", "if-range", "if-none-match", "if-modified-since")
+# Header của storage được trả lại cho client
+UPSTREAM_HEADERS = (
+    "content-length", "content-range", "content-encoding", "accept-ranges", "etag", "last-modified",
+    "content-type",
+)
+# Signed URL của object không công khai chỉ dùng ngay cho request proxy này
+SIGNED_URL_SECONDS = 60
+
+
+async def serve_file(
+    path: str,
+    request: Request,
+    media_type: str,
+    filename: Optional[str] = None,
+    headers: Optional[Dict[str, str]] = None,
+):
+    """Trả file đã lưu (đường dẫn local hoặc URL storage) hỗ trợ HTTP Range.
+
+    - File local: FileResponse của Starlette xử lý Range/If-Range và đọc từng
+      đoạn từ đĩa (hoặc zero-copy nếu server hỗ trợ extension `pathsend`).
+    - File trên storage từ xa: proxy request kèm header Range, stream response
+      về client nên chỉ đoạn được yêu cầu đi qua server. Object không công khai
+      (`private://<key>`) được đọc qua signed URL ngắn hạn của driver.
+    """
+    headers = dict(headers or {})
+    if path.startswith(PRIVATE_PREFIX):
+        path = await storage.signed_url(path[len(PRIVATE_PREFIX):], SIGNED_URL_SECONDS)
+    elif urlsplit(path).scheme not in ("http", "https"):
+        local = resolve_path(settings.UPLOAD_DIR, path)
+        if not os.path.isfile(local):
+            raise FileNotFoundError(path)
+        return FileResponse(
+            local,
+            media_type=media_type,
+            filename=filename,
+            content_disposition_type="inline",
+            headers=headers,
+        )
+
+    upstream = await http_client().send(
+        http_client().build_request(
+            "GET",
+            path,
+            headers={k: v for k, v in request.headers.items() if k.lower() in FORWARD_HEADERS},
+        ),
+        stream=True,
+    )
+    if upstream.status_code >= 500:
+        await upstream.aclose()
+        raise HTTPException(status_code=502, detail="Storage unavailable")
+    headers.update({k: v for k, v in upstream.headers.items() if k.lower() in UPSTREAM_HEADERS})
+    headers.setdefault("accept-ranges", "bytes")
+    if filename:
+        headers["content-disposition"] = f'inline; filename="{filename}"'
+    return StreamingResponse(
+        upstream.aiter_raw(),
+        status_code=upstream.status_code,
+        headers=headers,
+        media_type=headers.pop("content-type", media_type),
+        background=BackgroundTask(upstream.aclose),
+    )
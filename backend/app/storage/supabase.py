@@ -0,0 +1,114 @@
+import base64
+from typing import AsyncIterator, Optional
+
+import httpx
+
+from app.storage.base import PRIVATE_PREFIX, StorageBackend, http_client, is_private
+
+TUS_VERSION = "1.0.0"
+MAX_RETRIES = 3
+
+
+def _metadata(**values: Optional[str]) -> str:
+    return ",".join(f"{k} {base64.b64encode(v.encode()).decode()}" for k, v in values.items() if v)
+
+
+class SupabaseStorage(StorageBackend):
+    """Supabase Storage qua giao thức resumable (TUS).
+
+    File được gửi lần lượt từng chunk 6 MB (kích thước Supabase yêu cầu), nên
+    bộ nhớ mỗi request chỉ giữ một chunk. Nếu một PATCH lỗi, driver hỏi lại
+    offset đã nhận (HEAD) và gửi tiếp phần còn thiếu thay vì upload lại từ đầu.
+    Key trong PRIVATE_FOLDERS nằm ở `private_bucket` (tạo bucket này không công khai)
+    và chỉ đọc được qua signed URL.
+    """
+
+    chunk_size = 6 * 1024 * 1024
+
+    def __init__(self, url: str, key: str, bucket: str, private_bucket: str):
+        self.url = url.rstrip("/")
+        self.bucket = bucket
+        self.private_bucket = private_bucket
+        self._headers = {"Authorization": f"Bearer {key}", "apikey": key, "Tus-Resumable": TUS_VERSION}
+
+    def _bucket(self, path: str) -> str:
+        return self.private_bucket if is_private(path) else self.bucket
+
+    def public_url(self, path: str) -> str:
+        if is_private(path):
+            return f"{PRIVATE_PREFIX}{path}"
+        return f"{self.url}/storage/v1/object/public/{self.bucket}/{path}"
+
+    async def upload(
+        self,
+        path: str,
+        chunks: AsyncIterator[bytes],
+        content_type: Optional[str],
+        size: Optional[int] = None,
+        immutable: bool = False,
+    ) -> str:
+        created = await http_client().post(
+            f"{self.url}/storage/v1/upload/resumable",
+            headers={
+                **self._headers,
+                "Upload-Length": str(size),
+                # Ghi đè nếu key đã có object (vd. blob đã bỏ trong DB nhưng chưa xóa khỏi
+                # storage); không có header này Supabase trả lỗi "already exists"
+                "x-upsert": "true",
+                "Upload-Metadata": _metadata(
+                    bucketName=self._bucket(path),
+                    objectName=path,
+                    contentType=content_type or "application/octet-stream",
+                    # Supabase chỉ nhận max-age (giây)
+                    cacheControl="31536000" if immutable else None,
+                ),
+            },
+        )
+        created.raise_for_status()
+        location = created.headers["Location"]
+
+        offset = 0
+        async for chunk in chunks:
+            await self._send_chunk(location, offset, chunk)
+            offset += len(chunk)
+        return self.public_url(path)
+
+    async def delete(self, path: str):
+        resp = await http_client().delete(
+            f"{self.url}/storage/v1/object/{self._bucket(path)}/{path}", headers=self._headers
+        )
+        # File không tồn tại: Supabase trả 400 kèm statusCode "404" trong body
+        if resp.status_code not in (400, 404):
+            resp.raise_for_status()
+
+    async def signed_url(self, path: str, expires_in: int) -> str:
+        resp = await http_client().post(
+            f"{self.url}/storage/v1/object/sign/{self._bucket(path)}/{path}",
+            json={"expiresIn": expires_in},
+            headers=self._headers,
+        )
+        resp.raise_for_status()
+        # signedURL tương đối so với /storage/v1
+        return f"{self.url}/storage/v1{resp.json()['signedURL']}"
+
+    async def _send_chunk(self, location: str, start: int, chunk: bytes):
+        sent = 0
+        for attempt in range(MAX_RETRIES + 1):
+            try:
+                resp = await http_client().patch(
+                    location,
+                    content=chunk[sent:],
+                    headers={
+                        **self._headers,
+                        "Upload-Offset": str(start + sent),
+                        "Content-Type": "application/offset+octet-stream",
+                    },
+                )
+                resp.raise_for_status()
+                return
+            except (httpx.TransportError, httpx.HTTPStatusError):
+                if attempt == MAX_RETRIES:
+                    raise
+                head = await http_client().head(location, headers=self._headers)
+                head.raise_for_status()
+                sent = int(head.headers["Upload-Offset"]) - start
@@ -0,0 +1,183 @@
+"""Microbenchmark các endpoint danh sách: đường cũ (ORM + response_model) so với đường dòng/fastjson.
+
+Chạy trên một SQLite tạm (không đụng library.db):
+
+    cd backend && python -m benchmarks.list_endpoints [--rows 1000] [--iterations 200]
+
+Đường cũ được dựng lại đúng như trước: load entity ORM (kèm joinedload), validate
+qua `TypeAdapter(List[Schema])` với `from_attributes` rồi encode bằng `json`
+như FastAPI. Đường mới gọi thẳng hàm endpoint hiện tại (trang 100 dòng).
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from typing import List
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PAGE = 100
+
+
+async def _seed(rows: int):
+    from sqlalchemy import insert
+    from app.db.database import AsyncSessionLocal
+    from app.models import Book, Member, Loan, Fine, Reservation
+
+    today = date.today()
+    thumbs = {
+        size: {fmt: f"https://cdn.example.com/covers/thumbs/{size}.{fmt}" for fmt in ("webp", "jpeg")}
+        for size in ("small", "medium", "large")
+    }
+    async with AsyncSessionLocal() as db:
+        await db.execute(insert(Book), [
+            {
+                "title": f"Book {i}", "author": f"Author {i % 97}", "isbn": f"978{i:010d}",
+                "total_copies": 3, "available_copies": 2, "edition": "2nd", "publication_year": 2000 + i % 25,
+                "image_path": f"https://cdn.example.com/covers/{i}.jpg", "cover_thumbnails": thumbs,
+            }
+            for i in range(rows)
+        ])
+        await db.execute(insert(Member), [
+            {"email": f"member{i}@example.com", "full_name": f"Member {i}", "phone": "0901234567", "is_active": True}
+            for i in range(rows)
+        ])
+        await db.execute(insert(Loan), [
+            {
+                "member_id": 1 + i % rows, "book_id": 1 + (i * 7) % rows, "status": "overdue",
+                "loan_date": today - timedelta(days=30), "due_date": today - timedelta(days=10),
+            }
+            for i in range(rows * 2)
+        ])
+        await db.execute(insert(Fine), [
+            {"loan_id": 1 + i % (rows * 2), "amount": 50000, "status": "pending"} for i in range(rows)
+        ])
+        await db.execute(insert(Reservation), [
+            {"member_id": 1 + i % rows, "book_id": 1 + i % 50, "status": "pending", "reservation_date": today}
+            for i in range(rows)
+        ])
+        await db.commit()
+
+
+def _encode(adapter, objects) -> bytes:
+    # Như FastAPI: validate theo response_model, chuyển về kiểu JSON rồi json.dumps
+    content = adapter.dump_python(adapter.validate_python(objects, from_attributes=True), mode="json")
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def _baselines():
+    from pydantic import TypeAdapter
+    from sqlalchemy import select
+    from sqlalchemy.orm import joinedload
+    from app.models import Book, Member, Loan, Reservation
+    from app.schemas import BookResponse, MemberResponse, LoanResponse, ReservationResponse
+    from app.services.reservations import queue_positions
+
+    books = TypeAdapter(List[BookResponse])
+    members = TypeAdapter(List[MemberResponse])
+    loans = TypeAdapter(List[LoanResponse])
+    reservations = TypeAdapter(List[ReservationResponse])
+
+    async def read_books(db):
+        result = await db.execute(select(Book).order_by(Book.id.desc()).limit(PAGE))
+        return _encode(books, result.scalars().all())
+
+    async def read_members(db):
+        result = await db.execute(select(Member).order_by(Member.id.desc()).limit(PAGE))
+        return _encode(members, result.scalars().all())
+
+    async def read_loans(db):
+        result = await db.execute(
+            select(Loan).options(joinedload(Loan.book), joinedload(Loan.member), joinedload(Loan.fines))
+            .order_by(Loan.id.desc()).limit(PAGE)
+        )
+        return _encode(loans, result.unique().scalars().all())
+
+    async def read_reservations(db):
+        result = await db.execute(
+            select(Reservation).options(joinedload(Reservation.book), joinedload(Reservation.member))
+            .order_by(Reservation.id.desc()).limit(PAGE)
+        )
+        rows = result.scalars().all()
+        positions = await queue_positions(db, {r.book_id for r in rows})
+        for reservation in rows:
+            reservation.queue_position = positions.get(reservation.id)
+        return _encode(reservations, rows)
+
+    return {
+        "/books/": read_books,
+        "/members/": read_members,
+        "/loans/": read_loans,
+        "/reservations/": read_reservations,
+    }
+
+
+def _fast_paths():
+    from fastapi import Response
+    from app.routers import books, members, loans, reservations
+    from app.services import book_cache
+
+    page = {"skip": 0, "limit": PAGE, "cursor": None}
+
+    async def read_books(db):
+        # Bỏ qua cache trang để đo đúng đường DB + serialize
+        await book_cache.invalidate_books([], catalogue_changed=True)
+        return (await books.read_books(Response(), q=None, db=db, **page)).body
+
+    async def read_members(db):
+        return (await members.read_members(Response(), q=None, db=db, **page)).body
+
+    async def read_loans(db):
+        return (await loans.read_loans(Response(), fields=None, expand="book,member,fines", db=db, **page)).body
+
+    async def read_reservations(db):
+        return (await reservations.get_reservations(
+            Response(), book_id=None, member_id=None, status=None, db=db, **page
+        )).body
+
+    return {
+        "/books/": read_books,
+        "/members/": read_members,
+        "/loans/": read_loans,
+        "/reservations/": read_reservations,
+    }
+
+
+async def _time(func, iterations: int):
+    from app.db.database import AsyncSessionLocal
+
+    async with AsyncSessionLocal() as db:
+        size = len(await func(db))  # warm-up
+        start = time.perf_counter()
+        for _ in range(iterations):
+            await func(db)
+            db.expunge_all()
+        return (time.perf_counter() - start) / iterations * 1000, size
+
+
+async def _main(rows: int, iterations: int):
+    await _seed(rows)
+    baselines, fast = _baselines(), _fast_paths()
+    print(f"{'endpoint':<16}{'before ms':>11}{'after ms':>10}{'speedup':>9}{'bytes before':>14}{'bytes after':>13}")
+    for path in baselines:
+        before, before_size = await _time(baselines[path], iterations)
+        after, after_size = await _time(fast[path], iterations)
+        print(f"{path:<16}{before:>11.2f}{after:>10.2f}{before / after:>8.1f}x{before_size:>14}{after_size:>13}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark list endpoint serialization")
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    # SQLite tạm: database.py dùng ./library.db theo thư mục hiện tại
+    sys.path.insert(0, BACKEND_DIR)
+    os.environ.pop("DATABASE_URL", None)
+    os.chdir(tempfile.mkdtemp(prefix="bench-"))
+    import app.main  # noqa: F401  (tạo bảng)
+
+    asyncio.run(_main(args.rows, args.iterations))
@@ -0,0 +1,235 @@
+"""Load test qua HTTP thật: nhiều client đồng thời gọi các endpoint đọc chính.
+
+Mặc định tự chạy uvicorn trên một SQLite tạm (không đụng library.db) đã seed sẵn;
+dùng `--url` để bắn vào server có sẵn (vd. bản deploy dùng Postgres/Supabase, hoặc
+một checkout cũ với router sync để so sánh trước/sau):
+
+    cd backend && python -m benchmarks.load [--clients 500] [--seconds 20] [--workers 1]
+    cd backend && python -m benchmarks.load --url http://127.0.0.1:8000 --clients 500
+
+Mỗi client lặp lại một request GET ngẫu nhiên trong MIX (keep-alive, không think
+time). Response 4xx/5xx hoặc lỗi kết nối tính là lỗi. In ra thông lượng, số lỗi
+và phân vị độ trễ theo từng endpoint.
+
+`--borrow N` chạy kịch bản tranh kho thay cho MIX: N thành viên mới cùng lúc mượn
+một cuốn chỉ có `--copies` bản. Kiểm tra không bán vượt (đúng `--copies` lượt 201,
+còn lại 400 "Book is out of stock", kho về 0) và in phân vị độ trễ; `--max-p99`
+cho exit code khác 0 nếu p99 vượt ngưỡng (tùy máy; server và client
+chung CPU nên độ trễ gồm cả thời gian mở 2000 kết nối):
+
+    cd backend && python -m benchmarks.load --borrow 2000 --copies 50 --max-p99 40000
+"""
+import argparse
+import asyncio
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BOOKS = 2000
+MEMBERS = 1000
+LOANS = 3000
+
+MIX = (
+    ("/books/", lambda rng: {"limit": 20, "skip": rng.randint(0, 50)}),
+    ("/books/{id}", lambda rng: {}),
+    ("/loans/", lambda rng: {"limit": 20}),
+    ("/members/summary", lambda rng: {"limit": 20}),
+    ("/analytics/dashboard", lambda rng: {}),
+)
+
+
+async def _seed():
+    from datetime import date, timedelta
+    from sqlalchemy import insert
+    from app.db.database import AsyncSessionLocal
+    from app.models import Book, Member, Loan
+
+    today = date.today()
+    async with AsyncSessionLocal() as db:
+        await db.execute(insert(Book), [
+            {"title": f"Book {i}", "author": f"Author {i % 97}", "isbn": f"978{i:010d}",
+             "total_copies": 5, "available_copies": 4, "cover_thumbnails": {}}
+            for i in range(BOOKS)
+        ])
+        await db.execute(insert(Member), [
+            {"email": f"member{i}@example.com", "full_name": f"Member {i}", "is_active": True}
+            for i in range(MEMBERS)
+        ])
+        await db.execute(insert(Loan), [
+            {"member_id": 1 + i % MEMBERS, "book_id": 1 + i % BOOKS, "status": "active",
+             "loan_date": today, "due_date": today + timedelta(days=14)}
+            for i in range(LOANS)
+        ])
+        await db.commit()
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _start_server(workers: int) -> tuple:
+    directory = tempfile.mkdtemp(prefix="bench-load-")
+    env = {k: v for k, v in os.environ.items() if k != "DATABASE_URL"}
+    env["PYTHONPATH"] = BACKEND_DIR
+    subprocess.run(
+        [sys.executable, "-c", "import asyncio, app.main, benchmarks.load as b; asyncio.run(b._seed())"],
+        cwd=directory, env=env, check=True, capture_output=True,
+    )
+    port = _free_port()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning", "--no-access-log"],
+        cwd=directory, env=env,
+    )
+    return server, f"http://127.0.0.1:{port}"
+
+
+async def _wait_ready(http, deadline: float = 30):
+    start = time.perf_counter()
+    while time.perf_counter() - start < deadline:
+        try:
+            if (await http.get("/")).status_code == 200:
+                return
+        except Exception:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError("Server did not start")
+
+
+async def _client(http, seed: int, deadline: float, stats):
+    rng = random.Random(seed)
+    while time.perf_counter() < deadline:
+        path, params = rng.choice(MIX)
+        url = path.replace("{id}", str(rng.randint(1, BOOKS)))
+        start = time.perf_counter()
+        try:
+            resp = await http.get(url, params=params(rng))
+            ok = resp.status_code < 400
+        except Exception:
+            ok = False
+        if ok:
+            stats[path].append(time.perf_counter() - start)
+        else:
+            stats["errors"].append(1)
+
+
+def _percentile(values, fraction: float) -> float:
+    return sorted(values)[min(len(values) - 1, int(len(values) * fraction))] * 1000
+
+
+async def _run(url: str, clients: int, seconds: float):
+    import httpx
+
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=60) as http:
+        await _wait_ready(http)
+        stats = defaultdict(list)
+        deadline = time.perf_counter() + seconds
+        await asyncio.gather(*(_client(http, i, deadline, stats) for i in range(clients)))
+
+    errors = len(stats.pop("errors", []))
+    total = sum(len(v) for v in stats.values())
+    print(f"{clients} clients, {seconds:.0f}s: {total / seconds:.1f} req/s, {errors} errors")
+    print(f"{'endpoint':<24}{'requests':>10}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for path, latencies in sorted(stats.items()):
+        print(
+            f"{path:<24}{len(latencies):>10}{_percentile(latencies, 0.5):>9.1f}"
+            f"{_percentile(latencies, 0.95):>9.1f}{_percentile(latencies, 0.99):>9.1f}"
+        )
+
+
+async def _borrow_storm(url: str, borrowers: int, copies: int) -> tuple:
+    """N lượt mượn đồng thời cùng một cuốn; trả về (p99 ms, kết quả có đúng không)."""
+    import httpx
+
+    # Bước chuẩn bị không giữ kết nối keep-alive: kết nối idle bị server đóng giữa
+    # hai lượt gửi thành lỗi "Server disconnected" giả
+    setup_limits = httpx.Limits(max_keepalive_connections=0)
+    async with httpx.AsyncClient(base_url=url, limits=setup_limits, timeout=120) as http:
+        await _wait_ready(http)
+        # Thành viên mới (chưa có loan nào) để giới hạn mượn không che mất lỗi bán vượt
+        run_id = f"{time.time_ns()}"
+        members = []
+        for start in range(0, borrowers, 50):
+            responses = await asyncio.gather(*(
+                http.post("/members/", json={"email": f"storm{run_id}-{i}@example.com", "full_name": f"Storm {i}"})
+                for i in range(start, min(start + 50, borrowers))
+            ))
+            members += [resp.json()["id"] for resp in responses]
+        book = (await http.post("/books/", data={
+            "title": "Storm", "author": "Load", "isbn": run_id[-13:], "total_copies": copies,
+        })).json()
+
+    limits = httpx.Limits(max_connections=borrowers, max_keepalive_connections=borrowers)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=120) as http:
+        async def borrow(member_id: int):
+            start = time.perf_counter()
+            try:
+                resp = await http.post("/loans/borrow", json={"book_id": book["id"], "member_id": member_id})
+                outcome = resp.status_code if resp.status_code != 400 else resp.json()["detail"]
+            except Exception as e:
+                outcome = type(e).__name__
+            return outcome, time.perf_counter() - start
+
+        started = time.perf_counter()
+        results = await asyncio.gather(*(borrow(member_id) for member_id in members))
+        elapsed = time.perf_counter() - started
+        available = (await http.get(f"/books/{book['id']}")).json()["available_copies"]
+
+    by_outcome = defaultdict(list)
+    for outcome, latency in results:
+        by_outcome[outcome].append(latency)
+    expected = {201: copies, "Book is out of stock": borrowers - copies}
+    counts = {outcome: len(latencies) for outcome, latencies in by_outcome.items()}
+    ok = counts == {k: v for k, v in expected.items() if v} and available == 0
+
+    latencies = [latency for _, latency in results]
+    print(f"{borrowers} concurrent borrows of {copies} copies in {elapsed:.1f}s; "
+          f"available_copies={available}; {'OK' if ok else 'OVERSOLD / UNEXPECTED'}")
+    print(f"{'outcome':<24}{'requests':>10}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for outcome, values in [*sorted(by_outcome.items(), key=str), ("all", latencies)]:
+        print(
+            f"{str(outcome):<24}{len(values):>10}{_percentile(values, 0.5):>9.1f}"
+            f"{_percentile(values, 0.95):>9.1f}{_percentile(values, 0.99):>9.1f}"
+        )
+    return _percentile(latencies, 0.99), ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTTP load test with many concurrent clients")
+    parser.add_argument("--url", help="Server có sẵn; bỏ trống để tự chạy uvicorn trên SQLite tạm")
+    parser.add_argument("--clients", type=int, default=500)
+    parser.add_argument("--seconds", type=float, default=20)
+    parser.add_argument("--workers", type=int, default=1, help="Số worker uvicorn khi tự chạy server")
+    parser.add_argument("--borrow", type=int, help="Chạy kịch bản N lượt mượn đồng thời thay cho MIX")
+    parser.add_argument("--copies", type=int, default=50, help="Số bản của cuốn sách bị tranh (--borrow)")
+    parser.add_argument("--max-p99", type=float, help="Ngưỡng p99 (ms) cho --borrow; vượt thì exit 1")
+    args = parser.parse_args()
+
+    server = None
+    url = args.url
+    if not url:
+        server, url = _start_server(args.workers)
+    try:
+        if args.borrow:
+            p99, ok = asyncio.run(_borrow_storm(url, args.borrow, args.copies))
+            if not ok or (args.max_p99 is not None and p99 > args.max_p99):
+                sys.exit(1)
+        else:
+            asyncio.run(_run(url, args.clients, args.seconds))
+    finally:
+        if server:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""Benchmark tìm sách: ILIKE '%q%' (đường cũ) so với index FTS5 (`search_page`).
+
+Chạy trên một SQLite tạm (không đụng library.db):
+
+    cd backend && python -m benchmarks.search [--rows 1000000] [--iterations 20]
+
+Seed `--rows` sách với tên ghép từ một bộ từ vựng cố định rồi đo từng từ khóa
+(trang đầu, 100 dòng): đường cũ lọc `or_(title.ilike, author.ilike, isbn.ilike)`
+rồi `paginate_mappings` theo id giảm dần như `read_books` trước đây; đường mới là `search_page` như
+`GET /books/?q=` gọi (đếm thử số dòng khớp rồi xếp hạng bm25, hoặc trả dòng mới
+nhất trước nếu từ khóa quá ngắn hoặc khớp quá `RANK_LIMIT` dòng). Cột "ranked" cho biết đường nào được chọn.
+Các từ khóa đầu là những phím gõ đầu tiên của ô tìm kiếm ("c", "cl", ... "clean").
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PAGE = 100
+CHUNK = 20000
+WORDS = (
+    "clean code python data systems design history ocean garden river mountain music "
+    "science theory modern classic secret journey winter summer light shadow city"
+).split()
+# Gõ dần một từ phổ biến, tiền tố dài, ISBN, nhiều từ, từ hiếm kèm từ phổ biến,
+# tên tác giả không khớp (ILIKE quét hết bảng)
+QUERIES = (
+    "c", "cl", "cle", "clea", "clean", "pyth", "python", "9780000012345",
+    "journey winter light", "clean 12345", "tolstoy",
+)
+
+
+async def _seed(rows: int):
+    from sqlalchemy import insert
+    from app.db.database import AsyncSessionLocal
+    from app.models import Book
+
+    rng = random.Random(42)
+    async with AsyncSessionLocal() as db:
+        for start in range(0, rows, CHUNK):
+            await db.execute(insert(Book), [
+                {
+                    "title": " ".join(rng.sample(WORDS, 3)).title() + f" {i}",
+                    "author": f"{rng.choice(WORDS).title()} {rng.choice(WORDS).title()}",
+                    "isbn": f"978{i:010d}", "total_copies": 1, "available_copies": 1,
+                }
+                for i in range(start, min(start + CHUNK, rows))
+            ])
+            await db.commit()
+
+
+async def _ilike(db, q: str):
+    from fastapi import Response
+    from sqlalchemy import select, or_
+    from app.core.fastjson import schema_columns
+    from app.core.pagination import paginate_mappings
+    from app.models import Book
+    from app.schemas import BookResponse
+
+    search = f"%{q}%"
+    query = select(*schema_columns(Book, BookResponse)).where(
+        or_(Book.title.ilike(search), Book.author.ilike(search), Book.isbn.ilike(search))
+    )
+    return await paginate_mappings(db, query, Book.id, Response(), limit=PAGE)
+
+
+async def _search(db, q: str):
+    from fastapi import Response
+    from sqlalchemy import select
+    from app.core.fastjson import schema_columns
+    from app.db.search import search_page
+    from app.models import Book
+    from app.schemas import BookResponse
+
+    return await search_page(db, select(*schema_columns(Book, BookResponse)), Book, q, Response(), limit=PAGE)
+
+
+async def _time(run, iterations: int):
+    from app.db.database import AsyncSessionLocal
+
+    async with AsyncSessionLocal() as db:
+        count = len(await run(db))  # warm-up
+        start = time.perf_counter()
+        for _ in range(iterations):
+            await run(db)
+        return (time.perf_counter() - start) / iterations * 1000, count
+
+
+async def _main(rows: int, iterations: int):
+    from app.db.database import AsyncSessionLocal
+    from app.db.search import RANK_MIN_LENGTH, _rankable, _tokens
+    from app.models import Book
+
+    start = time.perf_counter()
+    await _seed(rows)
+    print(f"seeded {rows} books in {time.perf_counter() - start:.1f}s")
+    print(f"{'query':<24}{'ILIKE ms':>10}{'FTS ms':>10}{'ranked':>8}{'rows ILIKE':>12}{'rows FTS':>10}")
+    for q in QUERIES:
+        before, before_rows = await _time(lambda db: _ilike(db, q), iterations)
+        after, after_rows = await _time(lambda db: _search(db, q), iterations)
+        async with AsyncSessionLocal() as db:
+            ranked = max(map(len, _tokens(q))) >= RANK_MIN_LENGTH and await _rankable(db, Book, q)
+        print(f"{q:<24}{before:>10.2f}{after:>10.2f}{'yes' if ranked else 'no':>8}{before_rows:>12}{after_rows:>10}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark ILIKE vs full-text book search")
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--iterations", type=int, default=20)
+    args = parser.parse_args()
+
+    # SQLite tạm: database.py dùng ./library.db theo thư mục hiện tại
+    sys.path.insert(0, BACKEND_DIR)
+    os.environ.pop("DATABASE_URL", None)
+    os.chdir(tempfile.mkdtemp(prefix="bench-search-"))
+    import app.main  # noqa: F401  (tạo bảng + FTS5)
+
+    asyncio.run(_main(args.rows, args.iterations))
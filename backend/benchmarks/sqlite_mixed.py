@@ -0,0 +1,142 @@
+"""Benchmark thông lượng đọc/ghi đan xen trên SQLite: mặc định so với SQLITE_TUNED.
+
+Giống chạy `uvicorn --workers N`: `--processes` process cùng dùng một file SQLite
+tạm (không đụng library.db), mỗi process gọi app qua ASGI với `--clients`
+client đồng thời. Mỗi client lặp lại: với xác suất `--write-ratio` thì mượn rồi
+trả một cuốn (2 transaction ghi), còn lại đọc `/loans/` hoặc `/members/summary`
+(trang 20 dòng). Request lỗi 5xx (vd. "database is locked") được đếm riêng.
+
+    cd backend && python -m benchmarks.sqlite_mixed [--processes 4] [--clients 8] [--seconds 10] [--write-ratio 0.2]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BOOKS = 200
+MEMBERS = 500
+
+
+async def _seed():
+    from sqlalchemy import insert
+    from app.db.database import AsyncSessionLocal
+    from app.models import Book, Member
+
+    async with AsyncSessionLocal() as db:
+        await db.execute(insert(Book), [
+            {"title": f"Book {i}", "author": "Author", "isbn": f"978{i:010d}", "total_copies": 1000, "available_copies": 1000}
+            for i in range(BOOKS)
+        ])
+        await db.execute(insert(Member), [
+            {"email": f"member{i}@example.com", "full_name": f"Member {i}", "is_active": True}
+            for i in range(MEMBERS)
+        ])
+        await db.commit()
+
+
+async def _client(http, member_id: int, deadline: float, write_ratio: float, result: dict):
+    rng = random.Random(member_id)
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        if rng.random() < write_ratio:
+            kind = "writes"
+            resp = await http.post("/loans/borrow", json={"book_id": rng.randint(1, BOOKS), "member_id": member_id})
+            if resp.status_code == 201:
+                resp = await http.post(f"/loans/return/{resp.json()['id']}")
+        else:
+            kind = "reads"
+            path = "/loans/" if rng.random() < 0.5 else "/members/summary"
+            resp = await http.get(path, params={"limit": 20})
+        if resp.status_code >= 500:
+            result["errors"] += 1
+            result["last_error"] = resp.text[:200]
+        else:
+            result[kind] += 1
+            result["latencies"].append(time.perf_counter() - start)
+
+
+async def _work(first_member: int, clients: int, seconds: float, write_ratio: float) -> dict:
+    import httpx
+    from app.main import app
+
+    result = {"reads": 0, "writes": 0, "errors": 0, "last_error": None, "latencies": []}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as http:
+        deadline = time.perf_counter() + seconds
+        await asyncio.gather(*(
+            _client(http, member_id, deadline, write_ratio, result)
+            for member_id in range(first_member, first_member + clients)
+        ))
+    return result
+
+
+def _child(args):
+    sys.path.insert(0, BACKEND_DIR)
+    os.environ.pop("DATABASE_URL", None)
+    os.chdir(args.dir)
+    if args.seed:
+        import app.main  # noqa: F401  (tạo bảng)
+        asyncio.run(_seed())
+        return
+    result = asyncio.run(_work(args.first_member, args.clients, args.seconds, args.write_ratio))
+    print(json.dumps(result))
+
+
+def _bench(args, tuned: str) -> dict:
+    directory = tempfile.mkdtemp(prefix="bench-sqlite-")
+    env = {**os.environ, "SQLITE_TUNED": tuned}
+    command = [sys.executable, "-m", "benchmarks.sqlite_mixed", "--child", "--dir", directory]
+    subprocess.run(command + ["--seed"], cwd=BACKEND_DIR, env=env, capture_output=True, check=True)
+
+    options = ["--clients", str(args.clients), "--seconds", str(args.seconds), "--write-ratio", str(args.write_ratio)]
+    workers = [
+        subprocess.Popen(
+            command + options + ["--first-member", str(1 + i * args.clients)],
+            cwd=BACKEND_DIR, env=env, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True,
+        )
+        for i in range(args.processes)
+    ]
+    total = {"reads": 0, "writes": 0, "errors": 0, "last_error": None, "latencies": []}
+    for worker in workers:
+        out, _ = worker.communicate()
+        result = json.loads(out.strip().splitlines()[-1])
+        for key in ("reads", "writes", "errors", "latencies"):
+            total[key] += result[key]
+        total["last_error"] = total["last_error"] or result["last_error"]
+
+    latencies = sorted(total.pop("latencies"))
+    total["ops_per_s"] = round((total["reads"] + total["writes"]) / args.seconds, 1)
+    total["p95_ms"] = round(latencies[int(len(latencies) * 0.95)] * 1000, 1) if latencies else None
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mixed read/write throughput on SQLite")
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--clients", type=int, default=8, help="Số client đồng thời mỗi process")
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--write-ratio", type=float, default=0.2)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--seed", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--dir", help=argparse.SUPPRESS)
+    parser.add_argument("--first-member", type=int, default=1, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        return _child(args)
+
+    print(f"{'mode':<10}{'ops/s':>9}{'reads':>8}{'writes':>8}{'errors':>8}{'p95 ms':>9}")
+    for mode, tuned in (("default", "false"), ("tuned", "true")):
+        r = _bench(args, tuned)
+        print(f"{mode:<10}{r['ops_per_s']:>9}{r['reads']:>8}{r['writes']:>8}{r['errors']:>8}{r['p95_ms']:>9}")
+        if r["last_error"]:
+            print(f"  last error: {r['last_error']}")
+
+
+if __name__ == "__main__":
+    main()
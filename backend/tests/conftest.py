@@ -0,0 +1,101 @@
+"""Fixture chung: app chạy trên một SQLite tạm qua TestClient.
+
+database.py dùng ./library.db theo thư mục hiện tại, nên phải chuyển sang thư mục
+tạm trước khi import app. Mỗi test tự tạo sách / thành viên riêng (ISBN, email
+không trùng) thay vì dọn database giữa các test.
+"""
+import itertools
+import os
+import tempfile
+from contextlib import contextmanager
+
+import pytest
+
+_ids = itertools.count(1)
+
+
+def pytest_sessionstart(session):
+    # Chạy trước khi collect các module test (chúng import app)
+    os.environ.pop("DATABASE_URL", None)
+    os.environ["STORAGE_BACKEND"] = "local"
+    os.chdir(tempfile.mkdtemp(prefix="library-tests-"))
+
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+    from app.main import app
+    from app.services import thumbnails
+
+    # Worker thumbnail tải ảnh bìa từ Open Library: không chạy trong test
+    thumbnails.available = lambda: False
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def run(client):
+    """Chạy coroutine trên event loop của app (cùng loop với engine async)."""
+    return client.portal.call
+
+
+@pytest.fixture
+def make_book(client):
+    def create(copies: int = 1, files=None, **fields):
+        n = next(_ids)
+        data = {"title": f"Book {n}", "author": "Author", "isbn": f"979{n:010d}", "total_copies": copies, **fields}
+        resp = client.post("/books/", data=data, files=files)
+        assert resp.status_code == 201, resp.text
+        return resp.json()
+    return create
+
+
+@pytest.fixture
+def make_member(client):
+    def create(**fields):
+        n = next(_ids)
+        data = {"email": f"member{n}@example.com", "full_name": f"Member {n}", **fields}
+        resp = client.post("/members/", json=data)
+        assert resp.status_code == 201, resp.text
+        return resp.json()
+    return create
+
+
+@pytest.fixture
+def drain_outbox(run):
+    """Xử lý hết sự kiện outbox ngay (không chờ worker nền)."""
+    from app.db.database import AsyncSessionLocal
+    from app.services import events
+
+    async def drain():
+        async with AsyncSessionLocal() as db:
+            while await events.dispatch_pending(db):
+                pass
+
+    return lambda: run(drain)
+
+
+@pytest.fixture
+def captured_sql(client):
+    """Context manager ghi lại (sql, params) của mọi câu lệnh đi qua engine async."""
+    from sqlalchemy import event
+    from app.db.database import async_engine, writer_engine
+
+    @contextmanager
+    def capture():
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            if not executemany:
+                statements.append((statement, parameters))
+
+        engines = [e.sync_engine for e in (async_engine, writer_engine) if e is not None]
+        for target in engines:
+            event.listen(target, "before_cursor_execute", record)
+        try:
+            yield statements
+        finally:
+            for target in engines:
+                event.remove(target, "before_cursor_execute", record)
+
+    return capture
@@ -0,0 +1,169 @@
+import asyncio
+import os
+
+import pytest
+
+
+@pytest.fixture
+def blob_session(run):
+    """Chạy `func(db, blobs)` trong một session mới trên loop của app."""
+    from app.db.database import AsyncSessionLocal
+    from app.services import blobs
+
+    def call(func):
+        async def wrapper():
+            async with AsyncSessionLocal() as db:
+                return await func(db, blobs)
+        return run(wrapper)
+
+    return call
+
+
+def _row(blob_session, digest):
+    from app.models import Blob
+
+    async def read(db, blobs):
+        blob = await db.get(Blob, digest)
+        return blob and (blob.ref_count, blob.released_at is not None)
+
+    return blob_session(read)
+
+
+def test_upload_in_rolled_back_transaction_is_collected(blob_session, monkeypatch):
+    from app.core.config import settings
+
+    pending = None
+
+    async def upload_then_rollback(db, blobs):
+        nonlocal pending
+        pending = blobs.from_bytes(b"rolled back " + os.urandom(8), "tests", ".bin", "application/octet-stream")
+        await blobs.acquire(db, [pending])
+        await db.rollback()
+        await asyncio.gather(*blobs._cleanup_tasks)
+
+    blob_session(upload_then_rollback)
+    path = os.path.join(settings.UPLOAD_DIR, pending.key)
+    assert os.path.exists(path)
+    assert _row(blob_session, pending.digest) == (0, True)
+
+    monkeypatch.setattr(settings, "BLOB_GC_GRACE_SECONDS", -1)
+    assert blob_session(lambda db, blobs: blobs.collect_garbage(db)) >= 1
+    assert not os.path.exists(path)
+    assert _row(blob_session, pending.digest) is None
+
+
+def test_committed_upload_is_kept(blob_session, monkeypatch):
+    from app.core.config import settings
+
+    async def upload_and_commit(db, blobs):
+        pending = blobs.from_bytes(b"committed " + os.urandom(8), "tests", ".bin", "application/octet-stream")
+        await blobs.acquire(db, [pending])
+        await db.commit()
+        await asyncio.gather(*blobs._cleanup_tasks)
+        return pending
+
+    pending = blob_session(upload_and_commit)
+    monkeypatch.setattr(settings, "BLOB_GC_GRACE_SECONDS", -1)
+    blob_session(lambda db, blobs: blobs.collect_garbage(db))
+    assert _row(blob_session, pending.digest) == (1, False)
+    assert os.path.exists(os.path.join(settings.UPLOAD_DIR, pending.key))
+
+
+def test_gc_keeps_blob_row_when_storage_delete_fails(blob_session, monkeypatch):
+    from app.core.config import settings
+    from app.services import blobs
+
+    async def upload_and_release(db, blobs):
+        pending = blobs.from_bytes(b"released " + os.urandom(8), "tests", ".bin", "application/octet-stream")
+        [url] = await blobs.acquire(db, [pending])
+        await db.commit()
+        await blobs.release(db, [url])
+        await db.commit()
+        return pending
+
+    pending = blob_session(upload_and_release)
+    monkeypatch.setattr(settings, "BLOB_GC_GRACE_SECONDS", -1)
+
+    async def failing_delete(path):
+        raise RuntimeError("storage unavailable")
+
+    with monkeypatch.context() as m:
+        m.setattr(blobs.storage, "delete", failing_delete)
+        blob_session(lambda db, blobs: blobs.collect_garbage(db))
+    assert _row(blob_session, pending.digest) == (0, True)
+
+    blob_session(lambda db, blobs: blobs.collect_garbage(db))
+    assert _row(blob_session, pending.digest) is None
+    assert not os.path.exists(os.path.join(settings.UPLOAD_DIR, pending.key))
+
+
+def test_upload_runs_outside_any_transaction(blob_session, monkeypatch):
+    in_transaction = []
+
+    async def acquire_existing_and_new(db, blobs):
+        existing = blobs.from_bytes(b"existing " + os.urandom(8), "tests", ".bin", "application/octet-stream")
+        await blobs.acquire(db, [existing])
+        await db.commit()
+
+        original = blobs._upload
+
+        async def upload(blob):
+            in_transaction.append(db.in_transaction())
+            return await original(blob)
+
+        monkeypatch.setattr(blobs, "_upload", upload)
+        new = blobs.from_bytes(b"new " + os.urandom(8), "tests", ".bin", "application/octet-stream")
+        await blobs.acquire(db, [existing, new])
+        await db.commit()
+        return existing, new
+
+    existing, new = blob_session(acquire_existing_and_new)
+    assert in_transaction == [False]
+    assert _row(blob_session, existing.digest) == (2, False)
+    assert _row(blob_session, new.digest) == (1, False)
+
+
+def test_acquire_waits_for_gc_then_uploads_again(blob_session, monkeypatch):
+    from app.core.config import settings
+    from app.services import blobs
+
+    content = b"collected " + os.urandom(8)
+
+    async def upload_and_release(db, blobs):
+        pending = blobs.from_bytes(content, "tests", ".bin", "application/octet-stream")
+        [url] = await blobs.acquire(db, [pending])
+        await db.commit()
+        await blobs.release(db, [url])
+        await db.commit()
+        return pending
+
+    async def acquire_again():
+        from app.db.database import AsyncSessionLocal
+
+        async with AsyncSessionLocal() as db:
+            await blobs.acquire(db, [blobs.from_bytes(content, "tests", ".bin", "application/octet-stream")])
+            await db.commit()
+
+    pending = blob_session(upload_and_release)
+    monkeypatch.setattr(settings, "BLOB_GC_GRACE_SECONDS", -1)
+    monkeypatch.setattr(blobs, "GC_POLL_SECONDS", 0.05)
+    original_delete = blobs.storage.delete
+    waiting = []
+
+    async def delete_while_acquiring(path):
+        # GC đã commit dấu: request dùng lại blob này phải chờ, không upload đè trước khi xóa
+        task = asyncio.create_task(acquire_again())
+        await asyncio.sleep(0.3)
+        waiting.append((task, task.done()))
+        await original_delete(path)
+
+    async def collect(db, blobs):
+        with monkeypatch.context() as m:
+            m.setattr(blobs.storage, "delete", delete_while_acquiring)
+            await blobs.collect_garbage(db)
+        await waiting[0][0]
+
+    blob_session(collect)
+    assert waiting[0][1] is False
+    assert _row(blob_session, pending.digest) == (1, False)
+    assert os.path.exists(os.path.join(settings.UPLOAD_DIR, pending.key))
@@ -0,0 +1,31 @@
+"""Read-through cache của sách (app/services/book_cache.py): giá trị đọc trước khi
+một writer commit không được nằm lại trong cache sau khi writer đã vô hiệu hóa."""
+from app.services import book_cache
+
+
+def test_read_before_invalidation_is_not_cached(client, run, make_book):
+    book = make_book(copies=1)
+
+    async def race():
+        generation = await book_cache.generation()
+        # Reader đọc dòng cũ; writer commit rồi invalidate trước khi reader kịp set
+        await book_cache.invalidate_books([book["id"]])
+        await book_cache.set_book(book["id"], b'{"stale": true}', generation)
+        return await book_cache.get_book(book["id"])
+
+    assert run(race) is None
+
+
+def test_invalidation_between_check_and_set_drops_the_value(client, run, make_book, monkeypatch):
+    book = make_book(copies=1)
+    original_set = book_cache.cache.set
+
+    async def set_after_invalidation(key, *args, **kwargs):
+        await book_cache.invalidate_books([book["id"]])
+        await original_set(key, *args, **kwargs)
+
+    monkeypatch.setattr(book_cache.cache, "set", set_after_invalidation)
+    assert client.get(f"/books/{book['id']}").status_code == 200
+    monkeypatch.undo()
+
+    assert run(book_cache.get_book, book["id"]) is None
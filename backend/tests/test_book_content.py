@@ -0,0 +1,63 @@
+"""PDF của sách chỉ đọc được qua /books/{id}/content với token của /loans/check-access."""
+import os
+
+import pytest
+
+
+@pytest.fixture
+def borrowed_pdf(client, make_book, make_member):
+    content = b"%PDF-1.4 " + os.urandom(4096)
+    book = make_book(files={"file": ("book.pdf", content, "application/pdf")})
+    member = make_member()
+    loan = client.post("/loans/borrow", json={"book_id": book["id"], "member_id": member["id"]}).json()
+    return book, member, loan, content
+
+
+def _token(client, book, member):
+    return client.get(
+        "/loans/check-access", params={"book_id": book["id"], "member_id": member["id"]}
+    ).json()["content_token"]
+
+
+def test_responses_do_not_expose_file_location(client, borrowed_pdf):
+    book, _, _, _ = borrowed_pdf
+    assert "file_path" not in book and book["has_file"] is True
+    assert "file_path" not in client.get(f"/books/{book['id']}").json()
+    listed = next(b for b in client.get("/books/", params={"limit": 1000}).json() if b["id"] == book["id"])
+    assert "file_path" not in listed and listed["has_file"] is True
+
+
+def test_content_requires_a_token_for_the_borrowing_member(client, borrowed_pdf, make_member):
+    book, member, _, content = borrowed_pdf
+    url = f"/books/{book['id']}/content"
+
+    assert client.get(url, params={"member_id": member["id"]}).status_code == 422
+    assert _token(client, book, make_member()) is None
+
+    token = _token(client, book, member)
+    forged = token.replace(f".{member['id']}.", f".{member['id'] + 1}.", 1)
+    assert client.get(url, params={"token": forged}).status_code == 403
+    assert client.get(f"/books/{book['id'] + 1}/content", params={"token": token}).status_code == 403
+
+    resp = client.get(url, params={"token": token}, headers={"Range": "bytes=0-99"})
+    assert resp.status_code == 206
+    assert resp.content == content[:100]
+
+
+def test_returning_the_book_revokes_the_token(client, borrowed_pdf):
+    book, member, loan, _ = borrowed_pdf
+    token = _token(client, book, member)
+    client.post(f"/loans/return/{loan['id']}")
+
+    assert client.get(f"/books/{book['id']}/content", params={"token": token}).status_code == 403
+
+
+def test_expired_token_is_rejected(client, borrowed_pdf, monkeypatch):
+    from app.core import content_tokens
+    from app.core.config import settings
+
+    book, member, _, _ = borrowed_pdf
+    monkeypatch.setattr(settings, "CONTENT_TOKEN_SECONDS", -1)
+    token = content_tokens.issue(book["id"], member["id"])
+
+    assert client.get(f"/books/{book['id']}/content", params={"token": token}).status_code == 403
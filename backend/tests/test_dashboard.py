@@ -0,0 +1,59 @@
+import asyncio
+
+
+class FakeSession:
+    """Trả lần lượt kết quả các câu đếm của `reconcile`; `during` chạy sau câu thứ `at`."""
+
+    def __init__(self, counts, during=None, at=1):
+        self.counts = list(counts)
+        self.during = during
+        self.at = at
+        self.calls = 0
+
+    async def scalar(self, stmt):
+        value = self.counts[self.calls]
+        self.calls += 1
+        if self.calls == self.at and self.during:
+            self.during()
+        return value
+
+
+def _counters():
+    from app.services.dashboard import DashboardCounters
+    return DashboardCounters(refresh_seconds=60)
+
+
+def test_adjust_during_reconcile_is_not_lost():
+    counters = _counters()
+    asyncio.run(counters.reconcile(FakeSession([10, 3, 0, 0, 0])))
+
+    # Thành viên thứ 4 commit sau câu đếm members, adjust tới trước khi đối soát xong
+    asyncio.run(counters.reconcile(FakeSession(
+        [10, 3, 0, 0, 0], during=lambda: counters.adjust(total_members=1), at=2
+    )))
+    snapshot = asyncio.run(counters.snapshot(FakeSession([10, 4, 0, 0, 0])))
+    assert snapshot["total_members"] == 4
+    assert snapshot["total_books"] == 10
+
+
+def test_touched_counter_keeps_live_value_until_next_reconcile():
+    counters = _counters()
+    asyncio.run(counters.reconcile(FakeSession([10, 3, 0, 0, 0])))
+    asyncio.run(counters.reconcile(FakeSession(
+        [11, 3, 0, 0, 0], during=lambda: counters.adjust(total_members=1), at=2
+    )))
+    # Bộ đếm không bị đụng tới nhận kết quả đếm, bộ đếm bị đụng tới giữ giá trị cộng dồn
+    assert counters._values["total_books"] == 11
+    assert counters._values["total_members"] == 4
+    assert counters._needs_reconcile()
+
+
+def test_adjust_before_first_reconcile_finishes_triggers_another():
+    counters = _counters()
+    asyncio.run(counters.reconcile(FakeSession(
+        [0, 3, 0, 0, 0], during=lambda: counters.adjust(total_members=1), at=2
+    )))
+    assert counters._needs_reconcile()
+    snapshot = asyncio.run(counters.snapshot(FakeSession([0, 4, 0, 0, 0])))
+    assert snapshot["total_members"] == 4
+    assert not counters._needs_reconcile()
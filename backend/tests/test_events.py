@@ -0,0 +1,83 @@
+from datetime import datetime
+
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.db.database import AsyncSessionLocal
+from app.models import OutboxEvent
+from app.services import events
+
+FLAKY = "test.flaky"
+handled = []
+
+
+@events.handler(FLAKY)
+async def flaky(db, payloads):
+    if any(p.get("fail") for p in payloads):
+        raise RuntimeError("boom")
+    handled.extend(p["n"] for p in payloads)
+    await db.commit()
+
+
+async def _emit(payloads):
+    async with AsyncSessionLocal() as db:
+        for payload in payloads:
+            await events.emit(db, FLAKY, payload)
+        await db.commit()
+
+
+async def _dispatch():
+    async with AsyncSessionLocal() as db:
+        await events.dispatch_pending(db)
+
+
+async def _state():
+    async with AsyncSessionLocal() as db:
+        rows = (await db.execute(
+            select(OutboxEvent.payload, OutboxEvent.attempts, OutboxEvent.next_attempt_at,
+                   OutboxEvent.dead_at, OutboxEvent.processed_at)
+            .where(OutboxEvent.topic == FLAKY)
+        )).all()
+    return {row.payload["n"]: row for row in rows}
+
+
+def test_failing_event_does_not_fail_its_group(run):
+    handled.clear()
+    run(_emit, [{"n": 1}, {"n": 2, "fail": True}, {"n": 3}])
+    run(_dispatch)
+
+    state = run(_state)
+    assert sorted(handled) == [1, 3]
+    assert state[1].processed_at and state[3].processed_at
+    assert state[1].attempts == state[3].attempts == 0
+    bad = state[2]
+    assert bad.processed_at is None and bad.dead_at is None
+    assert bad.attempts == 1
+    assert bad.next_attempt_at > datetime.now()
+
+    # Chưa tới lượt thử lại: lần quét kế tiếp bỏ qua
+    run(_dispatch)
+    assert run(_state)[2].attempts == 1
+
+
+def test_event_is_dead_lettered_after_max_attempts(run, client, monkeypatch):
+    monkeypatch.setattr(settings, "OUTBOX_RETRY_BASE_SECONDS", 0)
+    monkeypatch.setattr(settings, "OUTBOX_MAX_ATTEMPTS", 3)
+    run(_emit, [{"n": 10, "fail": True}])
+
+    for _ in range(5):
+        run(_dispatch)
+
+    event = run(_state)[10]
+    assert event.attempts == 3
+    assert event.dead_at is not None and event.processed_at is None
+
+    outbox = client.get("/health/outbox").json()
+    assert outbox["dead"] >= 1
+    assert any(e["payload"] == {"n": 10, "fail": True} for e in outbox["dead_events"])
+
+
+def test_retry_delay_grows_exponentially_up_to_max(monkeypatch):
+    monkeypatch.setattr(settings, "OUTBOX_RETRY_BASE_SECONDS", 30)
+    monkeypatch.setattr(settings, "OUTBOX_RETRY_MAX_SECONDS", 200)
+    assert [events.retry_delay(n).total_seconds() for n in (1, 2, 3, 4)] == [30, 60, 120, 200]
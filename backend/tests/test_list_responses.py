@@ -0,0 +1,34 @@
+"""Các endpoint danh sách trả JSON nhanh (app/core/fastjson.py), không qua
+`response_model`: dữ liệu thật phải khớp schema khai báo trong OpenAPI."""
+from typing import List
+
+import pytest
+from pydantic import TypeAdapter
+
+
+@pytest.fixture
+def sample_data(client, make_book, make_member):
+    book, member = make_book(copies=2), make_member()
+    client.post("/loans/borrow", json={"book_id": book["id"], "member_id": member["id"]})
+    client.post("/reservations/reserve", json={"book_id": book["id"], "member_id": make_member()["id"]})
+
+
+@pytest.mark.parametrize("path, schema_name, params", [
+    ("/books/", "BookResponse", {}),
+    ("/members/", "MemberResponse", {}),
+    ("/loans/", "LoanListItem", {"expand": "book,member,fines"}),
+    ("/loans/", "LoanListItem", {"fields": "due_date", "expand": ""}),
+    ("/reservations/", "ReservationResponse", {}),
+])
+def test_fast_list_matches_documented_schema(client, sample_data, path, schema_name, params):
+    from app import schemas
+
+    documented = client.get("/openapi.json").json()["paths"][path]["get"]["responses"]["200"]
+    assert documented["content"]["application/json"]["schema"]["items"]["$ref"].endswith(f"/{schema_name}")
+
+    schema = getattr(schemas, schema_name)
+    rows = client.get(path, params=params).json()
+    assert rows
+    TypeAdapter(List[schema]).validate_python(rows)
+    for row in rows:
+        assert set(row) <= set(schema.model_fields), set(row) - set(schema.model_fields)
@@ -0,0 +1,101 @@
+import asyncio
+from collections import Counter
+
+import httpx
+import pytest
+
+from app.main import app
+
+# Đủ để lộ race trong unit test; tải hàng nghìn lượt mượn đồng thời và p99 đo bằng
+# `python -m benchmarks.load --borrow 2000`
+PARALLEL = 40
+
+
+async def _concurrently(requests):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+        return await asyncio.gather(*(
+            http.delete(url) if body == "DELETE" else http.post(url, json=body) for url, body in requests
+        ))
+
+
+@pytest.mark.parametrize("copies", [1, 5])
+def test_parallel_borrows_never_oversell(client, run, make_book, make_member, copies):
+    book = make_book(copies=copies)
+    members = [make_member() for _ in range(PARALLEL)]
+
+    responses = run(_concurrently, [
+        ("/loans/borrow", {"book_id": book["id"], "member_id": member["id"]}) for member in members
+    ])
+
+    outcomes = Counter(resp.status_code for resp in responses)
+    assert outcomes == {201: copies, 400: PARALLEL - copies}
+    assert all(resp.json()["detail"] == "Book is out of stock" for resp in responses if resp.status_code == 400)
+    assert client.get(f"/books/{book['id']}").json()["available_copies"] == 0
+    loans = client.get("/loans/", params={"limit": 100}).json()
+    assert sum(1 for loan in loans if loan["book_id"] == book["id"]) == copies
+
+
+def test_parallel_returns_restock_once(client, run, make_book, make_member):
+    book = make_book(copies=2)
+    loan = client.post("/loans/borrow", json={"book_id": book["id"], "member_id": make_member()["id"]}).json()
+
+    responses = run(_concurrently, [(f"/loans/return/{loan['id']}", None)] * 10)
+
+    assert Counter(resp.status_code for resp in responses) == {200: 1, 400: 9}
+    assert client.get(f"/books/{book['id']}").json()["available_copies"] == 2
+
+
+def test_parallel_batch_and_single_borrows_share_stock(client, run, make_book, make_member):
+    book = make_book(copies=3)
+    members = [make_member() for _ in range(PARALLEL)]
+
+    responses = run(_concurrently, [
+        ("/loans/borrow/batch", {"member_id": member["id"], "book_ids": [book["id"]]}) if i % 2
+        else ("/loans/borrow", {"book_id": book["id"], "member_id": member["id"]})
+        for i, member in enumerate(members)
+    ])
+
+    succeeded = sum(
+        resp.json()["succeeded"] if "succeeded" in resp.json() else resp.status_code == 201
+        for resp in responses
+    )
+    assert all(resp.status_code < 500 for resp in responses)
+    assert succeeded == 3
+    assert client.get(f"/books/{book['id']}").json()["available_copies"] == 0
+
+
+def test_parallel_batches_respect_member_limit(client, run, make_book, make_member):
+    from app.routers.loans import MAX_LOANS_PER_MEMBER
+
+    member = make_member()
+    books = [make_book(copies=5) for _ in range(MAX_LOANS_PER_MEMBER)]
+    basket = [book["id"] for book in books]
+
+    responses = run(_concurrently, [
+        ("/loans/borrow/batch", {"member_id": member["id"], "book_ids": basket}) for _ in range(8)
+    ])
+
+    assert all(resp.status_code == 200 for resp in responses)
+    assert sum(resp.json()["succeeded"] for resp in responses) == MAX_LOANS_PER_MEMBER
+    summary = client.get("/members/summary", params={"limit": 1000}).json()
+    assert next(m for m in summary if m["id"] == member["id"])["active_loans"] == MAX_LOANS_PER_MEMBER
+
+
+def test_out_of_stock_borrow_is_rejected_without_writing(client, make_book, make_member, captured_sql, drain_outbox):
+    book = make_book(copies=1)
+    loan = client.post("/loans/borrow", json={"book_id": book["id"], "member_id": make_member()["id"]}).json()
+    holder = make_member()
+    client.post("/reservations/reserve", json={"book_id": book["id"], "member_id": holder["id"]})
+    client.post(f"/loans/return/{loan['id']}")
+    drain_outbox()
+    other = make_member()
+
+    with captured_sql() as statements:
+        resp = client.post("/loans/borrow", json={"book_id": book["id"], "member_id": other["id"]})
+    assert resp.status_code == 400 and resp.json()["detail"] == "Book is out of stock"
+    assert not [sql for sql, _ in statements if not sql.lstrip().upper().startswith("SELECT")]
+
+    # Bản đang giữ đã trừ kho: người giữ vẫn mượn được khi available_copies = 0
+    resp = client.post("/loans/borrow", json={"book_id": book["id"], "member_id": holder["id"]})
+    assert resp.status_code == 201, resp.text
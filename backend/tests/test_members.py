@@ -0,0 +1,27 @@
+def test_summary_aggregates_per_member(client, make_book, make_member):
+    book = make_book(copies=5)
+    member = make_member()
+    for _ in range(2):
+        client.post("/loans/borrow", json={"book_id": book["id"], "member_id": member["id"]})
+
+    summary = client.get("/members/summary", params={"limit": 5}).json()
+    row = next(r for r in summary if r["id"] == member["id"])
+    assert row["active_loans"] == 2
+    assert row["overdue_loans"] == 0
+
+
+def test_summary_query_count_is_constant_per_page(client, make_book, make_member, captured_sql):
+    book = make_book(copies=100)
+    for _ in range(50):
+        member = make_member()
+        client.post("/loans/borrow", json={"book_id": book["id"], "member_id": member["id"]})
+
+    counts = {}
+    for limit in (1, 50):
+        with captured_sql() as statements:
+            resp = client.get("/members/summary", params={"limit": limit})
+        assert resp.status_code == 200
+        assert len(resp.json()) == limit
+        counts[limit] = len(statements)
+
+    assert counts[1] == counts[50] == 1
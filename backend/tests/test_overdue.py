@@ -0,0 +1,92 @@
+from datetime import date, timedelta
+
+from sqlalchemy import update
+
+
+def _borrow_past_due(client, run, make_book, make_member, days_late=3):
+    """Mượn sách rồi lùi ngày mượn/hạn trả về quá khứ (job overdue chưa chạy)."""
+    from app.db.database import AsyncSessionLocal
+    from app.models import Loan
+
+    member = make_member()
+    resp = client.post("/loans/borrow", json={"book_id": make_book()["id"], "member_id": member["id"]})
+    assert resp.status_code == 201, resp.text
+    loan = resp.json()
+
+    due = date.today() - timedelta(days=days_late)
+
+    async def backdate():
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                update(Loan).where(Loan.id == loan["id"]).values(loan_date=due - timedelta(days=14), due_date=due)
+            )
+            await db.commit()
+
+    run(backdate)
+    return loan, member
+
+
+def _loan_status(run, loan_id):
+    from app.db.database import AsyncSessionLocal
+    from app.models import Loan
+
+    async def read():
+        async with AsyncSessionLocal() as db:
+            return (await db.get(Loan, loan_id)).status
+
+    return run(read)
+
+
+def _overdue_ids(client):
+    return {row["loan_id"] for row in client.get("/analytics/overdue-list", params={"limit": 1000}).json()}
+
+
+def test_past_due_loan_is_overdue_before_the_job_runs(client, run, make_book, make_member):
+    from app.db.database import AsyncSessionLocal
+    from app.services.dashboard import counters
+
+    loan, member = _borrow_past_due(client, run, make_book, make_member)
+    assert _loan_status(run, loan["id"]) == "active"
+
+    assert loan["id"] in _overdue_ids(client)
+    summary = client.get("/members/summary", params={"limit": 1000}).json()
+    assert next(m for m in summary if m["id"] == member["id"])["overdue_loans"] == 1
+
+    async def reconcile():
+        async with AsyncSessionLocal() as db:
+            await counters.reconcile(db)
+            before = (await counters.snapshot(db))["overdue_loans"]
+        return before
+
+    before = run(reconcile)
+    assert before >= 1
+    client.post(f"/loans/return/{loan['id']}")
+    assert client.get("/analytics/dashboard").json()["overdue_loans"] == before - 1
+    assert loan["id"] not in _overdue_ids(client)
+
+
+def test_cron_endpoint_requires_secret(client, monkeypatch):
+    from app.core.config import settings
+
+    monkeypatch.setattr(settings, "CRON_SECRET", None)
+    assert client.get("/jobs/nightly").status_code == 403
+
+    monkeypatch.setattr(settings, "CRON_SECRET", "s3cret")
+    assert client.get("/jobs/nightly").status_code == 401
+    assert client.get("/jobs/nightly", headers={"Authorization": "Bearer wrong"}).status_code == 401
+
+
+def test_cron_endpoint_marks_overdue_and_creates_fines(client, run, make_book, make_member, monkeypatch):
+    from app.core.config import settings
+
+    loan, member = _borrow_past_due(client, run, make_book, make_member, days_late=2)
+    monkeypatch.setattr(settings, "CRON_SECRET", "s3cret")
+
+    resp = client.get("/jobs/nightly", headers={"Authorization": "Bearer s3cret"})
+    assert resp.status_code == 200, resp.text
+    assert resp.json()["marked_overdue"] >= 1
+
+    assert _loan_status(run, loan["id"]) == "overdue"
+    assert loan["id"] in _overdue_ids(client)
+    summary = client.get("/members/summary", params={"limit": 1000}).json()
+    assert next(m for m in summary if m["id"] == member["id"])["unpaid_fines"] == 2 * 5000
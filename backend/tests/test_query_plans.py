@@ -0,0 +1,72 @@
+"""EXPLAIN QUERY PLAN cho các câu SQL mà router thật sự gửi (SQLite).
+
+Chạy các luồng nóng qua API trên dữ liệu đã seed, ghi lại mọi SELECT/UPDATE đi
+qua engine async, rồi EXPLAIN lại từng câu với đúng tham số. Test lỗi nếu câu nào
+quét toàn bảng loans / reservations / fines thay vì dùng index.
+"""
+import re
+import pytest
+from app.db.database import engine, AsyncSessionLocal
+from app.services.dashboard import counters
+from app.services.overdue import run_overdue_job
+
+# Bảng có các predicate nóng trong user-009; các bảng khác (books, members) tra theo PK
+HOT_TABLES = ("loans", "reservations", "fines")
+FULL_SCAN = re.compile(rf"^SCAN ({'|'.join(HOT_TABLES)})\b(?! USING (COVERING )?INDEX ix_)")
+
+
+def query_plan(statement, parameters):
+    with engine.connect() as conn:
+        rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+    return [row[-1] for row in rows]
+
+
+async def _with_session(job):
+    async with AsyncSessionLocal() as db:
+        return await job(db)
+
+
+@pytest.fixture
+def seeded(client, make_book, make_member):
+    books = [make_book(copies=3) for _ in range(5)]
+    members = [make_member() for _ in range(6)]
+    for i, member in enumerate(members):
+        client.post("/loans/borrow", json={"book_id": books[i % 5]["id"], "member_id": member["id"]})
+        client.post("/reservations/reserve", json={"book_id": books[(i + 1) % 5]["id"], "member_id": member["id"]})
+    return books, members
+
+
+def test_hot_queries_use_indexes(client, run, seeded, captured_sql):
+    books, members = seeded
+    book, member = books[0], members[-1]
+
+    with captured_sql() as statements:
+        loan = client.post("/loans/borrow", json={"book_id": book["id"], "member_id": member["id"]}).json()
+        client.get("/loans/check-access", params={"book_id": book["id"], "member_id": member["id"]})
+        client.post(f"/loans/return/{loan['id']}")
+        batch = client.post("/loans/borrow/batch", json={"member_id": member["id"], "book_ids": [b["id"] for b in books[:2]]})
+        client.post("/loans/return/batch", json={"loan_ids": [r["loan"]["id"] for r in batch.json()["results"] if r["success"]]})
+        reservation = client.post("/reservations/reserve", json={"book_id": books[3]["id"], "member_id": member["id"]}).json()
+        client.delete(f"/reservations/{reservation['id']}")
+        client.get("/analytics/overdue-list")
+        client.post("/reservations/expire-holds")
+        run(_with_session, run_overdue_job)
+        run(_with_session, counters.reconcile)
+        client.delete(f"/books/{books[4]['id']}")
+
+    assert statements
+    scans = {}
+    for statement, parameters in statements:
+        if not statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE", "WITH")):
+            continue
+        for line in query_plan(statement, parameters):
+            if FULL_SCAN.match(line):
+                scans[statement] = line
+    assert not scans, "Full table scans:\n" + "\n".join(f"{line}: {sql}" for sql, line in scans.items())
+
+
+def test_full_scan_pattern():
+    assert FULL_SCAN.match("SCAN loans")
+    assert FULL_SCAN.match("SCAN reservations USING INDEX sqlite_autoindex_x")
+    assert not FULL_SCAN.match("SCAN outbox_events USING INDEX ix_outbox_events_unprocessed")
+    assert not FULL_SCAN.match("SEARCH loans USING COVERING INDEX ix_loans_member_id_status (member_id=?)")
@@ -0,0 +1,58 @@
+def test_returning_several_copies_holds_one_per_reservation(client, make_book, make_member, drain_outbox):
+    book = make_book(copies=2)
+    borrowers = [make_member(), make_member()]
+    waiting = [make_member(), make_member()]
+
+    loan_ids = []
+    for member in borrowers:
+        resp = client.post("/loans/borrow", json={"book_id": book["id"], "member_id": member["id"]})
+        assert resp.status_code == 201, resp.text
+        loan_ids.append(resp.json()["id"])
+    for member in waiting:
+        resp = client.post("/reservations/reserve", json={"book_id": book["id"], "member_id": member["id"]})
+        assert resp.status_code == 201, resp.text
+
+    resp = client.post("/loans/return/batch", json={"loan_ids": loan_ids})
+    assert resp.json()["succeeded"] == 2
+    drain_outbox()
+
+    reservations = client.get("/reservations/", params={"book_id": book["id"]}).json()
+    assert sorted(r["member_id"] for r in reservations if r["status"] == "held") == [m["id"] for m in waiting]
+    assert client.get(f"/books/{book['id']}").json()["available_copies"] == 0
+
+
+def test_hold_goes_to_queue_head_only(client, make_book, make_member, drain_outbox):
+    book = make_book(copies=1)
+    loan = client.post("/loans/borrow", json={"book_id": book["id"], "member_id": make_member()["id"]}).json()
+    first, second = make_member(), make_member()
+    for member in (first, second):
+        client.post("/reservations/reserve", json={"book_id": book["id"], "member_id": member["id"]})
+
+    client.post(f"/loans/return/{loan['id']}")
+    drain_outbox()
+
+    statuses = {r["member_id"]: r["status"] for r in client.get("/reservations/", params={"book_id": book["id"]}).json()}
+    assert statuses == {first["id"]: "held", second["id"]: "pending"}
+    assert client.get(f"/books/{book['id']}").json()["available_copies"] == 0
+
+
+def test_cancelling_a_hold_while_it_is_borrowed_does_not_restock(client, run, make_book, make_member, drain_outbox):
+    from tests.test_loans import _concurrently
+
+    for i in range(10):
+        book = make_book(copies=1)
+        loan = client.post("/loans/borrow", json={"book_id": book["id"], "member_id": make_member()["id"]}).json()
+        waiting = make_member()
+        reservation = client.post(
+            "/reservations/reserve", json={"book_id": book["id"], "member_id": waiting["id"]}
+        ).json()
+        client.post(f"/loans/return/{loan['id']}")
+        drain_outbox()
+
+        borrow = ("/loans/borrow", {"book_id": book["id"], "member_id": waiting["id"]})
+        cancel = (f"/reservations/{reservation['id']}", "DELETE")
+        # Đổi thứ tự gửi để có cả hai kiểu xen kẽ
+        responses = run(_concurrently, [borrow, cancel] if i % 2 else [cancel, borrow])
+        borrowed = any(resp.status_code == 201 for resp in responses)
+        # Bản đã giữ hoặc đã được mượn, hoặc về kho khi lượt giữ bị hủy trước - không bao giờ cả hai
+        assert client.get(f"/books/{book['id']}").json()["available_copies"] == (0 if borrowed else 1)
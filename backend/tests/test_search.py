@@ -0,0 +1,85 @@
+def test_ranked_search_pages_with_cursor(client, make_book):
+    # Tên riêng cho test này: các test khác cũng tạo sách
+    for i in range(5):
+        make_book(title=f"Zebracorn volume {i}")
+
+    seen = []
+    params = {"q": "zebracorn", "limit": 2}
+    while True:
+        resp = client.get("/books/", params=params)
+        assert resp.status_code == 200
+        seen += [book["title"] for book in resp.json()]
+        cursor = resp.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+        params = {"q": "zebracorn", "limit": 2, "cursor": cursor}
+
+    assert sorted(seen) == [f"Zebracorn volume {i}" for i in range(5)]
+
+
+def test_member_search_prefix(client, make_member):
+    member = make_member(full_name="Quixotica Nguyen")
+    found = client.get("/members/", params={"q": "quixo"}).json()
+    assert [m["id"] for m in found] == [member["id"]]
+
+
+def test_invalid_cursor_is_rejected(client):
+    assert client.get("/books/", params={"q": "x", "cursor": "!!"}).status_code == 400
+
+
+def test_common_term_pages_newest_first_without_ranking(client, make_book, monkeypatch):
+    from app.db import search
+
+    ids = [make_book(title=f"Quokkamancy part {i}")["id"] for i in range(5)]
+    # Nhiều dòng khớp hơn ngưỡng xếp hạng: duyệt theo id giảm dần, cursor id
+    monkeypatch.setattr(search, "RANK_LIMIT", 3)
+
+    seen = []
+    params = {"q": "quok", "limit": 2}
+    while True:
+        resp = client.get("/books/", params=params)
+        assert resp.status_code == 200
+        seen += [book["id"] for book in resp.json()]
+        cursor = resp.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+        params = {"q": "quok", "limit": 2, "cursor": cursor}
+
+    assert seen == sorted(ids, reverse=True)
+
+
+def test_single_letter_prefix_uses_fts(client, make_member):
+    member = make_member(full_name="Xylia Oyelaran", email="xylia.oyelaran@example.com")
+    found = client.get("/members/", params={"q": "o"}).json()
+    assert member["id"] in [m["id"] for m in found]
+
+
+def test_short_query_skips_ranking(client, make_book, captured_sql):
+    ids = [make_book(title=f"Zq Wombling {i}")["id"] for i in range(3)]
+    # Từ khóa ngắn hơn RANK_MIN_LENGTH: một câu lệnh, dòng mới nhất trước
+    with captured_sql() as statements:
+        found = client.get("/books/", params={"q": "zq"}).json()
+
+    assert [book["id"] for book in found] == sorted(ids, reverse=True)
+    assert sum("MATCH" in sql for sql, _ in statements) == 1
+
+
+def test_outdated_fts_table_is_rebuilt(tmp_path):
+    from sqlalchemy import create_engine, text
+    from app.db.search import FTS_PREFIXES, install_search_indexes
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE books (id INTEGER PRIMARY KEY, title TEXT, author TEXT, isbn TEXT)"))
+        conn.execute(text("CREATE TABLE members (id INTEGER PRIMARY KEY, full_name TEXT, email TEXT)"))
+        conn.execute(text("INSERT INTO books VALUES (1, 'Clean Code', 'Robert Martin', '9780132350884')"))
+        conn.execute(text(
+            "CREATE VIRTUAL TABLE books_fts USING fts5(title, author, isbn, content='books', "
+            "content_rowid='id', prefix='2 3')"
+        ))
+
+    install_search_indexes(engine)
+    with engine.connect() as conn:
+        sql = conn.scalar(text("SELECT sql FROM sqlite_master WHERE name = 'books_fts'"))
+        assert f"prefix='{FTS_PREFIXES}'" in sql
+        assert conn.scalar(text("SELECT rowid FROM books_fts WHERE books_fts MATCH '\"c\"*'")) == 1
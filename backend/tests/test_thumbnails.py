@@ -0,0 +1,85 @@
+from datetime import datetime
+
+import httpx
+import pytest
+
+from app.core.config import settings
+from app.db.database import AsyncSessionLocal
+from app.models import Book
+from app.services import thumbnails
+
+
+def _status_error(code: int) -> httpx.HTTPStatusError:
+    request = httpx.Request("GET", "https://covers.openlibrary.org/b/isbn/1-L.jpg")
+    return httpx.HTTPStatusError("error", request=request, response=httpx.Response(code, request=request))
+
+
+@pytest.mark.parametrize("error, transient", [
+    (httpx.ConnectError("[Errno -2] Name or service not known"), True),
+    (httpx.ReadTimeout("timed out"), True),
+    (_status_error(429), True),
+    (_status_error(503), True),
+    (_status_error(404), False),
+    (ValueError("Cover image too large"), False),
+])
+def test_error_classification(error, transient):
+    assert thumbnails.is_transient(error) is transient
+
+
+async def _process(book_id):
+    async with AsyncSessionLocal() as db:
+        await thumbnails.process(db, book_id)
+        book = await db.get(Book, book_id, populate_existing=True)
+        return book.cover_thumbnails, book.thumbnail_attempts, book.thumbnail_retry_at
+
+
+def test_transient_error_keeps_book_pending(run, make_book, monkeypatch):
+    book = make_book()
+
+    async def offline(path):
+        raise httpx.ConnectError("[Errno -2] Name or service not known")
+    monkeypatch.setattr(thumbnails, "_fetch", offline)
+
+    covers, attempts, retry_at = run(_process, book["id"])
+    assert covers is None
+    assert attempts == 1
+    assert retry_at > datetime.now()
+
+
+def test_gives_up_after_max_attempts(run, make_book, monkeypatch):
+    book = make_book()
+    monkeypatch.setattr(settings, "THUMBNAIL_MAX_ATTEMPTS", 2)
+
+    async def offline(path):
+        raise httpx.ConnectError("down")
+    monkeypatch.setattr(thumbnails, "_fetch", offline)
+
+    run(_process, book["id"])
+    covers, attempts, retry_at = run(_process, book["id"])
+    assert covers == {}
+    assert retry_at is None
+
+
+def test_missing_cover_is_permanent(run, make_book, monkeypatch):
+    book = make_book()
+
+    async def not_found(path):
+        raise _status_error(404)
+    monkeypatch.setattr(thumbnails, "_fetch", not_found)
+
+    covers, attempts, _ = run(_process, book["id"])
+    assert covers == {}
+
+
+def test_remote_fetches_are_spaced_out(run, monkeypatch):
+    import time
+
+    monkeypatch.setattr(settings, "THUMBNAIL_FETCH_INTERVAL_SECONDS", 0.05)
+
+    async def three_fetches():
+        start = time.monotonic()
+        for _ in range(3):
+            await thumbnails._throttle()
+        return time.monotonic() - start
+
+    assert run(three_fetches) >= 0.1
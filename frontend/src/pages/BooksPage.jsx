@@ -8,7 +8,7 @@ import {
     MoreOutlined, PlusOutlined, UploadOutlined,
     FileImageOutlined, EyeOutlined, LockOutlined
 } from '@ant-design/icons';
-import { getBooks, borrowBook, updateBook, deleteBook, createBook, BASE_URL, checkLoanAccess } from '../services/api';
+import { getBooks, borrowBook, updateBook, deleteBook, createBook, BASE_URL, checkLoanAccess, getBookContentUrl } from '../services/api';
 
 const { Meta } = Card;
 const { Title } = Typography;
@@ -18,15 +18,20 @@ const BookCover = ({ item, getFileUrl }) => {
     const [imgSrc, setImgSrc] = useState("https://placehold.co/160x240/1f1f3e/FFF?text=Loading");
     const [hasError, setHasError] = useState(false);
 
+    // Thumbnail do backend tạo sẵn: bản small vừa khung card, medium cho màn hình 2x
+    const thumbs = item.cover_thumbnails?.small ? item.cover_thumbnails : null;
+
     useEffect(() => {
         setHasError(false);
-        if (item.image_path) {
+        if (thumbs) {
+            setImgSrc(getFileUrl(thumbs.small.jpeg));
+        } else if (item.image_path) {
             setImgSrc(getFileUrl(item.image_path));
         } else {
             const cleanIsbn = item.isbn ? item.isbn.replace(/-/g, '').replace(/ /g, '') : '';
             setImgSrc(`https://covers.openlibrary.org/b/isbn/${cleanIsbn}-L.jpg?default=false`);
         }
-    }, [item, getFileUrl]);
+    }, [item, thumbs, getFileUrl]);
 
     const handleError = () => {
         if (hasError) return;
@@ -44,12 +49,22 @@ const BookCover = ({ item, getFileUrl }) => {
 
     return (
         <div style={{ height: 260, background: '#111827', display: 'flex', alignItems: 'center', justifyContent: 'center', position: 'relative', padding: '10px' }}>
-            <img
-                alt={item.title}
-                src={imgSrc}
-                onError={handleError}
-                style={{ height: '100%', maxWidth: '100%', objectFit: 'contain', borderRadius: 4, transition: 'all 0.3s' }}
-            />
+            <picture style={{ height: '100%', display: 'flex', justifyContent: 'center' }}>
+                {thumbs && !hasError && (
+                    <source
+                        type="image/webp"
+                        srcSet={`${getFileUrl(thumbs.small.webp)} 1x, ${getFileUrl(thumbs.medium.webp)} 2x`}
+                    />
+                )}
+                <img
+                    alt={item.title}
+                    src={imgSrc}
+                    srcSet={thumbs && !hasError ? `${imgSrc} 1x, ${getFileUrl(thumbs.medium.jpeg)} 2x` : undefined}
+                    loading="lazy"
+                    onError={handleError}
+                    style={{ height: '100%', maxWidth: '100%', objectFit: 'contain', borderRadius: 4, transition: 'all 0.3s' }}
+                />
+            </picture>
             <div style={{ position: 'absolute', top: 10, right: 10 }}>
                 {item.available_copies > 0
                     ? <Tag color="#10b981" style={{ fontWeight: 'bold' }}>Sẵn sàng</Tag>
@@ -178,9 +193,8 @@ const BooksPage = () => {
                 setIsAccessModalOpen(false);
                 
                 // Kiểm tra xem sách có file PDF không
-                if (selectedBook.file_path) {
-                    const url = getFileUrl(selectedBook.file_path);
-                    setReadingBookUrl(url);
+                if (selectedBook.has_file) {
+                    setReadingBookUrl(getBookContentUrl(selectedBook.id, res.data.content_token));
                     setIsReadModalOpen(true);
                 } else {
                     message.warning("Sách này chưa có file PDF để đọc.");
@@ -316,7 +330,7 @@ const BooksPage = () => {
                                                 {item.title}
                                             </div>
                                         </Tooltip>
-                                        {item.file_path && (
+                                        {item.has_file && (
                                             <Tooltip title="Đọc sách">
                                                 <Button
                                                     type="text"
@@ -12,14 +12,19 @@ const { Title, Text } = Typography;
 const BookCover = ({ item, getFileUrl, height = 200, style = {} }) => {
     const [imgSrc, setImgSrc] = useState("https://placehold.co/160x240/1f1f3e/FFF?text=Loading");
     
+    const thumbs = item.cover_thumbnails?.small ? item.cover_thumbnails : null;
+
     useEffect(() => {
-        if (item.image_path) {
+        if (thumbs) {
+            // Ảnh nhỏ trên dashboard: bản small là đủ
+            setImgSrc(getFileUrl(thumbs.small.webp));
+        } else if (item.image_path) {
             setImgSrc(getFileUrl(item.image_path));
         } else {
             const cleanIsbn = item.isbn ? item.isbn.replace(/-/g, '').replace(/ /g, '') : '';
             setImgSrc(`https://covers.openlibrary.org/b/isbn/${cleanIsbn}-L.jpg?default=false`);
         }
-    }, [item, getFileUrl]);
+    }, [item, thumbs, getFileUrl]);
 
     const handleError = () => {
         const cleanIsbn = item.isbn ? item.isbn.replace(/-/g, '').replace(/ /g, '') : '';
@@ -19,10 +19,17 @@ export const updateBook = (bookId, bookData) => api.put(`/books/${bookId}`, book
 export const deleteBook = (bookId) => api.delete(`/books/${bookId}`);
 
 // Loans
-export const getLoans = () => api.get('/loans/');
+// Chỉ lấy các cột bảng mượn/trả hiển thị; book/member ở dạng rút gọn
+export const getLoans = () => api.get('/loans/', {
+    params: { fields: 'loan_date,due_date,return_date,status', expand: 'book,member' },
+});
 export const borrowBook = (data) => api.post('/loans/borrow', data);
 export const returnBook = (loanId) => api.post(`/loans/return/${loanId}`);
+export const borrowBooksBatch = (data) => api.post('/loans/borrow/batch', data);
+export const returnBooksBatch = (loanIds) => api.post('/loans/return/batch', { loan_ids: loanIds });
 export const checkLoanAccess = (bookId, memberId) => api.get(`/loans/check-access?book_id=${bookId}&member_id=${memberId}`);
+// URL đọc PDF với token do check-access cấp (server kiểm tra lại loan, hỗ trợ Range nên trình đọc mở trang đầu ngay)
+export const getBookContentUrl = (bookId, token) => `${BASE_URL}/books/${bookId}/content?token=${encodeURIComponent(token)}`;
 
 // Members
 export const getMembers = () => api.get('/members/');
@@ -32,6 +39,6 @@ export const deleteMember = (id) => api.delete(`/members/${id}`);
 
 // Analytics
 export const getDashboardStats = () => api.get('/analytics/dashboard');
-export const getTopBooks = () => api.get('/analytics/top-books');
+export const getTopBooks = (params) => api.get('/analytics/top-books', { params });
 
 export default api;
\ No newline at end of file